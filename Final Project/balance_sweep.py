@@ -0,0 +1,372 @@
+import argparse
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from save_writer import write_atomic
+from simulation import POLICIES, RunStats
+from simulation_farm import run_shard, shard_seeds
+from spawn_tables import DEFAULT_FILE, SpawnTables
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".balance_cache")
+SHARD_SIZE = 500  # Seeds per task; smaller than the farm's so a point can be stopped early
+
+def source_hash():
+    """Hash of the game's source files: a cached result is only reused by the same code."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def apply_parameter(data, name, value):
+    """
+    Sets one sweep parameter in a spawn tables dictionary. A name is a dotted path:
+    - "rooms.<path>.<chance>", e.g. "rooms.shortcut.trap" (a room chance)
+    - "enemies.<name>.<field>", e.g. "enemies.Orc.health" (an enemy's health or attack)
+    - "items.<name>.<field>", e.g. "items.Small Healing Potion.price" (an item's price or value)
+    - "pets.<name>.<field>", e.g. "pets.Shadow Wolf.attack"
+    Enemy, item and pet fields go in the tables' "stats" section (see SpawnTables).
+    """
+    kind, _, rest = name.partition(".")
+    entry, _, field = rest.rpartition(".")
+    if not entry or not field:
+        raise ValueError(f"Parameter '{name}' is not <kind>.<name>.<field>")
+    if kind == "rooms":
+        if field not in SpawnTables.CHANCES:
+            raise ValueError(f"Parameter '{name}': a room chance is one of {', '.join(SpawnTables.CHANCES)}")
+        data["rooms"].setdefault(entry, dict(data["rooms"]["normal"]))[field] = value
+    elif kind in SpawnTables.KINDS:
+        data.setdefault("stats", {}).setdefault(kind, {}).setdefault(entry, {})[field] = value
+    else:
+        raise ValueError(f"Parameter '{name}': unknown kind '{kind}'")
+
+
+def parse_value(text):
+    """Reads a parameter value: an int, a float, or else a string."""
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+class Targets:
+    """
+    What a balanced game should look like: the win rate, and optionally the average gold after
+    each of the first turns (the gold curve). Each is on target within its tolerance.
+    """
+
+    def __init__(self, win_rate=0.6, win_tolerance=0.05, gold_curve=None, gold_tolerance=0.15):
+        self.win_rate = win_rate
+        self.win_tolerance = win_tolerance
+        self.gold_curve = gold_curve or []
+        self.gold_tolerance = gold_tolerance  # Relative: 0.15 = within 15% of each target
+
+    def errors(self, stats):
+        """Returns (win rate error, gold curve error), in tolerances: 1.0 is just on target."""
+        win_error = abs(stats.outcomes["victory"] / stats.runs - self.win_rate) / self.win_tolerance
+        if not self.gold_curve:
+            return win_error, 0.0
+        curve = stats.gold_curve()
+        misses = [abs(curve[turn] / target - 1) if turn < len(curve) else 1.0
+                  for turn, target in enumerate(self.gold_curve)]
+        return win_error, sum(misses) / len(misses) / self.gold_tolerance
+
+    def clearly_off(self, stats, z=3.0):
+        """True if the win rate is off target even at the edge of its z-sigma confidence interval."""
+        win_rate = stats.outcomes["victory"] / stats.runs
+        margin = z * math.sqrt(max(win_rate * (1 - win_rate), 1 / stats.runs) / stats.runs)
+        return abs(win_rate - self.win_rate) - margin > self.win_tolerance
+
+    def to_dict(self):
+        return {"win_rate": self.win_rate, "win_tolerance": self.win_tolerance,
+                "gold_curve": self.gold_curve, "gold_tolerance": self.gold_tolerance}
+
+
+class SweepPoint:
+    """
+    One point of the grid: its parameters, its tables and the RunStats of each of its shards.
+    The shards are merged in seed order, so a point's result (and whether it stopped early)
+    is the same for any number of workers.
+    """
+
+    def __init__(self, params, data, shards, key):
+        self.params = params
+        self.data = data
+        self.shards = shards  # [(first seed, runs)]
+        self.key = key
+        self.results = {}  # "seed:runs" -> RunStats of a finished shard
+        self.cached = 0  # Shards found in the cache
+        self.submitted = 0  # Shards handed to a worker (or found in the cache)
+        self.merged = 0  # Shards merged into self.stats, in order
+        self.stats = RunStats()
+        self.stopped = False
+        self.errors = None
+
+    @staticmethod
+    def shard_name(shard):
+        return f"{shard[0]}:{shard[1]}"
+
+    @property
+    def done(self):
+        return self.stopped or self.merged == len(self.shards)
+
+    def next_shard(self):
+        """Returns the next shard to play, or None; shards found in the cache are skipped."""
+        while self.submitted < len(self.shards):
+            shard = self.shards[self.submitted]
+            self.submitted += 1
+            if self.shard_name(shard) not in self.results:
+                return shard
+        return None
+
+    def add(self, shard, stats):
+        self.results[self.shard_name(shard)] = stats
+
+    def advance(self, targets, min_runs, early_stop):
+        """Merges the shards finished in order, then stops the point if it is clearly off target."""
+        while not self.done and self.shard_name(self.shards[self.merged]) in self.results:
+            self.stats.merge(self.results[self.shard_name(self.shards[self.merged])])
+            self.merged += 1
+            if early_stop and self.stats.runs >= min_runs and self.merged < len(self.shards) \
+                    and targets.clearly_off(self.stats):
+                self.stopped = True
+        if self.done:
+            self.errors = targets.errors(self.stats)
+
+    @property
+    def score(self):
+        """Distance to the targets in tolerances (lower is better; stopped points come last)."""
+        return sum(self.errors) + (1000 if self.stopped else 0)
+
+    @property
+    def on_target(self):
+        return not self.stopped and all(error <= 1.0 for error in self.errors)
+
+    def to_dict(self):
+        summary = self.stats.summary()
+        return {"params": self.params, "runs": self.stats.runs, "stopped": self.stopped, "cached_shards": self.cached,
+                "win_rate": summary["win_rate"], "gold_curve": summary["gold_curve"], "avg_gold": summary["avg_gold"],
+                "win_error": self.errors[0], "gold_error": self.errors[1], "on_target": self.on_target}
+
+
+class ResultCache:
+    """
+    Shard results on disk, content-addressed: a point's file is named after the SHA-256 of
+    everything its games depend on (the full tables with the point's changes, the policy, the
+    turn limit and the game's source code), and holds the RunStats of each shard played, by seed
+    range. A sweep that overlaps an earlier one (or asks for more runs) only plays what is missing.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def key(data, policy_name, max_turns, code):
+        content = json.dumps({"tables": data, "policy": policy_name, "max_turns": max_turns, "code": code},
+                             sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def load(self, point):
+        """Puts the point's cached shards in point.results."""
+        if not self.directory or not os.path.exists(self.path(point.key)):
+            return
+        try:
+            with open(self.path(point.key), "r") as f:
+                shards = json.load(f)["shards"]
+        except (OSError, ValueError, KeyError):
+            return  # A damaged entry is played again and rewritten
+        for shard in point.shards:
+            if SweepPoint.shard_name(shard) in shards:
+                point.add(shard, RunStats.from_dict(shards[SweepPoint.shard_name(shard)]))
+                point.cached += 1
+
+    def store(self, point):
+        """Adds the point's shards to its cache file (keeping shards of other seed ranges stored before)."""
+        if not self.directory:
+            return
+        path = self.path(point.key)
+        shards = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    shards = json.load(f)["shards"]
+            except (OSError, ValueError, KeyError):
+                shards = {}
+        shards.update({name: stats.to_dict() for name, stats in point.results.items()})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, json.dumps({"params": point.params, "shards": shards}, sort_keys=True).encode())
+
+
+worker_tables = {}  # Tables key -> SpawnTables, compiled once per worker process
+
+def run_point_shard(key, data, first_seed, num_runs, policy_name, max_turns):
+    """Plays one shard of a grid point in a worker process and returns its RunStats."""
+    if key not in worker_tables:
+        worker_tables[key] = SpawnTables(data, source=f"<sweep {key[:12]}>")
+    return run_shard(first_seed, num_runs, policy_name, max_turns, {"tables": worker_tables[key]})
+
+
+def sweep(grid, targets, runs=4000, policy_name="cautious", first_seed=0, max_turns=200, workers=None,
+          cache=None, early_stop=True, min_runs=1000, tables_file=DEFAULT_FILE, shard_size=SHARD_SIZE, progress=None):
+    """
+    Simulates runs games for every point of grid ({parameter: [values]}, see apply_parameter())
+    over a pool of worker processes, and returns the SweepPoints, best first.
+
+    Shards of all points are played side by side, at most two per worker in flight. Once a
+    point has min_runs games, it is stopped as soon as its win rate is clearly off target
+    (Targets.clearly_off()), and its remaining shards are never played. Played shards are stored
+    in cache (a ResultCache), so a rerun only plays what is missing.
+    """
+    with open(tables_file, "r") as f:
+        base = json.load(f)
+    code = source_hash()
+    names = list(grid)
+    points = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        data = copy.deepcopy(base)
+        for name, value in params.items():
+            apply_parameter(data, name, value)
+        SpawnTables(data, source=f"<point {params}>")  # Raises ValueError now rather than in a worker
+        point = SweepPoint(params, data, shard_seeds(first_seed, runs, shard_size),
+                           ResultCache.key(data, policy_name, max_turns, code))
+        if cache is not None:
+            cache.load(point)
+        point.advance(targets, min_runs, early_stop)
+        points.append(point)
+
+    def finished(point):
+        if cache is not None and len(point.results) > point.cached:
+            cache.store(point)
+        if progress:
+            progress(point)
+
+    for point in points:
+        if point.done:
+            finished(point)
+
+    def next_task():
+        """The next shard of the point with the fewest shards played, so every point advances together."""
+        active = [point for point in points if not point.done and point.submitted < len(point.shards)]
+        for point in sorted(active, key=lambda point: point.submitted):
+            shard = point.next_shard()
+            if shard is not None:
+                return point, shard
+        return None
+
+    if workers == 1:
+        task = next_task()
+        while task is not None:
+            point, shard = task
+            point.add(shard, run_point_shard(point.key, point.data, *shard, policy_name, max_turns))
+            point.advance(targets, min_runs, early_stop)
+            if point.done:
+                finished(point)
+            task = next_task()
+    else:
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            max_in_flight = 2 * workers
+            in_flight = {}
+            while True:
+                while len(in_flight) < max_in_flight:
+                    task = next_task()
+                    if task is None:
+                        break
+                    point, shard = task
+                    future = pool.submit(run_point_shard, point.key, point.data, *shard, policy_name, max_turns)
+                    in_flight[future] = task
+                if not in_flight:
+                    break
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    point, shard = in_flight.pop(future)
+                    if point.done:
+                        continue  # Stopped meanwhile: the result is not needed
+                    point.add(shard, future.result())
+                    point.advance(targets, min_runs, early_stop)
+                    if point.done:
+                        finished(point)
+                        for other, (other_point, _) in list(in_flight.items()):
+                            if other_point is point:
+                                other.cancel()
+
+    return sorted(points, key=lambda point: point.score)
+
+
+def parse_grid(parameters):
+    """Turns ["enemies.Orc.health=40,50,60", ...] into {"enemies.Orc.health": [40, 50, 60], ...}."""
+    grid = {}
+    for parameter in parameters:
+        name, separator, values = parameter.partition("=")
+        if not separator or not values:
+            raise ValueError(f"Parameter '{parameter}' is not name=value1,value2,...")
+        grid[name.strip()] = [parse_value(value.strip()) for value in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep balance parameters over all CPU cores and score them against targets.")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help='a parameter and its values, e.g. "enemies.Orc.health=40,50,60", "rooms.normal.trap=0.2,0.3" '
+                             'or "items.Small Healing Potion.price=5,10" (repeat for a grid)')
+    parser.add_argument("--runs", type=int, default=4000, help="games per point")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="cautious", help="bot that makes the decisions")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game of every point")
+    parser.add_argument("--max-turns", type=int, default=200, help="turn limit per game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (1 = no pool)")
+    parser.add_argument("--tables", default=DEFAULT_FILE, help="spawn tables file the points change")
+    parser.add_argument("--target-win", type=float, default=0.6, help="win rate to aim for")
+    parser.add_argument("--win-tolerance", type=float, default=0.05)
+    parser.add_argument("--target-gold", default="", metavar="G1,G2,...", help="average gold to aim for after turns 1, 2, ...")
+    parser.add_argument("--gold-tolerance", type=float, default=0.15, help="relative (0.15 = within 15%%)")
+    parser.add_argument("--min-runs", type=int, default=1000, help="games before a point may be stopped early")
+    parser.add_argument("--no-early-stop", action="store_true", help="play every point to the end")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="where played shards are kept")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    args = parser.parse_args()
+
+    if not args.param:
+        parser.error("give at least one --param")
+    targets = Targets(args.target_win, args.win_tolerance,
+                      [float(gold) for gold in args.target_gold.split(",") if gold], args.gold_tolerance)
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+
+    def progress(point):
+        state = "stopped" if point.stopped else "done"
+        print(f"  {state:<8} {point.params}: {point.stats.runs} games "
+              f"({point.cached}/{len(point.shards)} shards cached)", flush=True)
+
+    start = time.perf_counter()
+    points = sweep(parse_grid(args.param), targets, args.runs, args.policy, args.seed, args.max_turns, args.workers,
+                   cache, not args.no_early_stop, args.min_runs, args.tables, progress=progress)
+    elapsed = time.perf_counter() - start
+
+    played = sum(point.stats.runs for point in points)
+    print(f"\n{len(points)} points in {elapsed:.2f}s ({played} games counted)")
+    print(f"{'Score':>7} {'Win rate':>9} {'Gold curve':<28} {'Games':>6}  Parameters")
+    for point in points:
+        curve = ", ".join(f"{gold:.0f}" for gold in point.stats.gold_curve()[:len(targets.gold_curve) or 4])
+        mark = "*" if point.on_target else ("x" if point.stopped else " ")
+        print(f"{point.score:>7.2f} {point.stats.outcomes['victory'] / point.stats.runs:>9.1%} {curve:<28} "
+              f"{point.stats.runs:>6}{mark} {point.params}")
+    print("* on target, x stopped early")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"targets": targets.to_dict(), "points": [point.to_dict() for point in points]}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
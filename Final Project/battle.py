@@ -1,191 +1,367 @@
-import random
-from player import Player
-from enemy import Enemy
-
-class Battle:
-    """Handles turn-based combat between the player (and possibly their pet) against multiple enemies."""
-
-    def __init__(self, player, enemies):
-        """
-        Initializes a battle instance between the player (and pet) and multiple enemies.
-        """
-        self.player = player
-        self.enemies = enemies  
-
-    def player_turn(self):
-        """
-        Handles the player's turn where they can attack, use an item, counterattack, or flee.
-        """
-        print("\nYour turn!")
-        print("[1] Attack")
-        print("[2] Use Item")
-        print("[3] Counterattack (High risk, high reward)")
-        print("[4] Try to Flee")
-
-        choice = input("Choose an action: ").strip()
-
-        if choice == "1":
-            self.choose_enemy_action("attack")
-        elif choice == "2":
-            self.player.show_inventory()
-            item_choice = input("Choose an item to use: ").strip()
-            self.player.use_item(item_choice)
-        elif choice == "3":
-            self.choose_enemy_action("counterattack")
-        elif choice == "4":
-            if self.flee():
-                return True  # Successfully escaped battle
-        else:
-            print("Invalid choice! You lose your turn.")
-
-        return False  # Combat continues
-
-    def choose_enemy_action(self, action_type):
-        """
-        Allows the player to choose which enemy they want to target.
-        """
-        if len(self.enemies) == 1:
-            target_enemy = self.enemies[0]  
-        else:
-            print("\nChoose an enemy to target:")
-            for i, enemy in enumerate(self.enemies, 1):
-                print(f"[{i}] {enemy.name} (Health: {enemy.health})")
-
-            try:
-                enemy_index = int(input("Select an enemy: ").strip()) - 1
-                target_enemy = self.enemies[enemy_index]
-            except (ValueError, IndexError):
-                print("Invalid choice! You lose your turn.")
-                return
-
-        if action_type == "attack":
-            self.attack_enemy(target_enemy)
-        elif action_type == "counterattack":
-            self.counterattack_enemy(target_enemy)
-
-    def attack_enemy(self, enemy):
-        """
-        Player attacks an enemy. Damage considers temporary buffs.
-        """
-        damage = self.player.attack + (5 if self.player.temporary_buffs.get("attack", 0) > 0 else 0)
-        print(f"You attack {enemy.name} for {damage} damage! (Enemy health: {max(0, enemy.health - damage)})")
-        enemy.health -= damage
-
-        if enemy.health <= 0:
-            print(f"{enemy.name} has been defeated!")
-            self.enemies.remove(enemy)
-            gold_reward = random.randint(10, 50)
-            self.player.earn_gold(gold_reward)
-
-    def counterattack_enemy(self, enemy):
-        """
-        Counterattack: 50% success = double damage, 50% fail = no damage.
-        """
-        print(f"You attempt a counterattack on {enemy.name}...")
-        if random.random() < 0.5:
-            damage = (self.player.attack * 2)
-            print(f"Counterattack successful! You deal {damage} damage! (Enemy health: {max(0, enemy.health - damage)})")
-            enemy.health -= damage
-        else:
-            print("Counterattack failed! You missed your chance to attack.")
-
-    def enemy_turn(self):
-        """
-        Each enemy takes a turn to attack the player or pet.
-        """
-        for enemy in self.enemies:
-            if not enemy.is_alive():
-                continue  
-
-            target = self.choose_target()  
-            enemy.attack_player(target)
-
-            # Show updated health for player or pet
-            if target == self.player:
-                print(f"(Your health: {max(0, self.player.health)})")
-            elif target == self.player.pet:
-                print(f"({self.player.pet.name}'s health: {max(0, self.player.pet.health)})")
-
-            if not target.is_alive():
-                if target == self.player:
-                    print("You have been defeated... Game over.")
-                    return True
-                elif target == self.player.pet:
-                    print(f"{self.player.pet.name} has fallen in battle!")
-
-        return False  
-
-    def choose_target(self):
-        """
-        Determines if the enemy attacks the player or their pet.
-        """
-        if self.player.pet and random.random() < 0.5:  
-            return self.player.pet
-        return self.player
-
-    def flee(self):
-        """
-        Player attempts to flee from battle. Chance is lower with more enemies.
-        """
-        escape_chance = max(10, 40 - (len(self.enemies) * 10))  
-        print(f"Escape chance: {escape_chance}% (More enemies = lower chance)")
-
-        if random.randint(1, 100) <= escape_chance:
-            print("You successfully escaped the battle!")
-            return True
-        else:
-            print("Failed to escape!")
-            return False
-
-    def apply_status_effects(self):
-        """
-        Applies ongoing status effects to the player (Poison, Burn).
-        """
-        if self.player.temporary_buffs.get("poison", 0) > 0:
-            print("Poison effect! You take 3 extra damage.")
-            self.player.health -= 3
-            self.player.temporary_buffs["poison"] -= 1  
-
-        if self.player.temporary_buffs.get("burn", 0) > 0:
-            print("Burning effect! You take 5 extra damage.")
-            self.player.health -= 5
-            self.player.temporary_buffs["burn"] -= 1  
-
-    def pet_turn(self):
-        """
-        If the player has a pet, the pet attacks a random enemy.
-        """
-        if not self.player.pet or not self.enemies:
-            return
-
-        target = random.choice(self.enemies)
-        print(f"{self.player.pet.name} attacks {target.name} for {self.player.pet.attack} damage!")
-        target.health -= self.player.pet.attack
-
-        if target.health <= 0:
-            print(f"{target.name} has been defeated!")
-            self.enemies.remove(target)
-
-    def start(self):
-        """
-        Starts the battle loop where the player, pet, and enemies take turns.
-        """
-        print(f"\nA battle begins! You are facing {len(self.enemies)} enemy(s)!")
-        while self.player.is_alive() and self.enemies:
-            self.apply_status_effects()  
-
-            escaped = self.player_turn()
-            if escaped:
-                return  
-
-            self.pet_turn()  
-
-            if self.enemy_turn():
-                return  
-
-            self.player.update_buffs()  
-
-        if self.player.is_alive():
-            print("You won the battle!")
-        else:
-            print("You were defeated...")
+import random
+from enemy_group import EnemyGroup
+from events import DamageTaken, EnemyDefeated, publish
+from player import Player
+from enemy import Enemy
+from output import displays, show
+from status_effects import StatusEffects
+from timing import timings
+
+# Effects that hurt every round, with the name shown when they do
+DAMAGE_OVER_TIME = (("poison", "Poison"), ("burn", "Burning"))
+
+class Battle:
+    """
+    Handles turn-based combat between the player (and possibly their pet) against multiple enemies.
+
+    The enemies are an EnemyGroup, so a battle can face a horde of thousands: a defeated enemy
+    is removed in O(1), the weakest and the most threatening enemy are found through indexes,
+    and once more than batch_size enemies are left, the enemies' turn is played one kind of
+    enemy at a time, with one summary per kind instead of a message per attack.
+    """
+
+    LISTED_ENEMIES = 10  # A bigger group is listed only in part when the player picks a target
+
+    def __init__(self, player, enemies, rng=None, waves=None, pet_target="random", batch_size=8):
+        """
+        Initializes a battle instance between the player (and pet) and multiple enemies.
+        rng is the game's combat stream (the random module if not given).
+        waves are more lists of enemies: each joins the battle when the enemies before it are defeated.
+        pet_target is how the pet picks the enemy it attacks: "random", "weakest" or "threat".
+        """
+        self.player = player
+        self.enemies = enemies if isinstance(enemies, EnemyGroup) else EnemyGroup(enemies)
+        self.rng = rng or random
+        self.waves = list(waves or [])
+        if pet_target not in ("random", "weakest", "threat"):
+            raise ValueError(f"Unknown pet target: {pet_target}")
+        self.pet_target = pet_target
+        self.batch_size = batch_size
+        self.enemy_effects = StatusEffects()  # Effects on the enemies, ticked every round
+
+    def player_turn(self):
+        """
+        Handles the player's turn where they can attack, use an item, counterattack, or flee.
+        """
+        if displays():  # Five lines every round, for nothing in a headless game
+            show("\nYour turn!")
+            show("[1] Attack")
+            show("[2] Use Item")
+            show("[3] Counterattack (High risk, high reward)")
+            show("[4] Try to Flee")
+
+        choice = self.player.policy.choose_battle_action(self)
+
+        if choice == "1":
+            self.choose_enemy_action("attack")
+        elif choice == "2":
+            self.player.show_inventory()
+            item_choice = self.player.policy.choose_item(self.player)
+            self.player.use_item(item_choice)
+        elif choice == "3":
+            self.choose_enemy_action("counterattack")
+        elif choice == "4":
+            if self.flee():
+                return True  # Successfully escaped battle
+        else:
+            show("Invalid choice! You lose your turn.")
+
+        return False  # Combat continues
+
+    def choose_enemy_action(self, action_type):
+        """
+        Allows the player to choose which enemy they want to target.
+        """
+        if len(self.enemies) == 1:
+            target_enemy = self.enemies[0]  
+        else:
+            show("\nChoose an enemy to target:")
+            for i in range(min(len(self.enemies), self.LISTED_ENEMIES)):
+                show("[{}] {} (Health: {})", i + 1, self.enemies[i].name, self.enemies[i].health)
+            if len(self.enemies) > self.LISTED_ENEMIES:
+                weakest = self.enemies.weakest()
+                show("... and {} more (weakest: [{}] {}, Health: {})", len(self.enemies) - self.LISTED_ENEMIES,
+                     self.enemies.index(weakest) + 1, weakest.name, weakest.health)
+
+            try:
+                enemy_index = int(self.player.policy.choose_enemy(self)) - 1
+                target_enemy = self.enemies[enemy_index]
+            except (ValueError, IndexError):
+                show("Invalid choice! You lose your turn.")
+                return
+
+        if action_type == "attack":
+            self.attack_enemy(target_enemy)
+        elif action_type == "counterattack":
+            self.counterattack_enemy(target_enemy)
+
+    def attack_enemy(self, enemy):
+        """
+        Player attacks an enemy. Damage considers temporary buffs.
+        """
+        damage = self.player.attack + self.player.effects.magnitude(self.player, "attack")
+        show("You attack {} for {} damage! (Enemy health: {})", enemy.name, damage, max(0, enemy.health - damage))
+        enemy.health -= damage
+
+        if enemy.health <= 0:
+            show("{} has been defeated!", enemy.name)
+            publish(EnemyDefeated, enemy.name, self.player.name)
+            self.enemies.remove(enemy)
+            self.enemy_effects.clear(enemy)
+            gold_reward = self.rng.randint(10, 50)
+            self.player.earn_gold(gold_reward, "battle")
+        else:
+            self.enemies.changed(enemy)
+
+    def counterattack_enemy(self, enemy):
+        """
+        Counterattack: 50% success = double damage, 50% fail = no damage.
+        """
+        show("You attempt a counterattack on {}...", enemy.name)
+        if self.rng.random() < 0.5:
+            damage = (self.player.attack * 2)
+            show("Counterattack successful! You deal {} damage! (Enemy health: {})", damage, max(0, enemy.health - damage))
+            enemy.health -= damage
+            self.enemies.changed(enemy)
+        else:
+            show("Counterattack failed! You missed your chance to attack.")
+
+    def enemy_turn(self):
+        """
+        Each enemy takes a turn to attack the player or pet.
+        A horde (more than batch_size enemies) attacks one kind at a time (see enemy_turn_batched()).
+        """
+        if len(self.enemies) > self.batch_size:
+            return self.enemy_turn_batched()
+
+        for enemy in self.enemies:
+            if not enemy.is_alive():
+                continue  
+
+            target = self.choose_target()  
+            enemy.attack_player(target)
+            if enemy.ability == "drain":
+                self.enemies.changed(enemy)
+
+            # Show updated health for player or pet
+            if target == self.player:
+                show("(Your health: {})", max(0, self.player.health))
+            elif target == self.player.pet:
+                show("({}'s health: {})", self.player.pet.name, max(0, self.player.pet.health))
+
+            if not target.is_alive():
+                if target == self.player:
+                    show("You have been defeated... Game over.")
+                    return True
+                elif target == self.player.pet:
+                    show("{} has fallen in battle!", self.player.pet.name)
+
+        return False  
+
+    def enemy_turn_batched(self):
+        """
+        The enemies' turn against a horde: all the enemies of a kind attack at once, with one summary.
+        Each enemy still rolls for the player or the pet as in enemy_turn(), and the player falls
+        at the attack that takes their health to 0, after which no enemy attacks.
+        """
+        player, pet = self.player, self.player.pet
+        for template, living in self.enemies.groups():
+            count = len(living)
+            on_pet = sum(self.rng.random() < 0.5 for _ in range(count)) if pet else 0  # choose_target() for each
+            on_player = count - on_pet
+            damage = template.attack * (2 if template.ability == "double_attack" else 1)
+            if on_player and damage and damage * on_player >= player.health:
+                on_player = max(1, -(-player.health // damage))  # Up to the attack that takes the player to 0
+            pet_was_alive = pet is not None and pet.is_alive()
+
+            show("{} x{} attack!", template.name, count)
+            if on_player:
+                show("{} hit you for {} damage.", on_player, damage * on_player)
+                player.health -= damage * on_player
+                publish(DamageTaken, player.name, template.name, damage * on_player, player.health)
+            if on_pet:
+                show("{} hit {} for {} damage.", on_pet, pet.name, damage * on_pet)
+                pet.health -= damage * on_pet
+                publish(DamageTaken, pet.name, template.name, damage * on_pet, pet.health)
+
+            if on_player and template.ability == "poison":
+                show("You are poisoned! You will take 3 extra damage for 3 turns.")
+                player.effects.add(player, "poison", 3, stack=False)
+            elif on_player and template.ability == "stun":
+                show("You are stunned! You will miss your next turn.")
+                player.effects.add(player, "stunned", 1, stack=False)
+            elif on_player and template.ability == "fire":
+                show("You are engulfed in flames! You take 5 extra damage for 2 turns.")
+                player.effects.add(player, "burn", 2, stack=False)
+            elif template.ability == "drain":
+                drain_amount = int(template.attack * 0.5)
+                show("The {}s drain {} HP each!", template.name, drain_amount)
+                for enemy in living:
+                    enemy.health += drain_amount
+                    self.enemies.changed(enemy)
+
+            show("(Your health: {})", max(0, player.health))
+            if not player.is_alive():
+                show("You have been defeated... Game over.")
+                return True
+            if pet_was_alive and not pet.is_alive():
+                show("{} has fallen in battle!", pet.name)
+        return False
+
+    def choose_target(self):
+        """
+        Determines if the enemy attacks the player or their pet.
+        """
+        if self.player.pet and self.rng.random() < 0.5:  
+            return self.player.pet
+        return self.player
+
+    def flee(self):
+        """
+        Player attempts to flee from battle. Chance is lower with more enemies.
+        """
+        escape_chance = max(10, 40 - (len(self.enemies) * 10))  
+        show("Escape chance: {}% (More enemies = lower chance)", escape_chance)
+
+        if self.rng.randint(1, 100) <= escape_chance:
+            show("You successfully escaped the battle!")
+            return True
+        else:
+            show("Failed to escape!")
+            return False
+
+    def apply_status_effects(self):
+        """
+        Applies ongoing status effects (Poison, Burn) to the player, their pet and the enemies that have them.
+        """
+        player = self.player
+        effects = player.effects
+        stacks = effects.active.get(player)
+        if stacks:  # Every round of most battles: damage_over_time() inlined
+            for name, label in DAMAGE_OVER_TIME:
+                if name in stacks:
+                    damage = effects.wear(player, name)
+                    if damage:
+                        player.health -= damage
+                        show("{} effect! You take {} extra damage.", label, damage)
+
+        pet = player.pet
+        if pet and pet in effects.active:
+            was_alive = pet.is_alive()
+            self.damage_over_time(effects, pet, "{} effect! {} takes {} damage.", pet.name)
+            if was_alive and not pet.is_alive():
+                show("{} has fallen in battle!", pet.name)
+
+        if not self.enemy_effects.active:
+            return
+        for enemy in list(self.enemy_effects.active):  # Only the enemies with effects
+            if not self.damage_over_time(self.enemy_effects, enemy, "{} effect! {} takes {} damage.", enemy.name):
+                continue
+            if enemy.health <= 0:
+                show("{} has been defeated!", enemy.name)
+                publish(EnemyDefeated, enemy.name, player.name)
+                self.enemies.remove(enemy)
+                self.enemy_effects.clear(enemy)
+            else:
+                self.enemies.changed(enemy)
+
+    @staticmethod
+    def damage_over_time(effects, target, message, *names):
+        """
+        Hurts the target by its poison and burn effects, each of which uses up a turn, showing
+        message (formatted with the effect's label, names and the damage) for each one that hurts.
+        Returns True if any did.
+        """
+        stacks = effects.active.get(target)
+        if not stacks:
+            return False
+        hurt = False
+        for name, label in DAMAGE_OVER_TIME:
+            if name in stacks:
+                damage = effects.wear(target, name)
+                if damage:
+                    target.health -= damage
+                    show(message, label, *names, damage)
+                    hurt = True
+        return hurt
+
+    def pet_turn(self):
+        """
+        If the player has a pet, the pet attacks a random enemy.
+        """
+        if not self.player.pet or not self.enemies:
+            return
+
+        if self.pet_target == "weakest":
+            target = self.enemies.weakest()
+        elif self.pet_target == "threat":
+            target = self.enemies.most_threatening() or self.enemies.weakest()
+        else:
+            target = self.rng.choice(self.enemies)
+        show("{} attacks {} for {} damage!", self.player.pet.name, target.name, self.player.pet.attack)
+        target.health -= self.player.pet.attack
+
+        if target.health <= 0:
+            show("{} has been defeated!", target.name)
+            publish(EnemyDefeated, target.name, self.player.pet.name)
+            self.enemies.remove(target)
+            self.enemy_effects.clear(target)
+        else:
+            self.enemies.changed(target)
+
+    def next_wave(self):
+        """Brings in the next wave of enemies, if there is one. Returns True if one came."""
+        if not self.waves:
+            return False
+        wave = self.waves.pop(0)
+        for enemy in wave:
+            self.enemies.add(enemy)
+        show("\nA new wave of {} enemy(s) arrives!", len(wave))
+        return bool(wave) or self.next_wave()
+
+    def start(self):
+        """
+        Starts the battle loop where the player, pet, and enemies take turns.
+        """
+        show("\nA battle begins! You are facing {} enemy(s)!", len(self.enemies))
+        while self.player.is_alive() and (self.enemies or self.next_wave()):
+            if self.play_round():
+                return
+
+        if self.player.is_alive():
+            show("You won the battle!")
+        else:
+            show("You were defeated...")
+
+    def play_round(self):
+        """
+        Plays one round: status effects, the player's turn, the pet's and the enemies'.
+        Returns True if the battle ended in it (the player fled or fell).
+        """
+        started = timings.start()  # 0 while timing is off, and the laps below are skipped
+        self.apply_status_effects()
+        if started:
+            started = timings.lap("battle.apply_status_effects", started)
+
+        escaped = self.player_turn()
+        if started:
+            started = timings.lap("battle.player_turn", started)
+        if escaped:
+            return True
+
+        self.pet_turn()
+        if started:
+            started = timings.lap("battle.pet_turn", started)
+
+        enemy_won = self.enemy_turn()
+        if started:
+            started = timings.lap("battle.enemy_turn", started)
+        if enemy_won:
+            return True
+
+        self.player.update_buffs()
+        if self.enemy_effects.wheel:  # Nothing to run out otherwise (see StatusEffects.tick())
+            self.enemy_effects.tick()
+        if started:
+            timings.lap("battle.update_buffs", started)
+        return False
@@ -0,0 +1,447 @@
+import argparse
+import math
+import random
+import time
+from enemy import Enemy
+from item import Item
+from pet import Pet
+from player import Player
+from policy import CautiousPolicy
+
+# Player actions of the compact battle model, with the answer Battle.player_turn() expects for each
+ATTACK, COUNTERATTACK, USE_ITEM, FLEE = range(4)
+ACTION_CHOICES = {ATTACK: "1", USE_ITEM: "2", COUNTERATTACK: "3", FLEE: "4"}
+ACTION_NAMES = {ATTACK: "Attack", USE_ITEM: "Use", COUNTERATTACK: "Counterattack", FLEE: "Flee"}
+
+# Outcomes of a battle in the model
+WIN, FLED, DEATH = "win", "flee", "death"
+
+
+def remove(enemies, index):
+    """Removes a defeated enemy as EnemyGroup.remove() does: the last enemy takes its place."""
+    last = enemies.pop()
+    if index < len(enemies):
+        enemies[index] = last
+
+
+class Advice:
+    """The advisor's pick for the current turn, and what the search found out about it."""
+
+    def __init__(self, action, target, item, value, win_chance, simulations, elapsed_ms, name, alternatives):
+        self.action = action  # ATTACK, COUNTERATTACK, USE_ITEM or FLEE
+        self.target = target  # Index in battle.enemies, for ATTACK and COUNTERATTACK
+        self.item = item  # Index in the player's inventory, for USE_ITEM
+        self.value = value  # Mean score of the simulations that started with this action (0 to 1)
+        self.win_chance = win_chance  # Share of those simulations that won the battle
+        self.simulations = simulations
+        self.elapsed_ms = elapsed_ms
+        self.name = name  # The target enemy's or the item's name
+        self.alternatives = alternatives  # [(description, visits, value, win chance)], most visited first
+
+    @property
+    def choice(self):
+        """The answer to Battle.player_turn()'s prompt ("1" to "4")."""
+        return ACTION_CHOICES[self.action]
+
+    def describe(self):
+        """A one-line hint, e.g. "Attack Orc (wins 83% of 1,204 simulated battles)"."""
+        action = ACTION_NAMES[self.action] + (f" {self.name}" if self.name else "")
+        return f"{action} (wins {self.win_chance:.0%} of {self.simulations:,} simulated battles)"
+
+
+class BattleAdvisor:
+    """
+    Picks the player's action in a Battle (attack, use an item, counterattack or flee) and its
+    target, with Monte Carlo tree search over copies of the battle.
+
+    The battle is copied into a compact state, a plain tuple:
+        (health, max health, attack, attack buffs: ((turns, bonus), ...), poison turns, burn turns,
+         enemies: ((kind, health), ...) in battle order, items: count of each kind of item)
+    and step() plays one round from it exactly like Battle.start() does (player, pet, enemies,
+    update_buffs, then the next round's status effects), with the advisor's own random stream,
+    so advising never touches the game's random streams. What Battle never looks at is left out,
+    so more states are the same: defense, luck and stun buffs, gold, and the pet's health (a
+    fallen pet keeps attacking and being attacked).
+
+    Every state met is a node of a transposition table (state -> visit counts and scores per
+    action), so the same state reached by different rolls is searched once. Actions are chosen
+    with UCB1; new states are scored by a quick rollout that attacks the weakest enemy and heals
+    when low. The table is kept for the rest of the battle, so later turns start from what the
+    earlier searches found.
+
+    A simulation scores 0 for death, win_value + health_weight * (health left / max health) for
+    a win and flee_value + health_weight * ... for an escape, minus the price of the items used
+    divided by item_cost (items are worth keeping for later battles).
+    The search stops after budget_ms milliseconds or max_simulations simulations, whichever comes first.
+    """
+
+    def __init__(self, budget_ms=20, max_simulations=None, exploration=0.7, seed=None, max_rounds=60,
+                 max_nodes=200000, win_value=0.6, flee_value=0.25, health_weight=0.4, item_cost=1000):
+        if budget_ms is None and max_simulations is None:
+            raise ValueError("The advisor needs a time budget or a number of simulations.")
+        self.budget_ms = budget_ms
+        self.max_simulations = max_simulations
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.max_rounds = max_rounds  # Simulated rounds before a battle is scored as it stands
+        self.max_nodes = max_nodes
+        self.win_value = win_value
+        self.flee_value = flee_value
+        self.health_weight = health_weight
+        self.item_cost = item_cost
+        self.battle = None  # The battle the table belongs to
+        self.table = {}  # state -> [visits, actions, visits per action, score per action, wins per action]
+
+    def advise(self, battle):
+        """Returns the Advice for the player's turn in battle. Changes nothing in the battle."""
+        started = time.perf_counter()
+        if battle is not self.battle or len(self.table) >= self.max_nodes:
+            self.start_battle(battle)
+        root = self.state_of(battle)
+        if root[0] <= 0 or not root[6]:
+            # Nothing left to decide (a status effect already killed the player): just attack
+            return Advice(ATTACK, 0, None, 0.0, 0.0, 0, 0.0, battle.enemies[0].name if battle.enemies else None, [])
+
+        node = self.table.get(root)
+        if node is None:
+            node = self.table[root] = self.new_node(root)
+        deadline = started + self.budget_ms / 1000 if self.budget_ms is not None else None
+        simulations = 0
+        while True:
+            for _ in range(8):  # Look at the clock every few simulations
+                self.simulate(root)
+            simulations += 8
+            if self.max_simulations is not None and simulations >= self.max_simulations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.advice(battle, node, simulations, (time.perf_counter() - started) * 1000)
+
+    def start_battle(self, battle):
+        """Sets up the kinds of enemies and items of a battle, which the compact states refer to by number."""
+        self.battle = battle
+        self.table = {}
+        self.kinds = []  # Enemy templates
+        self.kind_numbers = {}
+        for enemy in battle.enemies:
+            if enemy.template not in self.kind_numbers:
+                self.kind_numbers[enemy.template] = len(self.kinds)
+                self.kinds.append(enemy.template)
+        self.items = []  # Item templates
+        self.item_numbers = {}
+        for item in battle.player.inventory:
+            if item.template not in self.item_numbers:
+                self.item_numbers[item.template] = len(self.items)
+                self.items.append(item.template)
+        self.heals = sorted((template.value, number) for number, template in enumerate(self.items)
+                            if template.effect == "heal")
+        self.pet_attack = battle.player.pet.attack if battle.player.pet else 0
+        self.has_pet = battle.player.pet is not None
+        self.start_worth = None
+
+    def state_of(self, battle):
+        player = battle.player
+        buffs = player.temporary_buffs
+        counts = [0] * len(self.items)
+        for item in player.inventory:
+            number = self.item_numbers.get(item.template)
+            if number is None:  # Picked up during the battle: start a new table
+                self.start_battle(battle)
+                return self.state_of(battle)
+            counts[number] += 1
+        enemies = []
+        for enemy in battle.enemies:
+            kind = self.kind_numbers.get(enemy.template)
+            if kind is None:  # An enemy joined the battle
+                self.start_battle(battle)
+                return self.state_of(battle)
+            enemies.append((kind, enemy.health))
+        state = (player.health, player.max_health, player.attack, player.effects.stack(player, "attack"), buffs.get("poison", 0),
+                 buffs.get("burn", 0), tuple(enemies), tuple(counts))
+        if self.start_worth is None:
+            self.start_worth = self.worth(state[7])
+        return state
+
+    def worth(self, counts):
+        return sum(count * (self.items[number].price or 0) for number, count in enumerate(counts))
+
+    def legal_actions(self, state):
+        """The actions worth searching: attack or counterattack each different enemy, use each kind of item, flee."""
+        enemies = state[6]
+        actions = []
+        seen = set()
+        for index, enemy in enumerate(enemies):
+            if enemy not in seen:  # Enemies of the same kind and health are the same target
+                seen.add(enemy)
+                actions.append((ATTACK, index))
+                actions.append((COUNTERATTACK, index))
+        for number, count in enumerate(state[7]):
+            if count:
+                actions.append((USE_ITEM, number))
+        actions.append((FLEE, None))
+        return actions
+
+    def new_node(self, state):
+        actions = self.legal_actions(state)
+        self.rng.shuffle(actions)  # Untried actions are tried in this order
+        size = len(actions)
+        return [0, actions, [0] * size, [0.0] * size, [0] * size]
+
+    def simulate(self, root):
+        """One simulation: down the tree with UCB1, a rollout from the first new state, then the scores back up."""
+        table = self.table
+        rng = self.rng
+        path = []
+        state = root
+        rounds = 0
+        while True:
+            node = table.get(state)
+            if node is None:
+                if len(table) < self.max_nodes:
+                    table[state] = self.new_node(state)
+                score, won = self.rollout(state, rounds)
+                break
+            choice = self.select(node)
+            path.append((node, choice))
+            result = self.step(state, node[1][choice], rng)
+            rounds += 1
+            if len(result) == 4:  # The battle ended: (outcome, health, max health, item counts)
+                score, won = self.score(*result)
+                break
+            if rounds >= self.max_rounds:
+                score, won = self.estimate(result), False
+                break
+            state = result
+
+        for node, choice in path:
+            node[0] += 1
+            node[2][choice] += 1
+            node[3][choice] += score
+            node[4][choice] += won
+
+    def select(self, node):
+        visits, actions, counts, scores, _ = node
+        log_visits = math.log(visits or 1)
+        exploration = self.exploration
+        best, best_value = 0, -1.0
+        for choice, count in enumerate(counts):
+            if not count:  # Untried (a state met twice in one simulation can leave one behind)
+                return choice
+            value = scores[choice] / count + exploration * math.sqrt(log_visits / count)
+            if value > best_value:
+                best, best_value = choice, value
+        return best
+
+    def rollout(self, state, rounds):
+        """Plays the battle out with a quick policy and returns (score, won)."""
+        rng = self.rng
+        while rounds < self.max_rounds:
+            result = self.step(state, self.rollout_action(state, rng), rng)
+            rounds += 1
+            if len(result) == 4:
+                return self.score(*result)
+            state = result
+        return self.estimate(state), False
+
+    def rollout_action(self, state, rng):
+        health, max_health, _, _, _, _, enemies, counts = state
+        if health * 3 < max_health:
+            for _, number in self.heals:
+                if counts[number]:
+                    return (USE_ITEM, number)
+        if rng.random() < 0.1:
+            return (COUNTERATTACK if rng.random() < 0.8 else FLEE, rng.randrange(len(enemies)))
+        weakest = min(range(len(enemies)), key=lambda index: enemies[index][1])
+        return (ATTACK, weakest)
+
+    def step(self, state, action, rng):
+        """
+        Plays one round of Battle.start() from state (the player's turn onwards) and returns the
+        next state, or (outcome, health, max health, item counts) once the battle is over.
+        """
+        health, max_health, attack, attack_buffs, poison, burn, enemies, counts = state
+        enemies = list(enemies)
+        kind, argument = action
+
+        # Battle.player_turn()
+        if kind == ATTACK:
+            enemy_kind, enemy_health = enemies[argument]
+            enemy_health -= attack + sum(bonus for _, bonus in attack_buffs)
+            if enemy_health <= 0:
+                remove(enemies, argument)
+            else:
+                enemies[argument] = (enemy_kind, enemy_health)
+        elif kind == COUNTERATTACK:
+            if rng.random() < 0.5:  # A counterattack never removes the enemy, even at 0 health
+                enemy_kind, enemy_health = enemies[argument]
+                enemies[argument] = (enemy_kind, enemy_health - attack * 2)
+        elif kind == USE_ITEM:
+            counts = counts[:argument] + (counts[argument] - 1,) + counts[argument + 1:]
+            item = self.items[argument]
+            if item.effect == "heal":
+                health = min(health + item.value, max_health)
+            elif item.effect == "attack":  # Stacks with the buffs already running
+                attack_buffs = tuple(sorted(attack_buffs + ((item.duration, item.value),)))
+            elif item.effect == "max_health":
+                max_health += item.value
+                health += item.value
+            elif item.effect == "remove_poison":
+                poison = 0
+            elif item.effect == "remove_burn":
+                burn = 0
+        elif rng.randint(1, 100) <= max(10, 40 - len(enemies) * 10):
+            return (FLED, health, max_health, counts)
+
+        # Battle.pet_turn()
+        if self.has_pet and enemies:
+            index = rng.randrange(len(enemies))
+            enemy_kind, enemy_health = enemies[index]
+            enemy_health -= self.pet_attack
+            if enemy_health <= 0:
+                remove(enemies, index)
+            else:
+                enemies[index] = (enemy_kind, enemy_health)
+
+        # Battle.enemy_turn()
+        kinds = self.kinds
+        for index in range(len(enemies)):
+            enemy_kind, enemy_health = enemies[index]
+            if enemy_health <= 0:
+                continue
+            template = kinds[enemy_kind]
+            damage = template.attack
+            ability = template.ability
+            if self.has_pet and rng.random() < 0.5:  # The pet takes the hit
+                if ability == "drain":
+                    enemies[index] = (enemy_kind, enemy_health + int(damage * 0.5))
+                continue
+            health -= damage
+            if ability == "poison":
+                poison = 3
+            elif ability == "drain":
+                enemies[index] = (enemy_kind, enemy_health + int(damage * 0.5))
+            elif ability == "fire":
+                burn = 2
+            elif ability == "double_attack":
+                health -= damage
+            if health <= 0:
+                return (DEATH, health, max_health, counts)
+
+        # Player.update_buffs()
+        attack_buffs = tuple((turns - 1, bonus) for turns, bonus in attack_buffs if turns > 1)
+        poison = poison - 1 if poison > 0 else 0
+        burn = burn - 1 if burn > 0 else 0
+        if not enemies:
+            return (WIN, health, max_health, counts)
+
+        # The next round's Battle.apply_status_effects(): dying there still leaves the player a turn, but no way out
+        if poison > 0:
+            health -= 3
+            poison -= 1
+        if burn > 0:
+            health -= 5
+            burn -= 1
+        if health <= 0:
+            return (DEATH, health, max_health, counts)
+        return (health, max_health, attack, attack_buffs, poison, burn, tuple(enemies), counts)
+
+    def score(self, outcome, health, max_health, counts):
+        """Returns (score, won) of a finished battle."""
+        if outcome == DEATH:
+            return 0.0, False
+        score = (self.win_value if outcome == WIN else self.flee_value) + self.health_weight * health / max_health
+        if self.item_cost:
+            score -= (self.start_worth - self.worth(counts)) / self.item_cost
+        return score, outcome == WIN
+
+    def estimate(self, state):
+        """The score of a battle still going after max_rounds: half a win at the health left."""
+        return 0.5 * (self.win_value + self.health_weight * state[0] / state[1])
+
+    def advice(self, battle, node, simulations, elapsed_ms):
+        _, actions, counts, scores, wins = node
+        order = sorted(range(len(actions)), key=lambda choice: counts[choice], reverse=True)
+        alternatives = []
+        for choice in order:
+            if counts[choice]:
+                alternatives.append((self.describe(battle, actions[choice]), counts[choice],
+                                     scores[choice] / counts[choice], wins[choice] / counts[choice]))
+        best = order[0]
+        kind, argument = actions[best]
+        target = item = name = None
+        if kind in (ATTACK, COUNTERATTACK):
+            target = argument
+            name = battle.enemies[argument].name
+        elif kind == USE_ITEM:
+            template = self.items[argument]
+            item = next(index for index, owned in enumerate(battle.player.inventory) if owned.template is template)
+            name = template.name
+        visits = counts[best] or 1
+        return Advice(kind, target, item, scores[best] / visits, wins[best] / visits, simulations, elapsed_ms, name,
+                      alternatives)
+
+    def describe(self, battle, action):
+        kind, argument = action
+        if kind in (ATTACK, COUNTERATTACK):
+            return f"{ACTION_NAMES[kind]} {battle.enemies[argument].name} ({battle.enemies[argument].health} HP)"
+        if kind == USE_ITEM:
+            return f"{ACTION_NAMES[kind]} {self.items[argument].name}"
+        return ACTION_NAMES[kind]
+
+
+class AdvisorPolicy(CautiousPolicy):
+    """
+    A bot that fights with the BattleAdvisor, and otherwise plays like CautiousPolicy.
+    By default each decision gets a fixed number of simulations, so the same game always plays
+    the same way; pass budget_ms to limit each decision's time instead.
+    """
+
+    def __init__(self, rng=None, budget_ms=None, max_simulations=400):
+        super().__init__(rng=rng)
+        self.advisor = BattleAdvisor(budget_ms, max_simulations, seed=self.rng.random())
+        self.advice = None
+
+    def choose_battle_action(self, battle):
+        self.advice = self.advisor.advise(battle)
+        return self.advice.choice
+
+    def choose_enemy(self, battle):
+        if self.advice is not None and self.advice.target is not None and self.advice.target < len(battle.enemies):
+            return str(self.advice.target + 1)
+        return super().choose_enemy(battle)
+
+    def choose_item(self, player):
+        if self.advice is not None and self.advice.item is not None:
+            return str(self.advice.item + 1)
+        return super().choose_item(player)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ask the battle advisor about a fight and show what it found.")
+    parser.add_argument("enemies", nargs="*", default=["Orc"], help="enemy names, e.g. Orc Goblin Goblin")
+    parser.add_argument("--health", type=int, default=100, help="the player's health")
+    parser.add_argument("--pet", help="the name of the player's pet")
+    parser.add_argument("--items", nargs="*", default=["Small Healing Potion"], help="item names in the inventory")
+    parser.add_argument("--budget-ms", type=float, default=50, help="search time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from battle import Battle  # Only to build the battle to ask about
+    enemies = {template.name: template for template in Enemy.TEMPLATES}
+    items = {template.name: template for template in Item.TEMPLATES}
+    pets = {template.name: template for template in Pet.TEMPLATES}
+    player = Player("Hero", 100, 10)
+    player.health = args.health
+    player.inventory = [Item.from_template(items[name]) for name in args.items]
+    if args.pet:
+        player.pet = Pet.from_template(pets[args.pet])
+    battle = Battle(player, [Enemy.from_template(enemies[name]) for name in args.enemies])
+
+    advice = BattleAdvisor(args.budget_ms, seed=args.seed).advise(battle)
+    print(f"Advice: {advice.describe()} in {advice.elapsed_ms:.1f} ms")
+    print(f"{'Action':<40} {'Visits':>8} {'Score':>7} {'Wins':>6}")
+    for description, visits, value, win_chance in advice.alternatives:
+        print(f"{description:<40} {visits:>8,} {value:>7.3f} {win_chance:>6.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import argparse
+import time
+import numpy as np
+from battle import Battle
+from enemy import Enemy
+from output import NullOutput, use_output
+from pet import Pet
+from player import Player
+from policy import StrategyPolicy, normalize_strategy
+from rng import RandomStreams
+
+# Outcome codes stored in BattleStats.outcome
+WIN, FLEE, DEATH, TIMEOUT = 0, 1, 2, 3
+OUTCOME_NAMES = {WIN: "win", FLEE: "flee", DEATH: "death", TIMEOUT: "timeout"}
+
+class BattleStats:
+    """The results of many simulated fights, one array entry per fight."""
+
+    def __init__(self, outcome, hp_lost, rounds, gold):
+        self.outcome = outcome
+        self.hp_lost = hp_lost
+        self.rounds = rounds
+        self.gold = gold
+
+    def rate(self, outcome):
+        """Returns the fraction of fights that ended with the given outcome code."""
+        return float(np.mean(self.outcome == outcome)) if len(self.outcome) else 0.0
+
+    def hp_lost_percentiles(self, percentiles=(5, 25, 50, 75, 95)):
+        """Returns {percentile: HP lost} over all fights."""
+        values = np.percentile(self.hp_lost, percentiles)
+        return {p: float(v) for p, v in zip(percentiles, values)}
+
+    def to_dict(self):
+        """Summarizes the fights into a dictionary (for JSON reports)."""
+        return {
+            "fights": int(len(self.outcome)),
+            "win_rate": self.rate(WIN),
+            "flee_rate": self.rate(FLEE),
+            "death_rate": self.rate(DEATH),
+            "timeout_rate": self.rate(TIMEOUT),
+            "avg_hp_lost": float(np.mean(self.hp_lost)),
+            "avg_rounds": float(np.mean(self.rounds)),
+            "avg_gold": float(np.mean(self.gold)),
+            "hp_lost_percentiles": self.hp_lost_percentiles()
+        }
+
+
+def simulate_battles(player, enemy, num_fights, strategy=None, seed=None, max_rounds=200):
+    """
+    Plays num_fights independent fights of the player (and pet) against copies of one enemy,
+    all at once as NumPy arrays, following the same rules as Battle.start():
+    status effects, the player's action, the pet's attack, the enemy's attack and ability, buff decay.
+    The player picks actions at random with the strategy's weights (using items is not simulated).
+    Fights still going after max_rounds are reported as TIMEOUT.
+    """
+    strategy = normalize_strategy(strategy)
+    rng = np.random.default_rng(seed)
+    n = num_fights
+    buffs = player.temporary_buffs
+    attack_buffs = player.effects.stack(player, "attack")
+    longest_buff = buffs.get("attack", 0)
+    pet = player.pet
+
+    php = np.full(n, player.health, dtype=np.int32)
+    ehp = np.full(n, enemy.health, dtype=np.int32)
+    pet_hp = np.full(n, pet.health if pet else 0, dtype=np.int32)
+    attack_buff = np.full(n, buffs.get("attack", 0), dtype=np.int32)
+    poison = np.full(n, buffs.get("poison", 0), dtype=np.int32)
+    burn = np.full(n, buffs.get("burn", 0), dtype=np.int32)
+    stunned = np.full(n, buffs.get("stunned", 0), dtype=np.int32)
+    removed = np.zeros(n, dtype=bool)  # Enemy taken out of the battle (a counterattack kill leaves it in)
+    fled = np.zeros(n, dtype=bool)
+    gold = np.zeros(n, dtype=np.int32)
+    rounds = np.zeros(n, dtype=np.int32)
+    active = php > 0
+
+    attack_cutoff = strategy["attack"]
+    counter_cutoff = attack_cutoff + strategy["counterattack"]
+    escape_chance = max(10, 40 - 1 * 10) / 100  # Battle.flee() with a single enemy
+    enemy_damage = enemy.attack * (2 if enemy.ability == "double_attack" else 1)
+    drain = int(enemy.attack * 0.5)
+    # Without attacks, pet or fleeing, a counterattack kill leaves the enemy in the battle forever
+    can_get_stuck = not pet and attack_cutoff == 0 and counter_cutoff == 1
+
+    # Final state of every fight, filled in as fights finish
+    final_php = np.empty(num_fights, dtype=np.int32)
+    final_removed = np.empty(num_fights, dtype=bool)
+    final_fled = np.empty(num_fights, dtype=bool)
+    final_gold = np.empty(num_fights, dtype=np.int32)
+    final_rounds = np.empty(num_fights, dtype=np.int32)
+    ids = np.arange(num_fights)
+
+    for _ in range(max_rounds):
+        # Once a quarter of the fights are over, keep working only on the ones still going
+        still_going = int(np.count_nonzero(active))
+        if still_going * 4 <= n * 3:
+            done = ~active
+            final = ids[done]
+            final_php[final], final_removed[final], final_fled[final] = php[done], removed[done], fled[done]
+            final_gold[final], final_rounds[final] = gold[done], rounds[done]
+            if not still_going:
+                break
+            ids = ids[active]
+            php, ehp, pet_hp = php[active], ehp[active], pet_hp[active]
+            attack_buff, poison, burn, stunned = attack_buff[active], poison[active], burn[active], stunned[active]
+            removed, fled, gold, rounds = removed[active], fled[active], gold[active], rounds[active]
+            active = active[active]
+            n = still_going
+        rounds += active
+
+        # Status effects (Battle.apply_status_effects)
+        hurt = active & (poison > 0)
+        php -= 3 * hurt
+        poison -= hurt
+        hurt = active & (burn > 0)
+        php -= 5 * hurt
+        burn -= hurt
+
+        # Player's action (Battle.player_turn)
+        roll = rng.random(n, dtype=np.float32)
+        luck = rng.random(n, dtype=np.float32)  # Counterattack success or escape roll
+        attacking = active & (roll < attack_cutoff)
+        countering = active & (roll >= attack_cutoff) & (roll < counter_cutoff)
+        fleeing = active & (roll >= counter_cutoff)
+
+        bonus = sum(magnitude * (attack_buff > longest_buff - turns) for turns, magnitude in attack_buffs)
+        ehp -= attacking * (player.attack + bonus)
+        killed = attacking & (ehp <= 0)
+        removed |= killed
+        gold[killed] += rng.integers(10, 51, int(np.count_nonzero(killed)), dtype=np.int32)
+
+        ehp -= (countering & (luck < 0.5)) * (player.attack * 2)
+
+        escaped = fleeing & (luck < escape_chance)
+        fled |= escaped
+        active &= ~escaped
+
+        # Pet's attack (Battle.pet_turn); like the game, a fallen pet keeps attacking
+        if pet:
+            bitten = active & ~removed
+            ehp -= bitten * pet.attack
+            removed |= bitten & (ehp <= 0)
+
+        # Enemy's attack (Battle.enemy_turn and Enemy.attack_player)
+        attacking_enemy = active & ~removed & (ehp > 0)
+        if pet:
+            on_pet = attacking_enemy & (rng.random(n, dtype=np.float32) < 0.5)
+            on_player = attacking_enemy & ~on_pet
+            pet_hp -= on_pet * enemy_damage
+        else:
+            on_player = attacking_enemy
+        php -= on_player * enemy_damage
+
+        if enemy.ability == "poison":
+            poison[on_player] = 3
+        elif enemy.ability == "stun":
+            stunned[on_player] = 1
+        elif enemy.ability == "fire":
+            burn[on_player] = 2
+        elif enemy.ability == "drain":
+            ehp += attacking_enemy * drain
+
+        # Battle ends at once if the enemy's hit killed the player
+        active &= ~(on_player & (php <= 0))
+
+        # Buff decay (Player.update_buffs)
+        for counter in (attack_buff, poison, burn, stunned):
+            counter -= active & (counter > 0)
+
+        active &= (php > 0) & ~removed
+        if can_get_stuck:
+            active &= ~((ehp <= 0) & (poison == 0) & (burn == 0))
+
+    final_php[ids], final_removed[ids], final_fled[ids] = php, removed, fled
+    final_gold[ids], final_rounds[ids] = gold, rounds
+
+    outcome = np.full(num_fights, TIMEOUT, dtype=np.int8)
+    outcome[final_removed] = WIN
+    outcome[final_fled] = FLEE
+    outcome[final_php <= 0] = DEATH
+    hp_lost = player.health - np.maximum(final_php, 0)
+    return BattleStats(outcome, hp_lost, final_rounds, final_gold)
+
+
+def simulate_battles_scalar(player, enemy, num_fights, strategy=None, seed=None):
+    """
+    Plays the same fights one at a time through the real Battle class.
+    This is the reference that simulate_battles() must match (and is much slower).
+    Note that a pure counterattack strategy without a pet can loop forever here, because a
+    counterattack never removes the enemy it kills.
+    """
+    strategy = normalize_strategy(strategy)
+    streams = RandomStreams(seed)
+    policy = StrategyPolicy(strategy, rng=streams.derive("policy"))
+    outcome = np.empty(num_fights, dtype=np.int8)
+    hp_lost = np.empty(num_fights, dtype=np.int64)
+    rounds = np.zeros(num_fights, dtype=np.int64)
+    gold = np.empty(num_fights, dtype=np.int64)
+
+    with use_output(NullOutput()):
+        for i in range(num_fights):
+            fighter = Player.from_dict(player.to_dict())
+            fighter.policy = policy
+            foe = Enemy.from_dict(enemy.to_dict())
+            battle = Battle(fighter, [foe], rng=streams.combat)
+            battle.start()
+
+            if not fighter.is_alive():
+                outcome[i] = DEATH
+            elif battle.enemies:
+                outcome[i] = FLEE
+            else:
+                outcome[i] = WIN
+            hp_lost[i] = player.health - max(fighter.health, 0)
+            gold[i] = fighter.gold - player.gold
+
+    return BattleStats(outcome, hp_lost, rounds, gold)
+
+
+def simulate_all_enemies(player, num_fights, strategy=None, seed=None):
+    """Returns {enemy name: BattleStats} for every enemy template."""
+    results = {}
+    for i, data in enumerate(Enemy.ENEMY_TYPES):
+        enemy = Enemy(data["name"], data["health"], data["attack"], data["ability"])
+        results[data["name"]] = simulate_battles(player, enemy, num_fights, strategy, None if seed is None else seed + i)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Win rates and HP loss of a player build against every enemy.")
+    parser.add_argument("--fights", type=int, default=100000, help="fights per enemy")
+    parser.add_argument("--health", type=int, default=100)
+    parser.add_argument("--attack", type=int, default=10)
+    parser.add_argument("--pet", choices=[pet["name"] for pet in Pet.PET_TYPES], help="give the player this pet")
+    parser.add_argument("--flee", type=float, default=0.0, help="chance of trying to flee each turn")
+    parser.add_argument("--counter", type=float, default=0.0, help="chance of counterattacking each turn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, metavar="N", help="also play N fights per enemy with the real Battle class")
+    args = parser.parse_args()
+
+    player = Player("Sim", args.health, args.attack)
+    if args.pet:
+        data = next(pet for pet in Pet.PET_TYPES if pet["name"] == args.pet)
+        player.pet = Pet(data["name"], data["health"], data["attack"])
+    strategy = {"attack": max(0.0, 1 - args.flee - args.counter), "counterattack": args.counter, "flee": args.flee}
+
+    print(f"{'Enemy':<16} {'win':>6} {'flee':>6} {'death':>6} {'hp lost':>8} {'p95':>5}")
+    start = time.perf_counter()
+    results = simulate_all_enemies(player, args.fights, strategy, args.seed)
+    vector_time = time.perf_counter() - start
+    for name, stats in results.items():
+        summary = stats.to_dict()
+        print(f"{name:<16} {summary['win_rate']:>6.1%} {summary['flee_rate']:>6.1%} {summary['death_rate']:>6.1%} "
+              f"{summary['avg_hp_lost']:>8.1f} {summary['hp_lost_percentiles'][95]:>5.0f}")
+    total = args.fights * len(results)
+    print(f"\nVectorized: {total} fights in {vector_time:.2f}s ({total / vector_time:.0f} fights/s)")
+
+    if args.check:
+        print(f"\nReal Battle class, {args.check} fights per enemy:")
+        start = time.perf_counter()
+        for i, data in enumerate(Enemy.ENEMY_TYPES):
+            enemy = Enemy(data["name"], data["health"], data["attack"], data["ability"])
+            summary = simulate_battles_scalar(player, enemy, args.check, strategy, args.seed + i).to_dict()
+            print(f"{data['name']:<16} {summary['win_rate']:>6.1%} {summary['flee_rate']:>6.1%} {summary['death_rate']:>6.1%} "
+                  f"{summary['avg_hp_lost']:>8.1f} {summary['hp_lost_percentiles'][95]:>5.0f}")
+        scalar_time = time.perf_counter() - start
+        scalar_total = args.check * len(Enemy.ENEMY_TYPES)
+        print(f"\nBattle class: {scalar_total} fights in {scalar_time:.2f}s ({scalar_total / scalar_time:.0f} fights/s)")
+        print(f"Speedup: {(total / vector_time) / (scalar_total / scalar_time):.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import argparse
+import time
+from enemy import Enemy
+from pet import Pet
+from player import Player
+from policy import normalize_strategy
+from status_effects import stack_bonus
+
+class BattleOdds:
+    """Exact outcome of a one-on-one battle, as probabilities."""
+
+    def __init__(self, win, flee, death, expected_health):
+        self.win = win
+        self.flee = flee
+        self.death = death
+        self.stuck = max(0.0, 1.0 - win - flee - death)  # Battles that never end (see BattleSolver)
+        self.expected_health = expected_health  # Player health left at the end (0 when dead)
+
+    def to_dict(self):
+        """Converts the odds into a dictionary (for JSON reports and UI hints)."""
+        return {
+            "win": self.win,
+            "flee": self.flee,
+            "death": self.death,
+            "stuck": self.stuck,
+            "expected_health": self.expected_health
+        }
+
+
+class BattleSolver:
+    """
+    Computes the exact win, flee and death probabilities of Battle.start() for a player
+    (and optional pet) against one enemy, when the player picks actions at random with
+    fixed weights (see policy.normalize_strategy).
+
+    The battle is a Markov chain over the state at the start of each round:
+    (player health, enemy health, poison turns, burn turns, attack buff turns).
+    The attack buffs' bonuses are fixed for a battle and part of the cache key: the state counts
+    down the longest buff, and the others run out the same number of rounds before it.
+    Every solved state is kept in a cache shared by all queries with the same fighters,
+    so repeated questions (and any state met along the way) are answered by a dict lookup.
+
+    What is left out of the state, because Battle never looks at it:
+    - the pet's health (a fallen pet keeps attacking and being attacked)
+    - the stun counter (being stunned does not skip the player's turn)
+    - enemy health below 0 (a counterattack kill leaves the enemy in the battle at "0")
+    A Dark Mage draining a weak pet can heal without limit in theory; its health is capped at
+    twice its starting health, which only affects paths that are astronomically unlikely.
+    """
+
+    def __init__(self):
+        self.cache = {}  # fighters -> {state: (win, flee, death, expected health)}
+
+    def solve(self, player, enemy, strategy=None):
+        """Returns the BattleOdds of the player (and pet) against the enemy from their current state."""
+        fighters = self.fighters(player, enemy, strategy)
+        buffs = player.temporary_buffs
+        state = (player.health, max(0, enemy.health), buffs.get("poison", 0), buffs.get("burn", 0), buffs.get("attack", 0))
+        if player.health <= 0:
+            return BattleOdds(0.0, 0.0, 1.0, 0.0)
+
+        values = self.cache.setdefault(fighters, {})
+        if state not in values:
+            self.solve_from(fighters, state, values)
+        return BattleOdds(*values[state])
+
+    def fighters(self, player, enemy, strategy):
+        """Everything that stays fixed during a battle, used as the cache key."""
+        strategy = normalize_strategy(strategy)
+        health_cap = None
+        if enemy.ability == "drain":
+            template = next((data for data in Enemy.ENEMY_TYPES if data["name"] == enemy.name), None)
+            health_cap = 2 * (template["health"] if template else enemy.health)
+        pet_attack = player.pet.attack if player.pet else None
+        attack_buffs = player.effects.stack(player, "attack")  # The state counts down the longest one
+        return (player.attack, enemy.attack, enemy.ability, pet_attack,
+                strategy["attack"], strategy["counterattack"], strategy["flee"], health_cap, attack_buffs)
+
+    def solve_from(self, fighters, start, values):
+        """Solves every state reachable from start that is not in the cache yet."""
+        # Collect the reachable states and their transitions
+        graph = {}
+        pending = [start]
+        while pending:
+            state = pending.pop()
+            if state in graph or state in values:
+                continue
+            graph[state] = self.transitions(fighters, state)
+            for _, next_state in graph[state][1]:
+                if next_state not in graph and next_state not in values:
+                    pending.append(next_state)
+
+        # Later states almost always have less health or fewer turns left, so solving in this order
+        # gets the answer in a single sweep; extra sweeps only matter for the rare cycles (drain)
+        order = sorted(graph)
+        solved = {state: (0.0, 0.0, 0.0, 0.0) for state in order}
+        for _ in range(10000):
+            largest_change = 0.0
+            for state in order:
+                terminal, moves, self_chance = graph[state]
+                win, flee, death, health = terminal
+                for chance, next_state in moves:
+                    next_value = solved.get(next_state) or values[next_state]
+                    win += chance * next_value[0]
+                    flee += chance * next_value[1]
+                    death += chance * next_value[2]
+                    health += chance * next_value[3]
+                if self_chance < 1.0:
+                    scale = 1.0 / (1.0 - self_chance)
+                    value = (win * scale, flee * scale, death * scale, health * scale)
+                else:
+                    value = (0.0, 0.0, 0.0, 0.0)  # The battle can never end from here
+                old = solved[state]
+                largest_change = max(largest_change, abs(value[0] - old[0]), abs(value[2] - old[2]))
+                solved[state] = value
+            if largest_change < 1e-13:
+                break
+        values.update(solved)
+
+    def transitions(self, fighters, state):
+        """
+        Plays one round of Battle.start() from state and returns
+        (terminal outcome weights, [(chance, next state)], chance of staying in the same state).
+        """
+        player_attack, enemy_attack, ability, pet_attack, attack_chance, counter_chance, flee_chance, health_cap, \
+            attack_buffs = fighters
+        health, enemy_health, poison, burn, attack_buff = state
+        terminal = [0.0, 0.0, 0.0, 0.0]
+        moves = {}
+
+        def end(chance, health, fled=False):
+            if health <= 0:
+                terminal[2] += chance
+            else:
+                terminal[1 if fled else 0] += chance
+                terminal[3] += chance * health
+
+        def next_round(chance, health, enemy_health, poison, burn):
+            # Player.update_buffs(), then the battle loop checks if the player is still alive
+            if health <= 0:
+                end(chance, health)
+                return
+            if health_cap:
+                enemy_health = min(enemy_health, health_cap)
+            key = (health, max(0, enemy_health), max(0, poison - 1), max(0, burn - 1), max(0, attack_buff - 1))
+            moves[key] = moves.get(key, 0.0) + chance
+
+        # Battle.apply_status_effects()
+        if poison > 0:
+            health -= 3
+            poison -= 1
+        if burn > 0:
+            health -= 5
+            burn -= 1
+
+        # Battle.player_turn(): (chance, enemy health, enemy removed)
+        actions = []
+        if attack_chance:
+            hit = enemy_health - player_attack - stack_bonus(attack_buffs, attack_buff)
+            actions.append((attack_chance, hit, hit <= 0))
+        if counter_chance:
+            actions.append((counter_chance * 0.5, enemy_health - player_attack * 2, False))
+            actions.append((counter_chance * 0.5, enemy_health, False))
+        if flee_chance:
+            escape = max(10, 40 - 1 * 10) / 100  # Battle.flee() with a single enemy
+            end(flee_chance * escape, health, fled=True)
+            actions.append((flee_chance * (1 - escape), enemy_health, False))
+
+        for chance, enemy_health, removed in actions:
+            if removed:
+                end(chance, health)
+                continue
+
+            # Battle.pet_turn()
+            if pet_attack is not None:
+                enemy_health -= pet_attack
+                if enemy_health <= 0:
+                    end(chance, health)
+                    continue
+
+            # Battle.enemy_turn(): a counterattack kill leaves a dead enemy that does nothing
+            if enemy_health <= 0:
+                next_round(chance, health, enemy_health, poison, burn)
+                continue
+
+            drain = int(enemy_attack * 0.5) if ability == "drain" else 0
+            on_player = chance
+            if pet_attack is not None:
+                on_player = chance * 0.5
+                next_round(chance * 0.5, health, enemy_health + drain, poison, burn)
+
+            damage = enemy_attack * (2 if ability == "double_attack" else 1)
+            if health - damage <= 0:
+                end(on_player, health - damage)
+                continue
+            next_round(on_player, health - damage, enemy_health + drain,
+                       3 if ability == "poison" else poison,
+                       2 if ability == "fire" else burn)
+
+        self_chance = moves.pop(state, 0.0)
+        return tuple(terminal), [(chance, key) for key, chance in moves.items()], self_chance
+
+    def clear(self):
+        """Forgets every solved state."""
+        self.cache.clear()
+
+    def cached_states(self):
+        """Returns how many solved states are in the cache."""
+        return sum(len(values) for values in self.cache.values())
+
+
+# Shared by every caller, so UI hints and balance tools reuse each other's work
+default_solver = BattleSolver()
+
+def solve_battle(player, enemy, strategy=None):
+    """Returns the exact BattleOdds of the player (and pet) against the enemy, using the shared cache."""
+    return default_solver.solve(player, enemy, strategy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact battle odds of a player build against every enemy.")
+    parser.add_argument("--health", type=int, default=100)
+    parser.add_argument("--attack", type=int, default=10)
+    parser.add_argument("--pet", choices=[pet["name"] for pet in Pet.PET_TYPES], help="give the player this pet")
+    parser.add_argument("--flee", type=float, default=0.0, help="chance of trying to flee each turn")
+    parser.add_argument("--counter", type=float, default=0.0, help="chance of counterattacking each turn")
+    args = parser.parse_args()
+
+    player = Player("Solver", args.health, args.attack)
+    if args.pet:
+        data = next(pet for pet in Pet.PET_TYPES if pet["name"] == args.pet)
+        player.pet = Pet(data["name"], data["health"], data["attack"])
+    strategy = {"attack": max(0.0, 1 - args.flee - args.counter), "counterattack": args.counter, "flee": args.flee}
+
+    print(f"{'Enemy':<16} {'win':>8} {'flee':>8} {'death':>8} {'health left':>12} {'first':>9} {'cached':>9}")
+    for data in Enemy.ENEMY_TYPES:
+        enemy = Enemy(data["name"], data["health"], data["attack"], data["ability"])
+        start = time.perf_counter()
+        odds = solve_battle(player, enemy, strategy)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        solve_battle(player, enemy, strategy)
+        cached = time.perf_counter() - start
+        print(f"{data['name']:<16} {odds.win:>8.4%} {odds.flee:>8.4%} {odds.death:>8.4%} {odds.expected_health:>12.2f} "
+              f"{first * 1000:>7.1f}ms {cached * 1e6:>7.1f}us")
+    print(f"\nStates in cache: {default_solver.cached_states()}")
+
+if __name__ == "__main__":
+    main()
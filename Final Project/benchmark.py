@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from battle import Battle
+from dungeon import Dungeon
+from enemy import Enemy
+from item import Item
+from output import NullOutput, use_output
+from path_oracle import PathOracle
+from pet import Pet
+from player import Player
+from policy import StrategyPolicy
+from rng import RandomStreams
+from room import Room
+from save_system import SaveSystem
+from spawn_tables import load_tables
+from vendor import Vendor
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+def calibration():
+    """
+    A fixed piece of the interpreter work the game is made of (calls, dict and attribute access,
+    small lists). Every benchmark is timed against it, in the same process and right next to it,
+    so a cost measured in calibration loops stays the same on a faster or busier machine.
+    """
+    counts = {}
+    parts = []
+    for i in range(100):
+        key = i & 7
+        counts[key] = counts.get(key, 0) + 1
+        parts.append(abs(i - 50))
+    return max(parts) + len(counts)
+
+class Benchmark:
+    """
+    One measured operation. setup() builds what the operation needs (not timed) and returns
+    a function that performs the operation once; that function is then called in a loop.
+    """
+
+    def __init__(self, name, setup, description):
+        self.name = name
+        self.setup = setup
+        self.description = description
+
+    def run(self, min_time=0.1, repeats=9):
+        """
+        Returns {"ops_per_sec", "cost", "fastest_cost", "peak_kb"}. Each of repeats timed loops of at
+        least min_time seconds runs between two calibration loops, and gives the cost of one call in
+        calibration loops: cost is the median of those, fastest_cost the lowest, and ops_per_sec the
+        median speed on this machine (for information). peak_kb is the peak memory allocated by one
+        call (tracemalloc), or None if it is not the same on every call (a new random dungeon, a
+        battle that goes differently), as such a peak cannot be compared.
+        """
+        operation = self.setup()
+        operation()  # Warm up caches and lazy imports
+        loops = self.loops_for(operation, min_time)
+        calibration_loops = self.loops_for(calibration, min_time / 4)
+
+        calibrated = self.time_loops(calibration, calibration_loops) / calibration_loops
+        costs, times = [], []
+        for _ in range(repeats):
+            elapsed = self.time_loops(operation, loops) / loops
+            after = self.time_loops(calibration, calibration_loops) / calibration_loops
+            costs.append(elapsed / ((calibrated + after) / 2))  # The machine's speed around this loop
+            times.append(elapsed)
+            calibrated = after
+
+        peaks = set()
+        for _ in range(3):
+            tracemalloc.start()
+            operation()
+            peaks.add(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return {"ops_per_sec": round(1 / statistics.median(times), 2), "cost": round(statistics.median(costs), 3),
+                "fastest_cost": round(min(costs), 3),
+                "peak_kb": round(peaks.pop() / 1024, 1) if len(peaks) == 1 else None}
+
+    @classmethod
+    def loops_for(cls, operation, min_time):
+        """Returns how many calls of operation take at least min_time seconds."""
+        loops = 1
+        while True:
+            elapsed = cls.time_loops(operation, loops)
+            if elapsed >= min_time / 4 or loops >= 1 << 24:
+                break
+            loops *= 4
+        return max(1, int(loops * min_time / max(elapsed, 1e-9)))
+
+    @staticmethod
+    def time_loops(operation, loops):
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        return time.perf_counter() - start
+
+
+def dungeon_setup(num_rooms):
+    def setup():
+        seeds = iter(range(1 << 62))  # A new dungeon every time
+        return lambda: Dungeon(num_rooms, max(1, num_rooms // 5), max(1, num_rooms // 5),
+                               rng=RandomStreams(next(seeds)))
+    return setup
+
+def room_setup():
+    rng = random.Random(1)
+    tables = load_tables()
+    return lambda: Room(rng=rng, path="normal", depth=rng.randrange(200), tables=tables)
+
+def battle_setup(template):
+    def setup():
+        rng = RandomStreams(1)
+        policy = StrategyPolicy({"attack": 1.0}, rng=rng.derive("policy"))
+
+        def fight():
+            # A player that always survives, so every fight lasts until the enemy falls
+            player = Player("Benchmark", 10 ** 6, 10)
+            player.policy = policy
+            Battle(player, [Enemy.from_template(template)], rng=rng.combat).start()
+        return fight
+    return setup
+
+def horde_setup(count):
+    def setup():
+        # The player and pet deal no damage and cannot fall, so every round faces the whole horde
+        player = Player(health=10 ** 12, attack=0)
+        player.pet = Pet("Shadow Wolf", 10 ** 12, 0)
+        player.policy = StrategyPolicy({"attack": 1.0}, rng=random.Random(1))
+        battle = Battle(player, load_tables().horde(random.Random(1), count), rng=random.Random(1))
+        return battle.play_round
+    return setup
+
+
+def big_player():
+    player = Player("Benchmark", 100, 10, gold=500)
+    for template in Item.TEMPLATES:
+        player.inventory.append(Item.from_template(template))
+    player.pet = Pet.from_template(Pet.TEMPLATES[0])
+    player.effects.add(player, "attack", 3)
+    return player
+
+def player_round_trip_setup():
+    player = big_player()
+    return lambda: Player.from_dict(player.to_dict())
+
+def dungeon_round_trip_setup():
+    dungeon = Dungeon(1000, 200, 200, rng=RandomStreams(1))
+    return lambda: Dungeon.from_dict(dungeon.to_dict())
+
+def save_setup(save_format, num_rooms):
+    def setup():
+        player = big_player()
+        dungeon = Dungeon(num_rooms, num_rooms // 5, num_rooms // 5, rng=RandomStreams(1))
+
+        def save_and_load():
+            SaveSystem.save_game(player, dungeon)
+            if SaveSystem.load_game() is None:
+                raise RuntimeError("The benchmark save could not be loaded.")
+        return save_and_load
+    return setup
+
+def vendor_setup():
+    rng = random.Random(1)
+    tables = load_tables()
+    return lambda: Vendor(rng=rng, tables=tables)
+
+def path_oracle_setup():
+    dungeon = Dungeon(num_rooms=100, num_shortcut_rooms=20, num_mystery_rooms=20, rng=RandomStreams(1))
+    dungeon.available_paths = {"1": "", "2": "", "3": "", "4": ""}
+    oracle = PathOracle()
+    player = Player(health=100, attack=10)
+    return lambda: oracle.estimates(player, dungeon)
+
+
+BENCHMARKS = (
+    [Benchmark(f"dungeon.{size}", dungeon_setup(size), f"Dungeon() with {size} normal rooms") for size in (5, 100, 1000, 10000)]
+    + [Benchmark("room", room_setup, "Room() generation")]
+    + [Benchmark(f"battle.{template.name}", battle_setup(template), f"a whole Battle against one {template.name}")
+       for template in Enemy.TEMPLATES]
+    + [Benchmark(f"battle.horde.{count}", horde_setup(count), f"one Battle round against a horde of {count:,} enemies")
+       for count in (1000, 10000)]
+    + [Benchmark("player.round_trip", player_round_trip_setup, "Player.to_dict() + from_dict() with a full inventory"),
+       Benchmark("dungeon.round_trip", dungeon_round_trip_setup, "Dungeon.to_dict() + from_dict() with 1,400 rooms")]
+    + [Benchmark(f"save.{save_format}.{size}", save_setup(save_format, size),
+                 f"SaveSystem.save_game() + load_game() of {size * 7 // 5} rooms ({save_format})")
+       for save_format in ("json", "binary") for size in (1000, 20000)]
+    + [Benchmark("vendor", vendor_setup, "Vendor() creation")]
+    + [Benchmark("path_oracle", path_oracle_setup, "PathOracle.estimates() of 4 paths, cached")]
+)
+
+
+def run_benchmarks(benchmarks, min_time=0.1, repeats=9):
+    """
+    Runs the benchmarks without a terminal (game text goes to a NullOutput, every decision comes
+    from a scripted policy) and with saves in a temporary directory. Returns {name: result}.
+    """
+    directory = tempfile.mkdtemp(prefix="dungeon-benchmark-")
+    saved = {name: getattr(SaveSystem, name) for name in ("FORMAT", "SAVE_FILE", "BINARY_SAVE_FILE", "JOURNAL_FILE", "BACKEND")}
+    results = {}
+    try:
+        SaveSystem.SAVE_FILE = os.path.join(directory, "savegame.json")
+        SaveSystem.BINARY_SAVE_FILE = os.path.join(directory, "savegame.dat")
+        SaveSystem.JOURNAL_FILE = os.path.join(directory, "savegame.journal")
+        SaveSystem.BACKEND = "file"
+        with use_output(NullOutput()):
+            for benchmark in benchmarks:
+                SaveSystem.FORMAT = "binary" if ".binary." in benchmark.name else "json"
+                result = results[benchmark.name] = benchmark.run(min_time, repeats)
+                peak = "varies" if result["peak_kb"] is None else f"{result['peak_kb']:,.1f} KB"
+                print(f"{benchmark.name:<28} {result['ops_per_sec']:>12,.1f} ops/s {result['cost']:>12,.3f} cal "
+                      f"{peak:>12} peak   {benchmark.description}")
+    finally:
+        SaveSystem.close()
+        for name, value in saved.items():
+            setattr(SaveSystem, name, value)
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the results with the baseline. Returns (regressions, doubtful) as lists of messages.
+    A regression is an operation whose median cost (in calibration loops) grew by more than
+    threshold (0.2 = 20%) while even its fastest loop did, or whose memory peak grew by more than
+    threshold (only compared where both peaks are the same on every call). An operation whose
+    median grew but whose fastest loop did not is doubtful: the run was too noisy to tell.
+    """
+    regressions, doubtful = [], []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old or "cost" not in old:
+            continue  # Not in the baseline, or stored before costs were
+        limit = old["cost"] * (1 + threshold)
+        if result["cost"] > limit:
+            message = (f"{name}: {result['cost']:,.3f} cal, baseline {old['cost']:,.3f} "
+                       f"({result['cost'] / old['cost'] - 1:+.0%}, fastest {result['fastest_cost']:,.3f})")
+            (regressions if result["fastest_cost"] > limit else doubtful).append(message)
+        if result["peak_kb"] is not None and old.get("peak_kb") is not None \
+                and result["peak_kb"] > old["peak_kb"] * (1 + threshold) and result["peak_kb"] - old["peak_kb"] > 16:
+            regressions.append(f"{name}: {result['peak_kb']:,.1f} KB peak, baseline {old['peak_kb']:,.1f} KB "
+                               f"({result['peak_kb'] / old['peak_kb'] - 1:+.0%})")
+    return regressions, doubtful
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot operations against a stored baseline.")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare with (or to save)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown or memory growth (0.2 = 20%%)")
+    parser.add_argument("--only", nargs="+", default=[], help="run only benchmarks whose name starts with one of these")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timed loop")
+    parser.add_argument("--repeats", type=int, default=9, help="timed loops per benchmark (the median counts)")
+    args = parser.parse_args()
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS
+                  if not args.only or any(benchmark.name.startswith(prefix) for prefix in args.only)]
+    if not benchmarks:
+        parser.error("no benchmark matches --only")
+    results = run_benchmarks(benchmarks, args.min_time, args.repeats)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):  # Keep the benchmarks that were not run this time
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)["results"]
+        for name, result in results.items():
+            baseline[name] = {key: result[key] for key in ("ops_per_sec", "cost", "peak_kb")}
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": baseline}, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+    regressions, doubtful = compare(results, baseline, args.threshold)
+    if doubtful:
+        print(f"\nToo noisy to tell ({len(doubtful)}): slower in the median but not in the fastest loop; run again")
+        for message in doubtful:
+            print(f"  {message}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regression beyond {args.threshold:.0%} against {args.baseline}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+from enemy import Enemy
+from item import Item
+from pet import Pet
+from room import Room
+
+class SaveFormatError(ValueError):
+    """Raised when a binary save is not a save, is too new, or fails its checksum."""
+
+
+MAGIC = b"DAGS"
+VERSION = 5  # Bump when a record layout changes or a template table is reordered (appending is fine)
+# Version 2 added the layout byte before the dungeon (0 = every room, 1 = lazy dungeon)
+# Version 3 added the spawn tables file of a lazy dungeon after its seed
+# Version 4 added the player's status effects (with their magnitude) after the pet
+# Version 5 stores an effect's magnitude as a double, so a potion of +2.5 attack saves too
+INLINE = 255  # Template ID meaning "not a known template, the value follows inline"
+NONE_INT = -2 ** 31  # Stands for None in optional integers
+
+HEADER = struct.Struct("<4sBII")  # magic, version, payload length, CRC32 of the payload
+ROOM = struct.Struct("<BBBBBii")  # flags, description, puzzle, item, enemy, enemy health, trap damage
+PLAYER = struct.Struct("<iiiiHBB")  # health, max health, attack, gold, inventory size, buffs, pet
+DUNGEON = struct.Struct("<IIIiBBB")  # room counts, current room index, in_shortcut, in_mystery, seed kind
+LAZY_DUNGEON = struct.Struct("<QQQQqBBBI")  # room counts, first room, current room index, flags, seed kind, changed
+CHANGED_ROOM = struct.Struct("<BQ")  # room list, index
+ITEM = struct.Struct("<iii")  # value, duration, price of an inline item
+PET = struct.Struct("<Bii")  # template, health, attack (only used for inline pets)
+EFFECT = struct.Struct("<Bid")  # target (0 = player, 1 = pet), turns left, magnitude; the name follows
+EFFECT_V4 = struct.Struct("<Bii")  # The same with an integer magnitude (version 4)
+U8 = struct.Struct("<B")
+U16 = struct.Struct("<H")
+I32 = struct.Struct("<i")
+U64 = struct.Struct("<Q")
+
+# Room flags
+HAS_ENEMY, HAS_ITEM, HAS_TRAP, HAS_PUZZLE = 1, 2, 4, 8
+
+# Seed kinds
+SEED_NONE, SEED_U64, SEED_INT, SEED_TEXT = 0, 1, 2, 3
+
+# Dungeon layouts
+FULL_DUNGEON, LAZY = 0, 1
+ROOM_LISTS = ["rooms", "shortcut_rooms", "mystery_rooms"]
+
+# Buff names seen in Player.temporary_buffs; others are stored inline
+BUFFS = ["attack", "defense", "luck", "poison", "burn", "stun", "stunned"]
+
+# Lookups from a saved value to its template ID
+DESCRIPTION_IDS = {text: index for index, text in enumerate(Room.DESCRIPTIONS)}
+PUZZLE_IDS = {(puzzle["question"], puzzle["answer"]): index for index, puzzle in enumerate(Room.PUZZLES)}
+ITEM_IDS = {template: index for index, template in enumerate(Item.ITEMS)}
+ENEMY_IDS = {(data["name"], data["attack"], data["ability"]): index for index, data in enumerate(Enemy.ENEMY_TYPES)}
+PET_IDS = {(data["name"], data["attack"]): index for index, data in enumerate(Pet.PET_TYPES)}
+BUFF_IDS = {name: index for index, name in enumerate(BUFFS)}
+
+ITEM_KEYS = ("name", "effect", "value", "duration", "price")
+
+
+def optional(value):
+    return NONE_INT if value is None else value
+
+
+def restore(value):
+    return None if value == NONE_INT else value
+
+
+def number(value):
+    return int(value) if value.is_integer() else value
+
+
+class Writer:
+    """Collects the packed pieces of a save; strings are a u16 length plus UTF-8 (0xFFFF = None)."""
+
+    def __init__(self):
+        self.parts = []
+
+    def text(self, value):
+        if value is None:
+            self.parts.append(U16.pack(0xFFFF))
+            return
+        data = value.encode("utf-8")
+        self.parts.append(U16.pack(len(data)))
+        self.parts.append(data)
+
+    def item(self, item):
+        """Writes an item as its template ID, or inline when it does not match a template."""
+        template = (item["name"], item["effect"], item["value"], item["duration"], item["price"])
+        item_id = ITEM_IDS.get(template, INLINE)
+        self.parts.append(U8.pack(item_id))
+        if item_id == INLINE:
+            self.inline_item(item)
+
+    def inline_item(self, item):
+        self.text(item["name"])
+        self.text(item["effect"])
+        self.parts.append(ITEM.pack(optional(item["value"]), optional(item["duration"]), optional(item["price"])))
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+
+class Reader:
+    """Reads back what Writer wrote, keeping track of the position in the payload."""
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, record):
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+
+    def text(self):
+        (length,) = self.unpack(U16)
+        if length == 0xFFFF:
+            return None
+        value = self.data[self.offset:self.offset + length].decode("utf-8")
+        self.offset += length
+        return value
+
+    def item(self):
+        (item_id,) = self.unpack(U8)
+        if item_id == INLINE:
+            return self.inline_item()
+        return dict(zip(ITEM_KEYS, Item.ITEMS[item_id]))
+
+    def inline_item(self):
+        name = self.text()
+        effect = self.text()
+        value, duration, price = self.unpack(ITEM)
+        return {"name": name, "effect": effect, "value": restore(value), "duration": restore(duration),
+                "price": restore(price)}
+
+
+def write_room(writer, room):
+    """
+    Writes one room as a fixed 13-byte record of template IDs. Anything that is not a known
+    template (a custom description, item, puzzle or enemy) follows the record inline.
+    """
+    enemy = room["enemy"]
+    item = room["item"]
+    puzzle = room["puzzle"]
+    flags = ((HAS_ENEMY if enemy else 0) | (HAS_ITEM if item else 0) | (HAS_TRAP if room["trap"] else 0) |
+             (HAS_PUZZLE if puzzle else 0))
+    description_id = DESCRIPTION_IDS.get(room["description"], INLINE)
+    puzzle_id = PUZZLE_IDS.get((puzzle["question"], puzzle["answer"]), INLINE) if puzzle else 0
+    item_id = 0
+    if item:
+        item_id = ITEM_IDS.get((item["name"], item["effect"], item["value"], item["duration"], item["price"]), INLINE)
+    enemy_id = ENEMY_IDS.get((enemy["name"], enemy["attack"], enemy["ability"]), INLINE) if enemy else 0
+
+    writer.parts.append(ROOM.pack(flags, description_id, puzzle_id, item_id, enemy_id,
+                                  enemy["health"] if enemy else 0, optional(room["trap_damage"])))
+    if description_id == INLINE:
+        writer.text(room["description"])
+    if puzzle_id == INLINE:
+        writer.text(puzzle["question"])
+        writer.text(puzzle["answer"])
+    if item_id == INLINE:
+        writer.inline_item(item)
+    if enemy_id == INLINE:
+        writer.text(enemy["name"])
+        writer.parts.append(I32.pack(enemy["attack"]))
+        writer.text(enemy["ability"])
+
+
+def read_room(reader):
+    """Reads one room back into the dictionary that Room.to_dict() returns."""
+    flags, description_id, puzzle_id, item_id, enemy_id, enemy_health, trap_damage = reader.unpack(ROOM)
+    description = reader.text() if description_id == INLINE else Room.DESCRIPTIONS[description_id]
+
+    puzzle = None
+    if flags & HAS_PUZZLE:
+        if puzzle_id == INLINE:
+            puzzle = {"question": reader.text(), "answer": reader.text()}
+        else:
+            puzzle = dict(Room.PUZZLES[puzzle_id])
+
+    item = None
+    if flags & HAS_ITEM:
+        item = reader.inline_item() if item_id == INLINE else dict(zip(ITEM_KEYS, Item.ITEMS[item_id]))
+
+    enemy = None
+    if flags & HAS_ENEMY:
+        if enemy_id == INLINE:
+            name = reader.text()
+            (attack,) = reader.unpack(I32)
+            enemy = {"name": name, "health": enemy_health, "attack": attack, "ability": reader.text()}
+        else:
+            data = Enemy.ENEMY_TYPES[enemy_id]
+            enemy = {"name": data["name"], "health": enemy_health, "attack": data["attack"], "ability": data["ability"]}
+
+    return {
+        "description": description,
+        "enemy": enemy,
+        "item": item,
+        "trap": bool(flags & HAS_TRAP),
+        "trap_damage": restore(trap_damage),
+        "puzzle": puzzle
+    }
+
+
+def write_player(writer, player):
+    buffs = player["temporary_buffs"]
+    pet = player["pet"]
+    writer.parts.append(PLAYER.pack(player["health"], player["max_health"], player["attack"], player["gold"],
+                                    len(player["inventory"]), len(buffs), 1 if pet else 0))
+    writer.text(player["name"])
+    for item in player["inventory"]:
+        writer.item(item)
+    for name, turns in buffs.items():
+        buff_id = BUFF_IDS.get(name, INLINE)
+        writer.parts.append(U8.pack(buff_id))
+        if buff_id == INLINE:
+            writer.text(name)
+        writer.parts.append(I32.pack(turns))
+    if pet:
+        pet_id = PET_IDS.get((pet["name"], pet["attack"]), INLINE)
+        writer.parts.append(PET.pack(pet_id, pet["health"], pet["attack"]))
+        if pet_id == INLINE:
+            writer.text(pet["name"])
+    effects = player.get("status_effects") or []
+    writer.parts.append(U16.pack(len(effects)))
+    for effect in effects:
+        buff_id = BUFF_IDS.get(effect["name"], INLINE)
+        writer.parts.append(U8.pack(buff_id))
+        if buff_id == INLINE:
+            writer.text(effect["name"])
+        writer.parts.append(EFFECT.pack(1 if effect.get("target") == "pet" else 0, effect["turns"], effect["magnitude"]))
+
+
+def read_player(reader, version):
+    health, max_health, attack, gold, inventory_size, num_buffs, has_pet = reader.unpack(PLAYER)
+    name = reader.text()
+    inventory = [reader.item() for _ in range(inventory_size)]
+    buffs = {}
+    for _ in range(num_buffs):
+        (buff_id,) = reader.unpack(U8)
+        buff = reader.text() if buff_id == INLINE else BUFFS[buff_id]
+        (buffs[buff],) = reader.unpack(I32)
+    pet = None
+    if has_pet:
+        pet_id, pet_health, pet_attack = reader.unpack(PET)
+        pet_name = reader.text() if pet_id == INLINE else Pet.PET_TYPES[pet_id]["name"]
+        pet = {"name": pet_name, "health": pet_health, "attack": pet_attack}
+    effects = []
+    record = EFFECT if version >= 5 else EFFECT_V4
+    for _ in range(reader.unpack(U16)[0] if version >= 4 else 0):
+        (buff_id,) = reader.unpack(U8)
+        effect = {"name": reader.text() if buff_id == INLINE else BUFFS[buff_id]}
+        target, effect["turns"], magnitude = reader.unpack(record)
+        effect["magnitude"] = number(magnitude) if version >= 5 else magnitude
+        if target:
+            effect["target"] = "pet"
+        effects.append(effect)
+    player = {
+        "name": name,
+        "health": health,
+        "max_health": max_health,
+        "attack": attack,
+        "gold": gold,
+        "inventory": inventory,
+        "temporary_buffs": buffs,
+        "pet": pet
+    }
+    if version >= 4:  # Otherwise the turns in temporary_buffs are all there is (older saves)
+        player["status_effects"] = effects
+    return player
+
+
+def write_seed(writer, seed):
+    if isinstance(seed, int) and 0 <= seed < 2 ** 64:
+        writer.parts.append(U64.pack(seed))
+    elif seed is not None:
+        writer.text(str(seed))
+
+
+def seed_kind(seed):
+    if seed is None:
+        return SEED_NONE
+    if isinstance(seed, int):
+        return SEED_U64 if 0 <= seed < 2 ** 64 else SEED_INT
+    return SEED_TEXT
+
+
+def read_seed(reader, kind):
+    if kind == SEED_U64:
+        return reader.unpack(U64)[0]
+    if kind == SEED_INT:
+        return int(reader.text())
+    if kind == SEED_TEXT:
+        return reader.text()
+    return None
+
+
+def write_lazy_dungeon(writer, dungeon):
+    """A lazy dungeon (Dungeon.to_dict with lazy=True): the room counts and only the rooms that changed."""
+    seed = dungeon.get("seed")
+    writer.parts.append(U8.pack(LAZY))
+    writer.parts.append(LAZY_DUNGEON.pack(dungeon["num_rooms"], dungeon["num_shortcut_rooms"], dungeon["num_mystery_rooms"],
+                                          dungeon["first_room"], dungeon["current_room_index"], dungeon["in_shortcut"],
+                                          dungeon["in_mystery"], seed_kind(seed), len(dungeon["changed"])))
+    write_seed(writer, seed)
+    writer.text(dungeon.get("tables"))
+    for list_name, index, room in dungeon["changed"]:
+        writer.parts.append(CHANGED_ROOM.pack(ROOM_LISTS.index(list_name), index))
+        write_room(writer, room)
+
+
+def read_lazy_dungeon(reader, version):
+    num_rooms, num_shortcut_rooms, num_mystery_rooms, first_room, current_room_index, in_shortcut, in_mystery, kind, \
+        num_changed = reader.unpack(LAZY_DUNGEON)
+    dungeon = {
+        "lazy": True,
+        "num_rooms": num_rooms,
+        "num_shortcut_rooms": num_shortcut_rooms,
+        "num_mystery_rooms": num_mystery_rooms,
+        "first_room": first_room,
+        "seed": read_seed(reader, kind),
+        "tables": reader.text() if version >= 3 else None,
+        "changed": []
+    }
+    for _ in range(num_changed):
+        list_id, index = reader.unpack(CHANGED_ROOM)
+        dungeon["changed"].append([ROOM_LISTS[list_id], index, read_room(reader)])
+    dungeon["current_room_index"] = current_room_index
+    dungeon["in_shortcut"] = bool(in_shortcut)
+    dungeon["in_mystery"] = bool(in_mystery)
+    return dungeon
+
+
+def encode(save_data):
+    """Packs a save dictionary ({"player": ..., "dungeon": ...}, as written by SaveSystem) into bytes."""
+    player = save_data["player"]
+    dungeon = save_data["dungeon"]
+    seed = dungeon.get("seed")
+
+    writer = Writer()
+    write_player(writer, player)
+    if dungeon.get("lazy"):
+        write_lazy_dungeon(writer, dungeon)
+        payload = writer.getvalue()
+        return HEADER.pack(MAGIC, VERSION, len(payload), zlib.crc32(payload)) + payload
+
+    writer.parts.append(U8.pack(FULL_DUNGEON))
+    writer.parts.append(DUNGEON.pack(len(dungeon["rooms"]), len(dungeon["shortcut_rooms"]), len(dungeon["mystery_rooms"]),
+                                     dungeon["current_room_index"], dungeon["in_shortcut"], dungeon["in_mystery"],
+                                     seed_kind(seed)))
+    write_seed(writer, seed)
+    for list_name in ("rooms", "shortcut_rooms", "mystery_rooms"):
+        for room in dungeon[list_name]:
+            write_room(writer, room)
+
+    payload = writer.getvalue()
+    return HEADER.pack(MAGIC, VERSION, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(data):
+    """Unpacks bytes written by encode() back into the save dictionary. Raises SaveFormatError if they are not valid."""
+    if len(data) < HEADER.size:
+        raise SaveFormatError("The save file is too short.")
+    magic, version, length, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SaveFormatError("Not a binary save file.")
+    if version > VERSION:
+        raise SaveFormatError(f"The save file was written by a newer version (format {version}).")
+    payload = data[HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise SaveFormatError("The save file is damaged (checksum mismatch).")
+
+    try:
+        reader = Reader(payload)
+        player = read_player(reader, version)
+        layout = reader.unpack(U8)[0] if version >= 2 else FULL_DUNGEON
+        if layout == LAZY:
+            return {"player": player, "dungeon": read_lazy_dungeon(reader, version)}
+        num_rooms, num_shortcut_rooms, num_mystery_rooms, current_room_index, in_shortcut, in_mystery, kind = \
+            reader.unpack(DUNGEON)
+        dungeon = {"seed": read_seed(reader, kind)}
+        dungeon["rooms"] = [read_room(reader) for _ in range(num_rooms)]
+        dungeon["shortcut_rooms"] = [read_room(reader) for _ in range(num_shortcut_rooms)]
+        dungeon["mystery_rooms"] = [read_room(reader) for _ in range(num_mystery_rooms)]
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise SaveFormatError(f"The save file is damaged ({e}).")
+    dungeon["current_room_index"] = current_room_index
+    dungeon["in_shortcut"] = bool(in_shortcut)
+    dungeon["in_mystery"] = bool(in_mystery)
+    return {"player": player, "dungeon": dungeon}
+
+
+def write_file(save_file, save_data):
+    """Writes a binary save file."""
+    with open(save_file, "wb") as f:
+        f.write(encode(save_data))
+
+
+def read_file(save_file):
+    """Reads a binary save file. Raises FileNotFoundError or SaveFormatError."""
+    with open(save_file, "rb") as f:
+        return decode(f.read())
+
+
+def json_to_binary(json_file, binary_file):
+    """Converts a JSON save (savegame.json) into a binary save."""
+    with open(json_file, "r") as f:
+        write_file(binary_file, json.load(f))
+
+
+def binary_to_json(binary_file, json_file):
+    """Converts a binary save back into a JSON save, formatted like SaveSystem writes it."""
+    with open(json_file, "w") as f:
+        json.dump(read_file(binary_file), f, indent=4)
+
+
+def benchmark(num_rooms, repeats=3):
+    """Saves and loads a dungeon of num_rooms rooms in both formats and prints the file sizes and times."""
+    from dungeon import Dungeon
+    from player import Player
+    from rng import RandomStreams
+    from save_system import SaveSystem
+
+    dungeon = Dungeon(num_rooms, max(2, num_rooms // 10), max(2, num_rooms // 10), RandomStreams(1))
+    player = Player("Benchmark", 100, 10)
+    save_data = {"player": SaveSystem.player_state(player), "dungeon": dungeon.to_dict()}
+    json_file, binary_file = "benchmark_save.json", "benchmark_save.dat"
+
+    def best_time(function, *args):
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function(*args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def save_json():
+        with open(json_file, "w") as f:
+            json.dump(save_data, f, indent=4)
+
+    def load_json():
+        with open(json_file, "r") as f:
+            return json.load(f)
+
+    try:
+        json_save = best_time(save_json)
+        json_load = best_time(load_json)
+        binary_save = best_time(write_file, binary_file, save_data)
+        binary_load = best_time(read_file, binary_file)
+        json_size = os.path.getsize(json_file)
+        binary_size = os.path.getsize(binary_file)
+        if read_file(binary_file) != load_json():
+            print("Warning: the binary save did not load back the same game!")
+    finally:
+        for path in (json_file, binary_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    total = len(save_data["dungeon"]["rooms"]) + len(save_data["dungeon"]["shortcut_rooms"]) + \
+        len(save_data["dungeon"]["mystery_rooms"])
+    print(f"{total} rooms")
+    print(f"{'format':<8} {'size':>12} {'save':>10} {'load':>10}")
+    print(f"{'json':<8} {json_size:>12,} {json_save * 1000:>8.1f}ms {json_load * 1000:>8.1f}ms")
+    print(f"{'binary':<8} {binary_size:>12,} {binary_save * 1000:>8.1f}ms {binary_load * 1000:>8.1f}ms")
+    print(f"The binary save is {json_size / binary_size:.1f}x smaller, "
+          f"{json_save / binary_save:.1f}x faster to save and {json_load / binary_load:.1f}x faster to load.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between JSON and binary saves, or compare the two formats.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_binary = commands.add_parser("to-binary", help="convert a JSON save into a binary save")
+    to_binary.add_argument("source", nargs="?", default="savegame.json")
+    to_binary.add_argument("target", nargs="?", default="savegame.dat")
+    to_json = commands.add_parser("to-json", help="convert a binary save into a JSON save")
+    to_json.add_argument("source", nargs="?", default="savegame.dat")
+    to_json.add_argument("target", nargs="?", default="savegame.json")
+    bench = commands.add_parser("bench", help="measure file size and save/load time of both formats")
+    bench.add_argument("--rooms", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    if args.command == "to-binary":
+        json_to_binary(args.source, args.target)
+        print(f"Converted {args.source} ({os.path.getsize(args.source):,} bytes) "
+              f"to {args.target} ({os.path.getsize(args.target):,} bytes)")
+    elif args.command == "to-json":
+        binary_to_json(args.source, args.target)
+        print(f"Converted {args.source} to {args.target}")
+    else:
+        for num_rooms in args.rooms:
+            benchmark(num_rooms)
+            print()
+
+if __name__ == "__main__":
+    main()
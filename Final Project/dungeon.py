@@ -1,220 +1,430 @@
-import random
-from room import Room
-
-class Dungeon:
-    """Represents the dungeon, containing multiple randomly generated rooms, including shortcuts and other paths."""
-
-    def __init__(self, num_rooms=5, num_shortcut_rooms=2, num_mystery_rooms=2):
-        """
-        Initializes the dungeon with:
-        - Normal rooms (standard difficulty)
-        - Shortcut rooms (higher difficulty, better rewards)
-        - Mystery rooms (random chance of good or bad events)
-        """
-        self.rooms = [Room() for _ in range(num_rooms)]  
-        self.shortcut_rooms = [Room(is_shortcut=True) for _ in range(num_shortcut_rooms)]  
-        self.mystery_rooms = [Room() for _ in range(num_mystery_rooms)]  
-        self.current_room_index = 0  
-        self.in_shortcut = False
-        self.in_mystery = False
-        self.in_treasure_path = False
-
-    def get_current_room(self):
-        """Returns the current room where the player is."""
-        if self.in_shortcut:
-            return self.shortcut_rooms[self.current_room_index]
-        if self.in_mystery:
-            return self.mystery_rooms[self.current_room_index]
-        return self.rooms[self.current_room_index]
-
-    def move_to_next_room(self, choice, player):
-        """
-        Moves the player to the next room based on the dynamically generated choices.
-        """
-        if choice not in self.available_paths:
-            print("Invalid choice! Choose a valid path.")
-            return False  
-
-        if choice == "1":
-            if self.current_room_index < len(self.rooms) - 1:
-                self.current_room_index += 1
-                self.in_shortcut = False
-                self.in_mystery = False
-                return True
-
-        elif choice == "2" and "2" in self.available_paths:
-            if self.shortcut_rooms:
-                self.current_room_index = 0  
-                self.in_shortcut = True
-                self.in_mystery = False
-                return True
-
-        elif choice == "3" and "3" in self.available_paths:
-            if self.mystery_rooms:
-                self.current_room_index = 0  
-                self.in_mystery = True
-                self.in_shortcut = False
-                return True
-
-        elif choice == "4" and "4" in self.available_paths:
-            if random.random() < 0.2:
-                print("\nYou found a secret passage leading to a Hidden Treasure Room!")
-                survived = self.handle_hidden_treasure_event(player)  
-                return survived  # ← False if dead
-
-
-        return False   
-    def handle_hidden_treasure_event(self, player):
-        """
-        Handles what happens when the player enters a Hidden Treasure Room.
-        - 70% chance of instant death.
-        - 30% chance of massive rewards.
-        """
-        print("\nYou enter the Hidden Treasure Room...")
-
-        if random.random() < 0.7:  # 70% chance of instant death
-            print("\n⚠️ You triggered a deadly trap! The ceiling collapses, crushing you instantly.")
-            player.health = 0  # Instant death
-            return False  
-        else:
-            gold_found = random.randint(100, 300)
-            print(f"\n💰 You find a treasure chest filled with {gold_found} gold!")
-            player.earn_gold(gold_found)
-
-            rare_items = ["Warrior's Fury", "Titan's Elixir", "Elixir of Life"]
-            if random.random() < 0.5:  # 50% chance to find a rare item
-                item_name = random.choice(rare_items)
-                print(f"\n🎁 You also find a rare item: {item_name}!")
-                from item import Item
-                player.pick_item(Item(name=item_name, effect="special", value=0))
-
-        self.in_treasure_path = False  # Exit treasure path after event
-        return True
-    
-    def display_room_choices(self):
-        """
-        Shows the player's available paths dynamically based on RNG.
-        """
-        self.available_paths = {}  # Reset available paths
-
-        print("\nYou have the following choices:")
-        self.available_paths["1"] = "Normal path - A standard dungeon room."
-        print("[1] Normal path - A standard dungeon room.")
-
-        if random.random() < 0.7:  
-            self.available_paths["2"] = "Shortcut - A HIGH-RISK, HIGH-REWARD path (more enemies, harder puzzles, better loot)."
-            print("[2] Shortcut - A HIGH-RISK, HIGH-REWARD path (more enemies, harder puzzles, better loot).")
-
-        if random.random() < 0.5:  
-            self.available_paths["3"] = "Mystery Path - Unknown danger or treasure!"
-            print("[3] Mystery Path - Unknown danger or treasure!")
-
-        if random.random() < 0.2:  
-            self.available_paths["4"] = "Hidden Treasure Path - A rare path that might contain a fortune but has high chances of instant death!"
-            print("[4] Hidden Treasure Path - A rare path that might contain a fortune but has high chances of instant death!")
-
-    def display_dungeon_status(self):
-        """
-        Displays the current state of the dungeon for debugging or UI purposes.
-        """
-        print("\n=== Dungeon Map ===")
-        for i, room in enumerate(self.rooms):
-            status = " (You are here)" if i == self.current_room_index and not (self.in_shortcut or self.in_mystery) else ""
-            print(f"Room {i + 1}: {room.description}{status}")
-
-        if self.shortcut_rooms:
-            for i, room in enumerate(self.shortcut_rooms):
-                status = " (You are here)" if i == self.current_room_index and self.in_shortcut else ""
-                print(f"Shortcut Room {i + 1}: {room.description}{status}")
-
-        if self.mystery_rooms:
-            for i, room in enumerate(self.mystery_rooms):
-                status = " (You are here)" if i == self.current_room_index and self.in_mystery else ""
-                print(f"Mystery Room {i + 1}: {room.description}{status}")
-
-        print("===================")
-
-    def handle_room_events(self, player):
-        """
-        Handles what happens when the player enters a room.
-        Could trigger a trap, puzzle, treasure, or even gold rewards.
-        """
-        current_room = self.get_current_room()
-
-        # Handle finding gold
-        if random.random() < 0.3:  
-            gold_found = random.randint(10, 50)
-            print(f"\nYou found {gold_found} gold coins in this room!")
-            player.gold += gold_found
-
-        # Handle trap
-        if current_room.trap:
-            print(f"Oh no! It's a trap! You take {current_room.trap_damage} damage.")
-            player.health -= current_room.trap_damage
-            if player.health <= 0:
-                print("You succumbed to the trap... Game over.")
-                return False  
-
-        # Handle puzzle event
-        if current_room.puzzle:
-            print(f"\nYou encounter a puzzle: {current_room.puzzle['question']}")
-            answer = input("Your answer: ").strip().lower()
-            if answer == current_room.puzzle['answer']:
-                print("Correct! You are rewarded!")
-
-                # extra gold
-                bonus_gold = random.randint(20, 100)
-                print(f"You received {bonus_gold} gold for solving the puzzle!")
-                player.earn_gold(bonus_gold)
-
-                # more % for items
-                if current_room.item or random.random() < 0.5:
-                    if not current_room.item:
-                        from item import Item
-                        current_room.item = Item()  # Generar un nuevo ítem aleatorio
-                    print(f"You found an extra item: {current_room.item.name}!")
-                    player.pick_item(current_room.item)
-
-                # temporal Buff 
-                buff_type = random.choice(["attack", "defense", "luck"])
-                buff_value = random.randint(2, 5)
-                player.temporary_buffs[buff_type] += buff_value
-                print(f"You feel empowered! Your {buff_type} increased by {buff_value} for the next turns.")
-
-            else:
-                print("Wrong answer! The puzzle remains unsolved.")
-
-        return True
-
-    def is_exit_reached(self):
-        """
-        Returns True if the player has reached the last room (exit).
-        """
-        if self.in_shortcut:
-            return self.current_room_index >= len(self.shortcut_rooms) - 1
-        if self.in_mystery:
-            return self.current_room_index >= len(self.mystery_rooms) - 1
-        return self.current_room_index >= len(self.rooms) - 1
-
-    def to_dict(self):
-        """Converts the dungeon's state into a dictionary for saving."""
-        return {
-            "rooms": [room.to_dict() for room in self.rooms],
-            "shortcut_rooms": [room.to_dict() for room in self.shortcut_rooms],
-            "mystery_rooms": [room.to_dict() for room in self.mystery_rooms],
-            "current_room_index": self.current_room_index,
-            "in_shortcut": self.in_shortcut,
-            "in_mystery": self.in_mystery
-        }
-
-    @classmethod
-    def from_dict(cls, data):
-        """Restores a dungeon from a saved dictionary state."""
-        dungeon = cls(len(data["rooms"]), len(data["shortcut_rooms"]), len(data["mystery_rooms"]))
-        dungeon.rooms = [Room.from_dict(room) for room in data["rooms"]]
-        dungeon.shortcut_rooms = [Room.from_dict(room) for room in data["shortcut_rooms"]]
-        dungeon.mystery_rooms = [Room.from_dict(room) for room in data["mystery_rooms"]]
-        dungeon.current_room_index = data["current_room_index"]
-        dungeon.in_shortcut = data["in_shortcut"]
-        dungeon.in_mystery = data["in_mystery"]
-        return dungeon
+import sys
+from collections import OrderedDict
+from dungeon_map import CHOICES, DungeonMap, LinearMap
+from events import GoldEarned, RoomEntered, TrapTriggered, publish
+from output import displays, show
+from room import Room
+from rng import RandomStreams
+from spawn_tables import DEFAULT_FILE, SpawnTables, load_tables
+
+class LazyRooms:
+    """
+    A list of rooms that only exist while they are needed, for very large or endless dungeons.
+
+    Room i is generated from its own seed (RandomStreams.derive(list name, i)) the first time it is
+    used, so it is always the same room no matter in which order rooms are visited. At most
+    cache_size rooms are kept alive; when one is evicted it is compared with a freshly generated
+    copy, and only a room that changed (enemy hurt, trap disarmed, ...) is kept, as a saved dictionary.
+    Rooms the player can never reach again are forgotten completely (see forget_before).
+    It behaves like a list for len(), indexing, assignment and iteration.
+    """
+
+    PATHS = {"rooms": "normal", "shortcut_rooms": "shortcut", "mystery_rooms": "mystery"}
+
+    def __init__(self, rng, list_name, size, tables, cache_size=64):
+        self.rng = rng
+        self.list_name = list_name
+        self.size = size
+        self.path = self.PATHS[list_name]
+        self.tables = tables
+        self.cache_size = max(2, cache_size)  # The current room must never be evicted
+        self.live = OrderedDict()  # index -> Room, least recently used first
+        self.changed = {}  # index -> saved dictionary of an evicted room that differs from its seed
+        self.first = 0  # Rooms before this index can no longer be reached
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not self.first <= index < self.size:
+            raise IndexError(f"{self.list_name} index out of range")
+        room = self.live.get(index)
+        if room is not None:
+            self.live.move_to_end(index)
+            return room
+        saved = self.changed.pop(index, None)
+        if saved:
+            room = Room.from_dict(saved)
+            room.rng = self.rng.world
+        else:
+            room = self.generate(index)
+        self.live[index] = room
+        self.evict()
+        return room
+
+    def __setitem__(self, index, room):
+        self.changed.pop(index, None)
+        self.live[index] = room
+        self.live.move_to_end(index)
+        self.evict()
+
+    def __iter__(self):
+        for index in range(self.first, self.size):
+            yield self[index]
+
+    def generate(self, index):
+        """Builds room index from its seed."""
+        return Room(rng=self.rng.derive(self.list_name, index), path=self.path, depth=index, tables=self.tables)
+
+    def evict(self):
+        """Drops the least recently used rooms above cache_size, keeping the changed ones as dictionaries."""
+        while len(self.live) > self.cache_size:
+            index, room = self.live.popitem(last=False)
+            data = room.to_dict()
+            if data != self.generate(index).to_dict():
+                self.changed[index] = data
+
+    def forget_before(self, first):
+        """Forgets every room before index first, because the player can never go back to them."""
+        if first <= self.first:
+            return
+        self.first = first
+        for rooms in (self.live, self.changed):
+            for index in [index for index in rooms if index < first]:
+                del rooms[index]
+
+    def changed_room(self, index):
+        """Returns the saved dictionary of room index if it differs from its seed, otherwise None."""
+        room = self.live.get(index)
+        if room is None:
+            return self.changed.get(index)
+        data = room.to_dict()
+        return data if data != self.generate(index).to_dict() else None
+
+    def changed_rooms(self):
+        """Returns {index: saved dictionary} of every room that differs from its seed."""
+        changed = dict(self.changed)
+        for index, room in self.live.items():
+            data = room.to_dict()
+            if data != self.generate(index).to_dict():
+                changed[index] = data
+        return changed
+
+
+class Dungeon:
+    """Represents the dungeon, containing multiple randomly generated rooms, including shortcuts and other paths."""
+
+    ENDLESS = sys.maxsize  # Number of rooms of an endless dungeon (lazy=True, num_rooms=None)
+
+    def __init__(self, num_rooms=5, num_shortcut_rooms=2, num_mystery_rooms=2, rng=None, lazy=False, cache_size=64,
+                 tables=None):
+        """
+        Initializes the dungeon with:
+        - Normal rooms (standard difficulty)
+        - Shortcut rooms (higher difficulty, better rewards)
+        - Mystery rooms (random chance of good or bad events)
+        rng is the game's RandomStreams; the same seed always builds the same dungeon.
+        With lazy=True rooms are only generated when they are used and at most cache_size are kept
+        in memory (see LazyRooms), so a dungeon can have millions of rooms, or no end (num_rooms=None).
+        tables are the SpawnTables (or the name of a tables file) that decide what spawns where;
+        spawn_tables.json by default.
+        The paths between the rooms are a graph (self.map, see dungeon_map.py): a DungeonMap with
+        precomputed distances to the exit, or a LinearMap that works them out from the room counts
+        for lazy dungeons.
+        """
+        self.rng = rng or RandomStreams()
+        self.lazy = lazy
+        self.tables = tables if isinstance(tables, SpawnTables) else load_tables(tables)
+        if lazy:
+            self.rooms = LazyRooms(self.rng, "rooms", self.ENDLESS if num_rooms is None else num_rooms,
+                                   self.tables, cache_size)
+            self.shortcut_rooms = LazyRooms(self.rng, "shortcut_rooms", num_shortcut_rooms, self.tables, cache_size)
+            self.mystery_rooms = LazyRooms(self.rng, "mystery_rooms", num_mystery_rooms, self.tables, cache_size)
+        else:
+            world = self.rng.world
+            self.rooms = Room.generate_many(num_rooms, world, "normal", self.tables)
+            self.shortcut_rooms = Room.generate_many(num_shortcut_rooms, world, "shortcut", self.tables)
+            self.mystery_rooms = Room.generate_many(num_mystery_rooms, world, "mystery", self.tables)
+        map_type = LinearMap if lazy else DungeonMap.standard
+        self.map = map_type(len(self.rooms), len(self.shortcut_rooms), len(self.mystery_rooms))
+        self.current_room_index = 0  
+        self.in_shortcut = False
+        self.in_mystery = False
+        self.in_treasure_path = False
+        self.changed_rooms = set()  # Keys of rooms entered since the last journaled save
+
+    def current_room_key(self):
+        """Returns (room list name, index) of the current room, e.g. ("shortcut_rooms", 0)."""
+        if self.in_shortcut:
+            return ("shortcut_rooms", self.current_room_index)
+        if self.in_mystery:
+            return ("mystery_rooms", self.current_room_index)
+        return ("rooms", self.current_room_index)
+
+    @property
+    def current_node(self):
+        """The current room's node in self.map."""
+        return self.map.node(*self.current_room_key())
+
+    def enter_room(self, node):
+        """Moves the player to the room of a map node."""
+        list_name, self.current_room_index = self.map.location(node)
+        self.in_shortcut = list_name == "shortcut_rooms"
+        self.in_mystery = list_name == "mystery_rooms"
+        self.changed_rooms.add(self.current_room_key())
+        publish(RoomEntered, list_name, self.current_room_index)
+        if self.lazy:
+            self.forget_unreachable_rooms()
+
+    def forget_unreachable_rooms(self):
+        """
+        Lazy dungeons: forgets the normal rooms the player can never enter again. Every path only
+        leads forward, so those are the normal rooms before the current one, or all of them once
+        the player has taken a shortcut or mystery path.
+        """
+        self.rooms.forget_before(self.map.first_reachable_room(self.current_node))
+
+    def distance_to_exit(self):
+        """Returns the fewest moves from the current room to an exit (None if there is no way out)."""
+        return self.map.distance_to_exit(self.current_node)
+
+    def get_current_room(self):
+        """Returns the current room where the player is."""
+        if self.in_shortcut:
+            return self.shortcut_rooms[self.current_room_index]
+        if self.in_mystery:
+            return self.mystery_rooms[self.current_room_index]
+        return self.rooms[self.current_room_index]
+
+    def move_to_next_room(self, choice, player):
+        """
+        Moves the player to the next room based on the dynamically generated choices.
+        Each choice follows the edge of its type (see dungeon_map.CHOICES) out of the current room.
+        """
+        if choice not in self.available_paths:
+            show("Invalid choice! Choose a valid path.")
+            return False  
+
+        if choice == "4":
+            if self.rng.world.random() < 0.2:
+                show("\nYou found a secret passage leading to a Hidden Treasure Room!")
+                survived = self.handle_hidden_treasure_event(player)  
+                return survived  # ← False if dead
+            return False
+
+        target = self.map.target(self.current_node, CHOICES[choice])
+        if target is None:
+            return False
+        self.enter_room(target)
+        return True
+
+    def handle_hidden_treasure_event(self, player):
+        """
+        Handles what happens when the player enters a Hidden Treasure Room.
+        - 70% chance of instant death.
+        - 30% chance of massive rewards.
+        """
+        show("\nYou enter the Hidden Treasure Room...")
+        loot = self.rng.loot
+
+        if loot.random() < 0.7:  # 70% chance of instant death
+            show("\n⚠️ You triggered a deadly trap! The ceiling collapses, crushing you instantly.")
+            player.health = 0  # Instant death
+            return False  
+        else:
+            gold_found = loot.randint(100, 300)
+            show("\n💰 You find a treasure chest filled with {} gold!", gold_found)
+            player.earn_gold(gold_found, "treasure")
+
+            rare_items = ["Warrior's Fury", "Titan's Elixir", "Elixir of Life"]
+            if loot.random() < 0.5:  # 50% chance to find a rare item
+                item_name = loot.choice(rare_items)
+                show("\n🎁 You also find a rare item: {}!", item_name)
+                from item import Item
+                player.pick_item(Item(name=item_name, effect="special", value=0))
+
+        self.in_treasure_path = False  # Exit treasure path after event
+        return True
+    
+    def display_room_choices(self):
+        """
+        Shows the player's available paths dynamically based on RNG.
+        Only paths the current room has an edge for are offered.
+        """
+        self.available_paths = {}  # Reset available paths
+        world = self.rng.world
+        edges = self.map.edges(self.current_node)
+
+        show("\nYou have the following choices:")
+        self.available_paths["1"] = "Normal path - A standard dungeon room."  # Always offered, even in a dead end
+        show("[1] Normal path - A standard dungeon room.")
+
+        if world.random() < 0.7 and "shortcut" in edges:  
+            self.available_paths["2"] = "Shortcut - A HIGH-RISK, HIGH-REWARD path (more enemies, harder puzzles, better loot)."
+            show("[2] Shortcut - A HIGH-RISK, HIGH-REWARD path (more enemies, harder puzzles, better loot).")
+
+        if world.random() < 0.5 and "mystery" in edges:  
+            self.available_paths["3"] = "Mystery Path - Unknown danger or treasure!"
+            show("[3] Mystery Path - Unknown danger or treasure!")
+
+        if world.random() < 0.2 and "treasure" in edges:  
+            self.available_paths["4"] = "Hidden Treasure Path - A rare path that might contain a fortune but has high chances of instant death!"
+            show("[4] Hidden Treasure Path - A rare path that might contain a fortune but has high chances of instant death!")
+
+    def display_dungeon_status(self):
+        """
+        Displays the current state of the dungeon for debugging or UI purposes.
+        """
+        if not displays():
+            return  # Listing a big dungeon costs time for nothing
+        show("\n=== Dungeon Map ===")
+        distance = self.distance_to_exit()
+        if distance is None:
+            show("No way out from here!")
+        else:
+            show("Rooms to the nearest exit: {}", distance)
+        if self.lazy:
+            self.display_nearby_rooms()
+            return
+
+        for i, room in enumerate(self.rooms):
+            status = " (You are here)" if i == self.current_room_index and not (self.in_shortcut or self.in_mystery) else ""
+            show("Room {}: {}{}", i + 1, room.description, status)
+
+        if self.shortcut_rooms:
+            for i, room in enumerate(self.shortcut_rooms):
+                status = " (You are here)" if i == self.current_room_index and self.in_shortcut else ""
+                show("Shortcut Room {}: {}{}", i + 1, room.description, status)
+
+        if self.mystery_rooms:
+            for i, room in enumerate(self.mystery_rooms):
+                status = " (You are here)" if i == self.current_room_index and self.in_mystery else ""
+                show("Mystery Room {}: {}{}", i + 1, room.description, status)
+
+        show("===================")
+
+    def display_nearby_rooms(self, before=2, after=3):
+        """Lazy dungeons are too big to list, so only the normal rooms around the player are shown."""
+        here = None if self.in_shortcut or self.in_mystery else self.current_room_index
+        start = max(self.rooms.first, self.current_room_index - before)
+        end = min(len(self.rooms), self.current_room_index + after + 1)
+        for i in range(start, end):
+            status = " (You are here)" if i == here else ""
+            show("Room {}: {}{}", i + 1, self.rooms[i].description, status)
+        if self.in_shortcut:
+            show("Shortcut Room {}: {} (You are here)", self.current_room_index + 1, self.get_current_room().description)
+        if self.in_mystery:
+            show("Mystery Room {}: {} (You are here)", self.current_room_index + 1, self.get_current_room().description)
+        show("===================")
+
+    def handle_room_events(self, player):
+        """
+        Handles what happens when the player enters a room.
+        Could trigger a trap, puzzle, treasure, or even gold rewards.
+        """
+        current_room = self.get_current_room()
+        loot = self.rng.loot
+
+        # Handle finding gold
+        if loot.random() < 0.3:  
+            gold_found = loot.randint(10, 50)
+            show("\nYou found {} gold coins in this room!", gold_found)
+            player.gold += gold_found
+            publish(GoldEarned, gold_found, player.gold, "room")
+
+        # Handle trap
+        if current_room.trap:
+            show("Oh no! It's a trap! You take {} damage.", current_room.trap_damage)
+            player.health -= current_room.trap_damage
+            publish(TrapTriggered, current_room.trap_damage, player.health)
+            if player.health <= 0:
+                show("You succumbed to the trap... Game over.")
+                return False  
+
+        # Handle puzzle event
+        if current_room.puzzle:
+            show("\nYou encounter a puzzle: {}", current_room.puzzle['question'])
+            answer = player.policy.answer_puzzle(player, current_room.puzzle)
+            if answer == current_room.puzzle['answer']:
+                show("Correct! You are rewarded!")
+
+                # extra gold
+                bonus_gold = loot.randint(20, 100)
+                show("You received {} gold for solving the puzzle!", bonus_gold)
+                player.earn_gold(bonus_gold, "puzzle")
+
+                # more % for items
+                if current_room.item or loot.random() < 0.5:
+                    if not current_room.item:
+                        list_name, depth = self.current_room_key()
+                        current_room.item = self.tables.item(loot, LazyRooms.PATHS[list_name], depth)
+                    show("You found an extra item: {}!", current_room.item.name)
+                    player.pick_item(current_room.item)
+
+                # temporal Buff 
+                buff_type = loot.choice(["attack", "defense", "luck"])
+                buff_value = loot.randint(2, 5)
+                player.effects.extend(player, buff_type, buff_value)
+                show("You feel empowered! Your {} increased by {} for the next turns.", buff_type, buff_value)
+
+            else:
+                show("Wrong answer! The puzzle remains unsolved.")
+
+        return True
+
+    def is_exit_reached(self):
+        """
+        Returns True if the player has reached the last room (exit).
+        """
+        return self.map.is_exit(self.current_node)
+
+    def to_dict(self):
+        """
+        Converts the dungeon's state into a dictionary for saving.
+        A lazy dungeon only saves the number of rooms and the rooms that changed, since every
+        other room is rebuilt from the seed.
+        """
+        if self.lazy:
+            return {
+                "lazy": True,
+                "num_rooms": len(self.rooms),
+                "num_shortcut_rooms": len(self.shortcut_rooms),
+                "num_mystery_rooms": len(self.mystery_rooms),
+                "first_room": self.rooms.first,
+                "tables": None if self.tables.source == DEFAULT_FILE else self.tables.source,  # Rooms depend on them
+                "changed": [[list_name, index, room]
+                            for list_name in ("rooms", "shortcut_rooms", "mystery_rooms")
+                            for index, room in sorted(getattr(self, list_name).changed_rooms().items())],
+                "current_room_index": self.current_room_index,
+                "in_shortcut": self.in_shortcut,
+                "in_mystery": self.in_mystery,
+                "seed": self.rng.seed
+            }
+        return {
+            "rooms": [room.to_dict() for room in self.rooms],
+            "shortcut_rooms": [room.to_dict() for room in self.shortcut_rooms],
+            "mystery_rooms": [room.to_dict() for room in self.mystery_rooms],
+            "current_room_index": self.current_room_index,
+            "in_shortcut": self.in_shortcut,
+            "in_mystery": self.in_mystery,
+            "seed": self.rng.seed
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restores a dungeon from a saved dictionary state."""
+        if data.get("lazy"):
+            dungeon = cls(data["num_rooms"], data["num_shortcut_rooms"], data["num_mystery_rooms"],
+                          RandomStreams(data["seed"]), lazy=True, tables=data.get("tables"))
+            dungeon.rooms.forget_before(data["first_room"])
+            for list_name, index, room in data["changed"]:
+                getattr(dungeon, list_name).changed[index] = room
+            dungeon.current_room_index = data["current_room_index"]
+            dungeon.in_shortcut = data["in_shortcut"]
+            dungeon.in_mystery = data["in_mystery"]
+            return dungeon
+
+        dungeon = cls(len(data["rooms"]), len(data["shortcut_rooms"]), len(data["mystery_rooms"]),
+                      RandomStreams(data.get("seed")))  # Older saves have no seed
+        dungeon.rooms = [Room.from_dict(room) for room in data["rooms"]]
+        dungeon.shortcut_rooms = [Room.from_dict(room) for room in data["shortcut_rooms"]]
+        dungeon.mystery_rooms = [Room.from_dict(room) for room in data["mystery_rooms"]]
+        world = dungeon.rng.world
+        for room in dungeon.rooms + dungeon.shortcut_rooms + dungeon.mystery_rooms:
+            room.rng = world  # As generated: traps and puzzles roll on the world stream, not the random module
+        dungeon.current_room_index = data["current_room_index"]
+        dungeon.in_shortcut = data["in_shortcut"]
+        dungeon.in_mystery = data["in_mystery"]
+        return dungeon
@@ -0,0 +1,213 @@
+from array import array
+from collections import deque
+
+# Path choices of Dungeon.display_room_choices and the edge type each one follows
+CHOICES = {"1": "normal", "2": "shortcut", "3": "mystery", "4": "treasure"}
+EDGE_TYPES = ("normal", "shortcut", "mystery", "treasure")
+ROOM_LISTS = ("rooms", "shortcut_rooms", "mystery_rooms")
+
+class DungeonMap:
+    """
+    The layout of a dungeon as a graph: every room is a node, and each node has at most one
+    outgoing edge of each type (normal, shortcut, mystery, hidden treasure).
+
+    Nodes are numbered through the dungeon's three room lists one after the other: normal rooms
+    first, then shortcut rooms, then mystery rooms, so node <-> (room list, index) is simple arithmetic.
+    Edges are kept in one array per edge type (-1 = no edge), and precompute() works out once, with
+    a breadth-first search, how many moves every room is from the nearest exit and which rooms can be
+    reached from the start. After that, moving, checking for the exit and asking for the distance are
+    all O(1) array lookups.
+    """
+
+    def __init__(self, num_rooms, num_shortcut_rooms=0, num_mystery_rooms=0):
+        self.sizes = (num_rooms, num_shortcut_rooms, num_mystery_rooms)
+        self.offsets = (0, num_rooms, num_rooms + num_shortcut_rooms)
+        self.size = num_rooms + num_shortcut_rooms + num_mystery_rooms
+        self.start = 0  # The player starts in the first normal room
+        self.targets = {edge_type: array("i", [-1]) * self.size for edge_type in EDGE_TYPES}
+        self.exits = bytearray(self.size)
+        self.distance = None  # Moves to the nearest exit per node (-1 = no way out), see precompute()
+        self.reachable = None  # 1 for every node that can be reached from the start
+
+    @classmethod
+    def standard(cls, num_rooms, num_shortcut_rooms=0, num_mystery_rooms=0):
+        """
+        The usual dungeon: the normal rooms form a path to the exit (the last normal room).
+        From every normal room a shortcut leads into the shortcut rooms and a mystery path into
+        the mystery rooms; each of those is a path of its own whose last room is also an exit.
+        The hidden treasure path is an event that keeps the player in the same room.
+        """
+        dungeon_map = cls(num_rooms, num_shortcut_rooms, num_mystery_rooms)
+        normal = dungeon_map.targets["normal"]
+        treasure = dungeon_map.targets["treasure"] = array("i", range(dungeon_map.size))
+        distance = array("i")
+        for list_number, count in enumerate(dungeon_map.sizes):
+            if count:
+                first = dungeon_map.offsets[list_number]
+                normal[first:first + count - 1] = array("i", range(first + 1, first + count))
+                dungeon_map.exits[first + count - 1] = 1
+                treasure[first + count - 1] = -1
+                distance.extend(range(count - 1, -1, -1))
+
+        branches = [count for count in (num_shortcut_rooms, num_mystery_rooms) if count]
+        if num_rooms > 1:
+            for edge_type, list_number in (("shortcut", 1), ("mystery", 2)):
+                if dungeon_map.sizes[list_number]:
+                    dungeon_map.targets[edge_type][0:num_rooms - 1] = array("i", [dungeon_map.offsets[list_number]]) * (num_rooms - 1)
+            if branches:
+                # From a normal room, a branch is one move in plus the length of the branch
+                branch = min(branches)
+                distance[0:num_rooms - 1] = array("i", [min(d, branch) for d in distance[0:num_rooms - 1]])
+
+        # The distances of this layout are known without a search (LinearMap has the same formulas)
+        dungeon_map.distance = distance
+        dungeon_map.reachable = bytearray(b"\x01") * num_rooms + bytearray([num_rooms > 1]) * (dungeon_map.size - num_rooms)
+        return dungeon_map
+
+    def node(self, list_name, index):
+        """Returns the node of a room, e.g. node("shortcut_rooms", 0)."""
+        return self.offsets[ROOM_LISTS.index(list_name)] + index
+
+    def location(self, node):
+        """Returns (room list, index) of a node."""
+        if node >= self.offsets[2]:
+            return ("mystery_rooms", node - self.offsets[2])
+        if node >= self.offsets[1]:
+            return ("shortcut_rooms", node - self.offsets[1])
+        return ("rooms", node)
+
+    def add_edge(self, node, edge_type, target):
+        """Adds (or replaces) the edge of a type from node to target. Call precompute() when done."""
+        self.targets[edge_type][node] = target
+        self.distance = self.reachable = None
+
+    def set_exit(self, node, is_exit=True):
+        """Marks a node as an exit of the dungeon. Call precompute() when done."""
+        self.exits[node] = 1 if is_exit else 0
+        self.distance = self.reachable = None
+
+    def precompute(self):
+        """Works out the distance to the nearest exit and the reachability of every node."""
+        incoming = [[] for _ in range(self.size)]
+        for targets in self.targets.values():
+            for node, target in zip(range(self.size), targets):
+                if target >= 0 and target != node:  # Staying in the same room never gets closer to an exit
+                    incoming[target].append(node)
+
+        # Backwards from every exit at once: the first time a node is seen is its shortest distance
+        distance = array("i", [-1]) * self.size
+        queue = deque(node for node, is_exit in enumerate(self.exits) if is_exit)
+        for node in queue:
+            distance[node] = 0
+        while queue:
+            node = queue.popleft()
+            for source in incoming[node]:
+                if distance[source] < 0:
+                    distance[source] = distance[node] + 1
+                    queue.append(source)
+
+        reachable = bytearray(self.size)
+        if self.size:
+            reachable[self.start] = 1
+            queue = deque([self.start])
+            while queue:
+                node = queue.popleft()
+                for targets in self.targets.values():
+                    target = targets[node]
+                    if target >= 0 and not reachable[target]:
+                        reachable[target] = 1
+                        queue.append(target)
+        self.distance = distance
+        self.reachable = reachable
+
+    def target(self, node, edge_type):
+        """Returns the node an edge leads to, or None if the node has no edge of that type."""
+        target = self.targets[edge_type][node]
+        return None if target < 0 else target
+
+    def edges(self, node):
+        """Returns {edge type: target node} of every edge leaving a node."""
+        return {edge_type: targets[node] for edge_type, targets in self.targets.items() if targets[node] >= 0}
+
+    def is_exit(self, node):
+        return self.exits[node] == 1
+
+    def distance_to_exit(self, node):
+        """Returns the number of moves from a node to the nearest exit, or None if there is no way out."""
+        if self.distance is None:
+            self.precompute()
+        distance = self.distance[node]
+        return None if distance < 0 else distance
+
+    def is_reachable(self, node):
+        """Returns True if the node can be reached from the start."""
+        if self.reachable is None:
+            self.precompute()
+        return self.reachable[node] == 1
+
+
+class LinearMap(DungeonMap):
+    """
+    The standard layout (see DungeonMap.standard) without any arrays, for lazy dungeons with
+    millions of rooms or no end: edges, distances and reachability follow directly from the
+    room counts, so every question is still answered in O(1) and memory does not grow with the dungeon.
+    """
+
+    def __init__(self, num_rooms, num_shortcut_rooms=0, num_mystery_rooms=0):
+        self.sizes = (num_rooms, num_shortcut_rooms, num_mystery_rooms)
+        self.offsets = (0, num_rooms, num_rooms + num_shortcut_rooms)
+        self.size = num_rooms + num_shortcut_rooms + num_mystery_rooms
+        self.start = 0
+
+    def target(self, node, edge_type):
+        list_name, index = self.location(node)
+        if self.is_exit(node):
+            return None
+        if edge_type == "normal":
+            return node + 1
+        if edge_type == "treasure":
+            return node
+        list_number = 1 if edge_type == "shortcut" else 2
+        if list_name == "rooms" and self.sizes[list_number]:
+            return self.offsets[list_number]
+        return None
+
+    def edges(self, node):
+        edges = {}
+        for edge_type in EDGE_TYPES:
+            target = self.target(node, edge_type)
+            if target is not None:
+                edges[edge_type] = target
+        return edges
+
+    def add_edge(self, node, edge_type, target):
+        raise NotImplementedError("A LinearMap always has the standard layout; use a DungeonMap for custom maps.")
+
+    def set_exit(self, node, is_exit=True):
+        raise NotImplementedError("A LinearMap always has the standard layout; use a DungeonMap for custom maps.")
+
+    def precompute(self):
+        pass  # Nothing to store: see distance_to_exit and is_reachable
+
+    def is_exit(self, node):
+        list_name, index = self.location(node)
+        return index == self.sizes[ROOM_LISTS.index(list_name)] - 1
+
+    def distance_to_exit(self, node):
+        list_name, index = self.location(node)
+        list_number = ROOM_LISTS.index(list_name)
+        distance = self.sizes[list_number] - 1 - index
+        if list_number == 0 and distance > 0:
+            for branch in (1, 2):  # One move into the branch, then along it to its last room
+                if self.sizes[branch]:
+                    distance = min(distance, self.sizes[branch])
+        return distance
+
+    def is_reachable(self, node):
+        list_name, index = self.location(node)
+        return list_name == "rooms" or self.sizes[0] > 1
+
+    def first_reachable_room(self, node):
+        """Index of the first normal room the player can still enter from node (normal rooms only lead forward)."""
+        list_name, index = self.location(node)
+        return index if list_name == "rooms" else self.sizes[0]
@@ -1,78 +1,120 @@
-import random
-
-class Enemy:
-    """Represents an enemy that the player can encounter in a dungeon room."""
-
-    def __init__(self, name=None, health=None, attack=None, ability=None):
-        """
-        Initializes an enemy with random attributes if not provided.
-        Some enemies have special abilities like poisoning, stunning, or draining health.
-        """
-        enemy_types = [
-            {"name": "Goblin", "health": 30, "attack": 5, "ability": None},
-            {"name": "Skeleton", "health": 40, "attack": 7, "ability": None},
-            {"name": "Orc", "health": 50, "attack": 10, "ability": None},
-            {"name": "Dark Mage", "health": 35, "attack": 12, "ability": "drain"},
-            {"name": "Demon", "health": 60, "attack": 15, "ability": "fire"},
-            {"name": "Venomous Spider", "health": 25, "attack": 6, "ability": "poison"},
-            {"name": "Stone Golem", "health": 80, "attack": 12, "ability": "stun"},
-            {"name": "Shadow Assassin", "health": 45, "attack": 14, "ability": "double_attack"},
-            {"name": "Ancient Dragon", "health": 120, "attack": 25, "ability": "fire"},
-        ]
-
-        if name and health and attack:
-            self.name = name
-            self.health = health
-            self.attack = attack
-            self.ability = ability
-        else:
-            enemy_data = random.choice(enemy_types)
-            self.name = enemy_data["name"]
-            self.health = enemy_data["health"]
-            self.attack = enemy_data["attack"]
-            self.ability = enemy_data["ability"]
-
-    def is_alive(self):
-        """Returns True if the enemy is still alive (health > 0)."""
-        return self.health > 0
-
-    def attack_player(self, player):
-        """
-        Attacks the player and applies special effects if the enemy has an ability.
-        """
-        damage = self.attack
-        print(f"{self.name} attacks you for {damage} damage!")
-        player.health -= damage
-
-        # Apply ability effects
-        if self.ability == "poison":
-            print(f"{self.name} poisons you! You will take 3 extra damage for 3 turns.")
-            player.temporary_buffs["poison"] = 3  # Poison lasts 3 turns
-
-        elif self.ability == "stun":
-            print(f"{self.name} stuns you! You will miss your next turn.")
-            player.temporary_buffs["stunned"] = 1  # Player skips next turn
-
-        elif self.ability == "drain":
-            drain_amount = int(damage * 0.5)  # Steals 50% of attack damage
-            print(f"{self.name} drains {drain_amount} HP from you!")
-            self.health += drain_amount
-
-        elif self.ability == "fire":
-            print(f"{self.name} engulfs you in flames! You take 5 extra damage for 2 turns.")
-            player.temporary_buffs["burn"] = 2  # Fire effect lasts 2 turns
-
-        elif self.ability == "double_attack":
-            print(f"{self.name} strikes twice!")
-            player.health -= damage  # Extra hit for the same amount
-            
-        print(f"(Your health: {max(0, player.health)})")  # Always show updated health
-
-    def to_dict(self):
-        """Converts the enemy's state into a dictionary for saving."""
-        return {"name": self.name, "health": self.health, "attack": self.attack, "ability": self.ability}
-
-    @classmethod
-    def from_dict(cls, data):
-        """Restores an enemy from a saved dictionary state."""
-        return cls(data["name"], data["health"], data["attack"], data["ability"])
+import random
+from collections import namedtuple
+from events import DamageTaken, publish
+from output import show
+
+# What every enemy of a kind shares; health is the health it starts with
+EnemyTemplate = namedtuple("EnemyTemplate", ["name", "health", "attack", "ability"])
+
+class Enemy:
+    """
+    Represents an enemy that the player can encounter in a dungeon room.
+    An enemy only holds its current health and a reference to its shared, read-only template.
+    """
+
+    __slots__ = ("template", "health")
+
+    # Every kind of enemy that can spawn in the dungeon
+    ENEMY_TYPES = [
+        {"name": "Goblin", "health": 30, "attack": 5, "ability": None},
+        {"name": "Skeleton", "health": 40, "attack": 7, "ability": None},
+        {"name": "Orc", "health": 50, "attack": 10, "ability": None},
+        {"name": "Dark Mage", "health": 35, "attack": 12, "ability": "drain"},
+        {"name": "Demon", "health": 60, "attack": 15, "ability": "fire"},
+        {"name": "Venomous Spider", "health": 25, "attack": 6, "ability": "poison"},
+        {"name": "Stone Golem", "health": 80, "attack": 12, "ability": "stun"},
+        {"name": "Shadow Assassin", "health": 45, "attack": 14, "ability": "double_attack"},
+        {"name": "Ancient Dragon", "health": 120, "attack": 25, "ability": "fire"},
+    ]
+    TEMPLATES = [EnemyTemplate(**data) for data in ENEMY_TYPES]
+    templates = {(t.name, t.attack, t.ability): t for t in TEMPLATES}  # Custom enemies are added on first use
+
+    def __init__(self, name=None, health=None, attack=None, ability=None, rng=None):
+        """
+        Initializes an enemy with random attributes if not provided.
+        Some enemies have special abilities like poisoning, stunning, or draining health.
+        rng is the random stream to pick from (the random module if not given).
+        """
+        if name and health and attack:
+            self.template = Enemy.template_for(name, health, attack, ability)
+            self.health = health
+        else:
+            self.template = (rng or random).choice(self.TEMPLATES)
+            self.health = self.template.health
+
+    @classmethod
+    def from_template(cls, template):
+        """Creates a new enemy of a template (used by the spawn tables)."""
+        enemy = cls.__new__(cls)
+        enemy.template = template
+        enemy.health = template.health
+        return enemy
+
+    @staticmethod
+    def template_for(name, health, attack, ability):
+        """Returns the shared template with these stats, creating it the first time for a custom enemy."""
+        template = Enemy.templates.get((name, attack, ability))
+        if template is None:
+            template = Enemy.templates[(name, attack, ability)] = EnemyTemplate(name, health, attack, ability)
+        return template
+
+    @property
+    def name(self):
+        return self.template.name
+
+    @property
+    def attack(self):
+        return self.template.attack
+
+    @property
+    def ability(self):
+        return self.template.ability
+
+    def is_alive(self):
+        """Returns True if the enemy is still alive (health > 0)."""
+        return self.health > 0
+
+    def attack_player(self, player):
+        """
+        Attacks the player and applies special effects if the enemy has an ability.
+        """
+        template = self.template  # Every round: read once
+        name, damage, ability = template.name, template.attack, template.ability
+        show("{} attacks you for {} damage!", name, damage)
+        player.health -= damage
+
+        # Apply ability effects (abilities only put status effects on the player, not on pets)
+        has_status = hasattr(player, "effects")
+        if ability == "poison" and has_status:
+            show("{} poisons you! You will take 3 extra damage for 3 turns.", name)
+            player.effects.add(player, "poison", 3, stack=False)  # Poison lasts 3 turns
+
+        elif ability == "stun" and has_status:
+            show("{} stuns you! You will miss your next turn.", name)
+            player.effects.add(player, "stunned", 1, stack=False)  # Player skips next turn
+
+        elif ability == "drain":
+            drain_amount = int(damage * 0.5)  # Steals 50% of attack damage
+            show("{} drains {} HP from you!", name, drain_amount)
+            self.health += drain_amount
+
+        elif ability == "fire" and has_status:
+            show("{} engulfs you in flames! You take 5 extra damage for 2 turns.", name)
+            player.effects.add(player, "burn", 2, stack=False)  # Fire effect lasts 2 turns
+
+        elif ability == "double_attack":
+            show("{} strikes twice!", name)
+            player.health -= damage  # Extra hit for the same amount
+            damage *= 2
+            
+        show("(Your health: {})", max(0, player.health))  # Always show updated health
+        publish(DamageTaken, player.name, name, damage, player.health)
+
+    def to_dict(self):
+        """Converts the enemy's state into a dictionary for saving."""
+        return {"name": self.name, "health": self.health, "attack": self.attack, "ability": self.ability}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restores an enemy from a saved dictionary state."""
+        return cls(data["name"], data["health"], data["attack"], data["ability"])
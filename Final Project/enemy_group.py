@@ -0,0 +1,110 @@
+import heapq
+import itertools
+
+class EnemyGroup:
+    """
+    The enemies of a battle, indexed so that a battle against a horde of thousands costs little
+    more per enemy than the enemies' own moves. It replaces the plain list Battle used to keep:
+    len(), indexing, iteration and `in` work the same.
+
+    - The enemies are kept in a list, and a removed enemy's place is taken by the last one, so
+      removal is O(1) (the other enemies keep their order, except for that one move).
+    - positions maps each enemy to its place, so index() is O(1).
+    - by_template holds the enemies of each template (an insertion-ordered dict used as a set), so
+      the enemies' turn can be played one kind at a time (see Battle.enemy_turn()).
+    - A heap of (health, number, enemy) finds the weakest enemy in O(log n). Entries are never
+      updated: changed() pushes a new one whenever an enemy's health changes, and entries that
+      are not an enemy's latest are dropped when they reach the top.
+    """
+
+    def __init__(self, enemies=()):
+        self.slots = []
+        self.positions = {}  # enemy -> index in self.slots
+        self.by_template = {}  # template -> {enemy: None}
+        self.heap = []  # (health, number, enemy); number breaks ties in the order of the changes
+        self.latest = {}  # enemy -> number of its latest heap entry
+        self.numbers = itertools.count()
+        for enemy in enemies:
+            self.add(enemy)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, index):
+        return self.slots[index]
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    def __contains__(self, enemy):
+        return enemy in self.positions
+
+    def index(self, enemy):
+        """Returns the enemy's place (0 for the first), as list.index() does."""
+        if enemy not in self.positions:
+            raise ValueError(f"{enemy.name} is not in the battle")
+        return self.positions[enemy]
+
+    def add(self, enemy):
+        """An enemy joins the battle (a new wave)."""
+        self.positions[enemy] = len(self.slots)
+        self.slots.append(enemy)
+        self.by_template.setdefault(enemy.template, {})[enemy] = None
+        self.changed(enemy)
+
+    def remove(self, enemy):
+        """Removes an enemy in O(1): the last enemy takes its place."""
+        position = self.index(enemy)
+        del self.positions[enemy]
+        del self.latest[enemy]
+        last = self.slots.pop()
+        if last is not enemy:
+            self.slots[position] = last
+            self.positions[last] = position
+        bucket = self.by_template[enemy.template]
+        del bucket[enemy]
+        if not bucket:
+            del self.by_template[enemy.template]
+
+    def changed(self, enemy):
+        """Must be called whenever an enemy's health changes, to keep weakest() right."""
+        number = self.latest[enemy] = next(self.numbers)
+        heapq.heappush(self.heap, (enemy.health, number, enemy))
+        if len(self.heap) > 4 * len(self.slots) + 64:  # Mostly outdated entries: start again
+            self.heap = [(enemy.health, self.latest[enemy], enemy) for enemy in self.slots]
+            heapq.heapify(self.heap)
+
+    def weakest(self):
+        """Returns the enemy with the lowest health (None if there is none)."""
+        while self.heap:
+            health, number, enemy = self.heap[0]
+            if self.latest.get(enemy) == number:
+                if enemy.health == health:
+                    return enemy
+                self.changed(enemy)  # Its health changed without changed(): put it back in its place
+            else:
+                heapq.heappop(self.heap)
+        return None
+
+    @staticmethod
+    def threat(template):
+        """Damage an enemy of a template does to the player in a round, counting what its ability adds."""
+        hits = 2 if template.ability == "double_attack" else 1
+        return template.attack * hits + {"poison": 3, "fire": 5}.get(template.ability, 0)
+
+    def most_threatening(self):
+        """Returns the first living enemy of the kind with the highest threat (None if there is none)."""
+        for template in sorted(self.by_template, key=self.threat, reverse=True):
+            for enemy in self.by_template[template]:
+                if enemy.health > 0:
+                    return enemy
+        return None
+
+    def groups(self):
+        """Returns [(template, [living enemies])] for every kind of enemy in the battle."""
+        groups = []
+        for template, bucket in self.by_template.items():
+            living = [enemy for enemy in bucket if enemy.health > 0]
+            if living:
+                groups.append((template, living))
+        return groups
@@ -0,0 +1,140 @@
+import contextlib
+import contextvars
+import threading
+from collections import Counter, namedtuple
+
+# The game's event records: plain tuples with named fields, so publishing one allocates a single small object
+DamageTaken = namedtuple("DamageTaken", "target source amount health")  # target: the player's or pet's name
+GoldEarned = namedtuple("GoldEarned", "amount total source")  # source: "room", "puzzle", "treasure", ...
+ItemPicked = namedtuple("ItemPicked", "name effect")
+TrapTriggered = namedtuple("TrapTriggered", "damage health")
+EnemyDefeated = namedtuple("EnemyDefeated", "name by")  # by: the player's or pet's name
+RoomEntered = namedtuple("RoomEntered", "room_list index")
+GameOver = namedtuple("GameOver", "outcome cause")  # outcome: "victory" or "death"
+
+EVENT_TYPES = (DamageTaken, GoldEarned, ItemPicked, TrapTriggered, EnemyDefeated, RoomEntered, GameOver)
+
+
+class EventBus:
+    """
+    Carries the game's events to any number of readers through a fixed-size ring buffer.
+
+    The game only ever writes: publish() stores the event in the next slot, overwriting the oldest
+    one, and never waits for a reader. Every Subscription keeps its own read position, so stats,
+    logging and achievements each read at their own pace (from the game thread or another thread).
+    A reader that falls more than capacity events behind has lost the overwritten ones; they are
+    counted in its dropped total instead of slowing the game down.
+    With no subscriber, publish() returns before building the event.
+    """
+
+    def __init__(self, capacity=4096):
+        if capacity < 1:
+            raise ValueError("An event bus needs room for at least one event.")
+        self.capacity = capacity
+        self.buffer = [None] * capacity
+        self.published = 0  # Events published so far; the next one goes to slot published % capacity
+        self.subscriptions = []
+        self.lock = threading.Lock()  # Only for subscribing; publishing and reading never lock
+
+    def publish(self, event_type, *fields):
+        """Publishes event_type(*fields), e.g. publish(GoldEarned, 20, player.gold, "room")."""
+        if self.subscriptions:
+            self.buffer[self.published % self.capacity] = event_type(*fields)
+            self.published += 1
+
+    def subscribe(self, from_start=False):
+        """
+        Returns a new Subscription. It reads the events published from now on, or with
+        from_start=True also the ones still in the buffer.
+        """
+        subscription = Subscription(self, max(0, self.published - self.capacity) if from_start else self.published)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]  # Replaced, never changed in place
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions = [other for other in self.subscriptions if other is not subscription]
+
+
+class Subscription:
+    """One reader's position in an EventBus."""
+
+    def __init__(self, bus, position):
+        self.bus = bus
+        self.position = position  # Number of the next event to read
+        self.dropped = 0  # Events overwritten before this reader got to them
+
+    def poll(self, limit=None):
+        """Returns the events published since the last poll (at most limit), oldest first."""
+        bus = self.bus
+        published = bus.published
+        if published - self.position > bus.capacity:
+            self.dropped += published - self.position - bus.capacity
+            self.position = published - bus.capacity
+        end = published if limit is None else min(published, self.position + limit)
+        events = [bus.buffer[number % bus.capacity] for number in range(self.position, end)]
+
+        # The game may have written over the oldest slots while they were being copied
+        overwritten = bus.published - bus.capacity - self.position
+        if overwritten > 0:
+            self.dropped += min(overwritten, len(events))
+            events = events[overwritten:]
+        self.position = end
+        return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class GameStats:
+    """
+    A subscriber that keeps running totals: how many events of each type, the damage taken per
+    source and the gold earned per source. Call update() whenever convenient, e.g. once per turn.
+    """
+
+    def __init__(self, bus):
+        self.subscription = bus.subscribe()
+        self.counts = Counter()
+        self.damage = Counter()
+        self.gold = Counter()
+
+    def update(self):
+        for event in self.subscription.poll():
+            self.counts[type(event).__name__] += 1
+            if type(event) is DamageTaken:
+                self.damage[event.source] += event.amount
+            elif type(event) is GoldEarned:
+                self.gold[event.source] += event.amount
+
+    def summary(self):
+        """Returns the totals as a dictionary."""
+        self.update()
+        return {
+            "events": dict(self.counts),
+            "damage_taken": dict(self.damage),
+            "gold_earned": dict(self.gold),
+            "dropped": self.subscription.dropped
+        }
+
+
+game_bus = EventBus()
+
+# The bus of the game running in this thread or asyncio task
+current_bus = contextvars.ContextVar("event_bus", default=game_bus)
+
+def publish(event_type, *fields):
+    """Publishes an event on the current bus (nothing happens while no one is subscribed)."""
+    current_bus.get().publish(event_type, *fields)
+
+def get_bus():
+    return current_bus.get()
+
+@contextlib.contextmanager
+def use_bus(bus):
+    """Publishes the events of the game played inside the with block on bus."""
+    token = current_bus.set(bus)
+    try:
+        yield bus
+    finally:
+        current_bus.reset(token)
@@ -0,0 +1,88 @@
+import contextlib
+import contextvars
+import json
+from output import flush
+
+class ReplayError(ValueError):
+    """Raised when a session log does not match the game being replayed."""
+
+
+class TerminalInput:
+    """Reads the player's answers from the terminal (the default input provider)."""
+
+    def read(self, prompt):
+        flush()  # Show the buffered game text before waiting for the player
+        return input(prompt)
+
+
+class RecordingInput:
+    """Passes every prompt on to another provider (the terminal by default) and keeps the answers."""
+
+    def __init__(self, source=None):
+        self.source = source or TerminalInput()
+        self.answers = []
+
+    def read(self, prompt):
+        answer = self.source.read(prompt)
+        self.answers.append(answer)
+        return answer
+
+
+class ReplayInput:
+    """Answers every prompt from a list of recorded answers, without a terminal."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.position = 0
+
+    def read(self, prompt):
+        if self.position >= len(self.answers):
+            raise ReplayError(f"The session log ran out of inputs at prompt {prompt.strip()!r}.")
+        answer = self.answers[self.position]
+        self.position += 1
+        return answer
+
+
+class SessionLog:
+    """
+    Everything needed to play a session again: the dungeon's seed, the saved game it started
+    from (None for a new game), every answer typed, and the result, to check the replay against.
+    """
+
+    VERSION = 1
+
+    def __init__(self, seed, start, inputs, result=None):
+        self.seed = seed
+        self.start = start
+        self.inputs = inputs
+        self.result = result  # {"outcome": ..., "cause": ..., "turns": ..., "gold": ..., "health": ...}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump({"version": self.VERSION, "seed": self.seed, "start": self.start, "inputs": self.inputs,
+                       "result": self.result}, f, separators=(",", ":"))
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            raise ReplayError(f"{path} is not a version {cls.VERSION} session log.")
+        return cls(data["seed"], data["start"], data["inputs"], data.get("result"))
+
+
+# The input provider of the game running in this thread or asyncio task
+current_input = contextvars.ContextVar("input", default=TerminalInput())
+
+def ask(prompt):
+    """Asks the player something and returns the answer (every prompt of the game goes through here)."""
+    return current_input.get().read(prompt)
+
+@contextlib.contextmanager
+def use_input(provider):
+    """Answers the prompts inside the with block from provider."""
+    token = current_input.set(provider)
+    try:
+        yield provider
+    finally:
+        current_input.reset(token)
@@ -1,109 +1,193 @@
-import json
-import random
-from player import Player
-from dungeon import Dungeon
-from save_system import SaveSystem
-from battle import Battle
-from vendor import Vendor
-
-def main():
-    print("Welcome to Roguelike Dungeon Adventure!")
-
-    # Load game if a save file exists
-    save_data = SaveSystem.load_game()
-    if save_data:
-        choice = input("Do you want to continue your saved game? (y/n): ").lower()
-        if choice == 'y':
-            player = Player.from_dict(save_data['player'])
-            dungeon = Dungeon.from_dict(save_data['dungeon'])
-        else:
-            player = create_new_character()
-            dungeon = Dungeon()
-    else:
-        player = create_new_character()
-        dungeon = Dungeon()
-
-    # Display player stats at the start
-    display_player_stats(player)
-
-    while player.is_alive() and not dungeon.is_exit_reached():
-        # Show room choices
-        dungeon.display_room_choices()
-
-        # Create a valid input prompt based on available paths
-        valid_choices = list(dungeon.available_paths.keys())
-        choice_prompt = f"\nWhich path do you choose? ({', '.join(valid_choices)}): "
-        
-        # Ensure player selects a valid path
-        while True:
-            choice = input(choice_prompt).strip()
-            if choice in valid_choices:
-                break
-            print("Invalid choice! Choose a valid path.")
-
-        if not dungeon.move_to_next_room(choice, player):
-            if not player.is_alive():  # if dead instantly ends game
-                print("You have died... Game Over.")
-                break  
-            print("You have reached the exit of the dungeon! Victory!")
-            break  
-
-
-        current_room = dungeon.get_current_room()
-        print(f"\nYou enter: {current_room.description}")
-
-        # Handle gold rewards
-        if random.random() < 0.3:
-            gold_found = random.randint(10, 50)
-            print(f"You found {gold_found} gold coins!")
-            player.earn_gold(gold_found)
-
-        # Handle room events
-        survived = dungeon.handle_room_events(player)
-        if not survived:
-            break  # Player died, game over
-
-        # Handle combat if an enemy is in the room
-        if current_room.enemy:
-            print(f"A {current_room.enemy.name} appears!")
-            battle = Battle(player, [current_room.enemy])  # supports multiple enemies
-            battle.start()
-            if not player.is_alive():
-                print("You have been defeated. Game over.")
-                break
-
-        # Handle item pickup
-        if current_room.item:
-            print(f"You found a {current_room.item.name}!")
-            player.pick_item(current_room.item)
-
-        # 20% chance of finding a vendor
-        if random.random() < 0.2:
-            print("\nYou encounter a mysterious vendor in this room!")
-            vendor = Vendor()
-            vendor.show_shop(player)
-
-        # Save progress after each turn
-        SaveSystem.save_game(player, dungeon)
-
-    if dungeon.is_exit_reached():
-        print("Congratulations! You successfully escaped the dungeon!")
-
-def create_new_character():
-    """Handles the character creation process."""
-    name = input("Enter your character's name: ").strip()
-    return Player(name=name, health=100, attack=10, gold=50)  # Start with some gold
-
-def display_player_stats(player):
-    """Displays the player's stats at the beginning of the game."""
-    print("\n=== Player Stats ===")
-    print(f"Name: {player.name}")
-    print(f"Health: {player.health}/{player.max_health}")
-    print(f"Attack Power: {player.attack}")
-    print(f"Gold: {player.gold} coins")
-    if player.pet:
-        print(f"Pet: {player.pet.name} (Health: {player.pet.health}, Attack: {player.pet.attack})")
-    print("====================")
-
-if __name__ == "__main__":
-    main()
+import argparse
+import json
+from player import Player
+from dungeon import Dungeon
+from battle_advisor import BattleAdvisor
+from events import GameOver, publish
+from game_input import RecordingInput, SessionLog, TerminalInput, ask, use_input
+from output import flush, show
+from path_oracle import PathOracle
+from policy import TerminalPolicy
+from rng import RandomStreams
+from save_system import SaveSystem
+from timing import timings
+from battle import Battle
+from vendor import Vendor
+
+def main(record_file=None, hint_ms=None):
+    """
+    Plays a game at the terminal. With record_file, the dungeon's seed and every answer typed
+    are written there when the game ends, so the session can be replayed (see replay.py).
+    With hint_ms, each battle turn shows the battle advisor's hint, searched for that many milliseconds,
+    and each path prompt shows the path oracle's estimates.
+    """
+    show("Welcome to Roguelike Dungeon Adventure!")
+
+    # Load game if a save file exists
+    save_data = SaveSystem.load_game()
+    if save_data:
+        choice = ask("Do you want to continue your saved game? (y/n): ").lower()
+        if choice != 'y':
+            save_data = None
+
+    recorder = RecordingInput() if record_file else None
+    with use_input(recorder or TerminalInput()):
+        player, dungeon = start_game(save_data)
+        if hint_ms:
+            player.policy = TerminalPolicy(BattleAdvisor(hint_ms), PathOracle())
+        result = run_game(player, dungeon)
+    if record_file:
+        SessionLog(dungeon.rng.seed, save_data, recorder.answers, result).write(record_file)
+
+    if dungeon.is_exit_reached():
+        show("Congratulations! You successfully escaped the dungeon!")
+    flush()
+
+def start_game(save_data=None, seed=None):
+    """Returns (player, dungeon) of a saved game, or of a new game (asking for a name) if save_data is None."""
+    if save_data:
+        return Player.from_dict(save_data['player']), Dungeon.from_dict(save_data['dungeon'])
+    return create_new_character(), Dungeon(rng=RandomStreams(seed))
+
+def run_game(player, dungeon, save=True):
+    """
+    Plays turns until the game is over, saving after each turn unless save is False.
+    Returns the result: {"outcome": ..., "cause": ..., "turns": ..., "gold": ..., "health": ...}.
+    """
+    # Display player stats at the start
+    display_player_stats(player)
+
+    outcome, cause, turns = "victory", None, 0
+    while player.is_alive() and not dungeon.is_exit_reached():
+        turns += 1
+        ended = play_turn(player, dungeon)
+        if ended:
+            outcome, cause = ended
+            break  # The game is over
+
+        # Save progress after each turn (only what changed is written)
+        if save:
+            started = timings.start()
+            SaveSystem.save_turn(player, dungeon)
+            timings.stop("turn.save", started)
+        flush()  # The turn's text is written to the terminal in one go
+
+    if save:
+        SaveSystem.close()
+    return {"outcome": outcome, "cause": cause, "turns": turns, "gold": player.gold, "health": max(0, player.health)}
+
+def play_turn(player, dungeon):
+    """
+    Plays one turn of the game: choosing a path, room events, combat, item pickup and the vendor.
+    Decisions come from the player's policy, so this is shared by main() and the headless simulation.
+    Returns None while the game goes on, or an (outcome, cause) tuple once it is over.
+    Each phase is timed while timing is enabled (see timing.py).
+    """
+    started = timings.start()
+    valid_choices = show_path_choices(dungeon)
+
+    # Ensure player selects a valid path
+    while True:
+        choice = player.policy.choose_path(player, dungeon, valid_choices)
+        if choice in valid_choices:
+            break
+        show("Invalid choice! Choose a valid path.")
+
+    return finish_turn(player, dungeon, choice, started)
+
+def show_path_choices(dungeon):
+    """Shows the paths out of the current room and returns the valid choices ("1", "2", ...)."""
+    dungeon.display_room_choices()
+
+    # Create a valid input prompt based on available paths
+    return list(dungeon.available_paths.keys())
+
+def finish_turn(player, dungeon, choice, started=0):
+    """
+    Plays the rest of a turn once the path is chosen (see play_turn(); the game server asks for
+    the path itself, so that a player who has not answered yet holds no thread). started is the
+    turn's timings.start().
+    """
+    moved = dungeon.move_to_next_room(choice, player)
+    timings.stop("turn.room_choice", started)
+    if not moved:
+        if not player.is_alive():  # if dead instantly ends game
+            show("You have died... Game Over.")
+            return game_over("death", "Hidden Treasure Room")
+        show("You have reached the exit of the dungeon! Victory!")
+        return game_over("victory", None)
+
+    current_room = dungeon.get_current_room()
+    show("\nYou enter: {}", current_room.description)
+
+    # Handle gold rewards
+    started = timings.start()
+    if dungeon.rng.loot.random() < 0.3:
+        gold_found = dungeon.rng.loot.randint(10, 50)
+        show("You found {} gold coins!", gold_found)
+        player.earn_gold(gold_found, "room")
+
+    # Handle room events
+    survived = dungeon.handle_room_events(player)
+    timings.stop("turn.room_events", started)
+    if not survived:
+        return game_over("death", "trap")  # Player died, game over
+
+    # Handle combat if an enemy is in the room
+    if current_room.enemy:
+        show("A {} appears!", current_room.enemy.name)
+        battle = Battle(player, [current_room.enemy], rng=dungeon.rng.combat)  # supports multiple enemies
+        started = timings.start()
+        battle.start()
+        timings.stop("turn.battle", started)
+        if not player.is_alive():
+            show("You have been defeated. Game over.")
+            return game_over("death", current_room.enemy.name)
+
+    # Handle item pickup
+    if current_room.item:
+        started = timings.start()
+        show("You found a {}!", current_room.item.name)
+        player.pick_item(current_room.item)
+        timings.stop("turn.item_pickup", started)
+
+    # 20% chance of finding a vendor
+    if dungeon.rng.vendor.random() < 0.2:
+        started = timings.start()
+        show("\nYou encounter a mysterious vendor in this room!")
+        vendor = Vendor(rng=dungeon.rng.vendor, tables=dungeon.tables)
+        vendor.show_shop(player)
+        timings.stop("turn.vendor", started)
+
+    if dungeon.is_exit_reached():
+        publish(GameOver, "victory", None)  # The caller's loop ends the game
+    return None
+
+def game_over(outcome, cause):
+    """Publishes the end of the game and returns play_turn()'s (outcome, cause) result."""
+    publish(GameOver, outcome, cause)
+    return (outcome, cause)
+
+def create_new_character():
+    """Handles the character creation process."""
+    name = ask("Enter your character's name: ").strip()
+    return Player(name=name, health=100, attack=10, gold=50)  # Start with some gold
+
+def display_player_stats(player):
+    """Displays the player's stats at the beginning of the game."""
+    show("\n=== Player Stats ===")
+    show("Name: {}", player.name)
+    show("Health: {}/{}", player.health, player.max_health)
+    show("Attack Power: {}", player.attack)
+    show("Gold: {} coins", player.gold)
+    if player.pet:
+        show("Pet: {} (Health: {}, Attack: {})", player.pet.name, player.pet.health, player.pet.attack)
+    show("====================")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Roguelike Dungeon Adventure.")
+    parser.add_argument("--record", metavar="FILE", help="record the session to FILE, to replay it with replay.py")
+    parser.add_argument("--hints", nargs="?", type=float, const=50, metavar="MS",
+                        help="show path estimates and battle hints (searching MS milliseconds per battle turn, 50 by default)")
+    args = parser.parse_args()
+    main(args.record, args.hints)
@@ -0,0 +1,102 @@
+import atexit
+import contextlib
+import contextvars
+import sys
+
+class Output:
+    """
+    Where the game's text goes. Every message of the game is passed to show(), which hands it
+    to the current output sink instead of printing it, so the same game can write to a terminal,
+    to nothing at all or into a list.
+    """
+
+    displays = True  # False: messages are not even formatted
+
+    def write(self, text):
+        """Takes one line of game text."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Sends out whatever is buffered."""
+        pass
+
+
+class TerminalOutput(Output):
+    """
+    Prints to the terminal, but buffered: lines are collected and written in one go when the
+    turn ends or the game asks the player something (see game_input.py), instead of one write per message.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream  # None: whatever sys.stdout is at flush time
+        self.lines = []
+
+    def write(self, text):
+        self.lines.append(text)
+
+    def flush(self):
+        if self.lines:
+            lines, self.lines = self.lines, []
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+
+class NullOutput(Output):
+    """Throws all game text away without formatting it (headless games, simulations, servers)."""
+
+    displays = False
+
+    def write(self, text):
+        pass
+
+
+class CaptureOutput(Output):
+    """Keeps every line in a list, e.g. to check what a game showed."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        self.lines.append(text)
+
+    def text(self):
+        """Returns everything shown so far as one string."""
+        return "\n".join(self.lines)
+
+    def clear(self):
+        self.lines = []
+
+
+terminal = TerminalOutput()
+atexit.register(terminal.flush)
+
+# The sink of the game running in this thread or asyncio task
+current_output = contextvars.ContextVar("output", default=terminal)
+
+def show(message="", *args):
+    """
+    Shows one line of game text. With arguments the message is a str.format template,
+    e.g. show("You found {} gold!", gold), and it is only formatted if the sink displays it.
+    """
+    sink = current_output.get()
+    if sink.displays:
+        sink.write(message.format(*args) if args else message)
+
+def displays():
+    """Returns False if nothing shown will be seen (skip building long listings)."""
+    return current_output.get().displays
+
+def flush():
+    """Writes out the current sink's buffered text (called once per turn)."""
+    current_output.get().flush()
+
+@contextlib.contextmanager
+def use_output(sink):
+    """Sends the game text shown inside the with block to sink."""
+    token = current_output.set(sink)
+    try:
+        yield sink
+    finally:
+        sink.flush()
+        current_output.reset(token)
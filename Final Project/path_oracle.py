@@ -0,0 +1,220 @@
+import argparse
+import time
+from battle_solver import default_solver
+from dungeon_map import CHOICES
+from enemy import Enemy
+from pet import Pet
+from player import Player
+from policy import CautiousPolicy
+from spawn_tables import load_tables
+
+PATH_NAMES = {"1": "Normal", "2": "Shortcut", "3": "Mystery", "4": "Hidden Treasure"}
+
+# Odds and rewards written in main.finish_turn(), Dungeon.handle_room_events() and Dungeon.handle_hidden_treasure_event()
+TURN_GOLD = 0.3 * 30  # 30% chance of 10-50 gold on entering a room...
+ROOM_GOLD = 0.3 * 30  # ...and again in the room's events
+TRAP_DAMAGES = range(5, 16)  # Room.trap_damage, uniform
+PUZZLE_GOLD = 60  # 20-100 gold for a solved puzzle
+BATTLE_GOLD = 30  # 10-50 gold for defeating the enemy (Battle.attack_enemy())
+SECRET_PASSAGE = 0.2  # Chance that path 4 leads to the Hidden Treasure Room
+TREASURE_DEATH = 0.7
+TREASURE_GOLD = 200  # 100-300 gold when the treasure room is survived
+
+
+class PathEstimate:
+    """What taking a path is expected to bring, for one player state."""
+
+    def __init__(self, choice, hp_loss, gold, death, exit_chance=0.0):
+        self.choice = choice
+        self.hp_loss = hp_loss  # Expected health lost this turn (all of it on death)
+        self.gold = gold  # Expected gold earned this turn
+        self.death = death  # Chance of dying this turn
+        self.exit_chance = exit_chance  # Chance that the turn ends the game as a victory
+
+    @property
+    def name(self):
+        return PATH_NAMES[self.choice]
+
+    def with_exit(self, exit_chance):
+        return PathEstimate(self.choice, self.hp_loss, self.gold, self.death, exit_chance)
+
+    def to_dict(self):
+        """Converts the estimate into a dictionary (for JSON reports and UI hints)."""
+        return {
+            "choice": self.choice,
+            "hp_loss": self.hp_loss,
+            "gold": self.gold,
+            "death": self.death,
+            "exit_chance": self.exit_chance
+        }
+
+    def describe(self):
+        text = f"[{self.choice}] {self.name}: -{self.hp_loss:.1f} HP, +{self.gold:.0f} gold, {self.death:.1%} death"
+        if self.exit_chance:
+            text += f", {self.exit_chance:.0%} victory"
+        return text
+
+
+class PathOracle:
+    """
+    Estimates the expected health loss, gold and death chance of each path the dungeon offers,
+    for the player's current state, without looking at what the rooms really hold (which the
+    player cannot see either): the estimates come from the spawn tables' room chances and enemy
+    weights, the trap and reward odds of a turn, and the exact battle odds of BattleSolver.
+
+    A turn on paths 1-3 is modelled as main.finish_turn() plays it: gold on entering, the room's
+    gold, trap (uniform 5-15 damage, which can kill) and puzzle (solved with puzzle_skill), then
+    a battle against the path's enemy for the room's depth tier, fought with strategy. What the
+    model leaves out: the puzzle's temporary buff, items used in battle and the vendor.
+
+    Estimates are cached by bucketed player state: the path, the enemy depth tier, the health
+    rounded down to health_bucket (so the estimate never understates the risk), attack, pet
+    attack and the buffs a battle looks at. Once a player's states have been seen, estimates()
+    is a few dict lookups per path.
+    """
+
+    def __init__(self, tables=None, strategy=None, puzzle_skill=0.5, health_bucket=5, solver=None):
+        self.tables = tables or load_tables()
+        self.strategy = strategy or {"attack": 1.0}
+        self.puzzle_skill = puzzle_skill
+        self.health_bucket = health_bucket
+        self.solver = solver or default_solver
+        self.cache = {}  # bucketed state -> PathEstimate
+        self.hits = 0
+        self.misses = 0
+
+    def estimates(self, player, dungeon, choices=None):
+        """Returns {choice: PathEstimate} for the paths the dungeon offers (dungeon.available_paths by default)."""
+        node = dungeon.current_node
+        result = {}
+        for choice in choices or dungeon.available_paths:
+            if choice == "4":
+                # The game treats a missed secret passage like a dead end: the turn ends the game as a victory
+                result[choice] = self.estimate(player, choice).with_exit(1.0 - SECRET_PASSAGE)
+                continue
+            target = dungeon.map.target(node, CHOICES[choice])
+            if target is None:  # Same as the exit (see main.finish_turn())
+                result[choice] = PathEstimate(choice, 0.0, 0.0, 0.0, 1.0)
+                continue
+            depth = dungeon.map.location(target)[1]
+            estimate = self.estimate(player, choice, depth)
+            result[choice] = estimate.with_exit(1.0 - estimate.death) if dungeon.map.is_exit(target) else estimate
+        return result
+
+    def estimate(self, player, choice, depth=0):
+        """Returns the PathEstimate of one path ("1" to "4") to a room at depth, from the cache if the bucket was seen."""
+        path = CHOICES[choice]
+        effects = player.effects
+        buffs = (effects.remaining(player, "poison"), effects.remaining(player, "burn"),
+                 effects.stack(player, "attack")) if player in effects.active else (0, 0, ())
+        health = max(0, min(player.health, player.max_health)) // self.health_bucket * self.health_bucket
+        key = (choice, self.tables.tier("enemies", path, depth) if choice != "4" else 0, health, player.attack,
+               player.pet.attack if player.pet else None, buffs)
+        estimate = self.cache.get(key)
+        if estimate is not None:
+            self.hits += 1
+            return estimate
+        self.misses += 1
+        if choice == "4":
+            estimate = self.treasure_estimate(max(1, health))
+        else:
+            estimate = self.room_estimate(choice, path, depth, max(1, health), player)
+        self.cache[key] = estimate
+        return estimate
+
+    @staticmethod
+    def treasure_estimate(health):
+        death = SECRET_PASSAGE * TREASURE_DEATH
+        gold = SECRET_PASSAGE * (1 - TREASURE_DEATH) * TREASURE_GOLD
+        return PathEstimate("4", death * health, gold, death)
+
+    def room_estimate(self, choice, path, depth, health, player):
+        chances = self.tables.room_chances(path)
+        enemies = self.tables.table("enemies", path, depth).probabilities()
+        fighter = Player("Oracle", health, player.attack)
+        fighter.effects.load(fighter, player.effects.to_list(player))
+        if player.pet:
+            fighter.pet = Pet(player.pet.name, player.pet.health, player.pet.attack)
+
+        trap_chance = chances["trap"]
+        after_trap = [(1.0 - trap_chance, health)]
+        after_trap += [(trap_chance / len(TRAP_DAMAGES), health - damage) for damage in TRAP_DAMAGES]
+
+        gold = TURN_GOLD + ROOM_GOLD
+        death = 0.0
+        health_left = 0.0
+        for chance, left in after_trap:
+            if left <= 0:
+                death += chance
+                continue
+            gold += chance * chances["puzzle"] * self.puzzle_skill * PUZZLE_GOLD
+            health_left += chance * (1.0 - chances["enemy"]) * left
+            fighter.health = left
+            for template, weight in enemies:
+                odds = self.solver.solve(fighter, Enemy.from_template(template), self.strategy)
+                share = chance * chances["enemy"] * weight
+                death += share * odds.death
+                health_left += share * odds.expected_health
+                gold += share * odds.win * BATTLE_GOLD
+        return PathEstimate(choice, health - health_left, gold, death)
+
+    def best_path(self, player, dungeon, choices=None, death_cost=1000.0, victory_value=1000.0):
+        """
+        Returns the choice with the highest value: gold minus health lost, minus death_cost per
+        chance of dying, plus victory_value per chance of ending the game as a victory.
+        """
+        estimates = self.estimates(player, dungeon, choices)
+        return max(estimates, key=lambda choice: estimates[choice].gold - estimates[choice].hp_loss
+                   - death_cost * estimates[choice].death + victory_value * estimates[choice].exit_chance)
+
+
+shared_oracles = {}  # puzzle skill -> PathOracle, so every bot of a simulation shares one cache
+
+def shared_oracle(puzzle_skill=0.5):
+    """Returns the shared PathOracle of the default spawn tables for a puzzle skill."""
+    if puzzle_skill not in shared_oracles:
+        shared_oracles[puzzle_skill] = PathOracle(puzzle_skill=puzzle_skill)
+    return shared_oracles[puzzle_skill]
+
+
+class OraclePolicy(CautiousPolicy):
+    """A bot that plays like CautiousPolicy, but takes the path the PathOracle values most."""
+
+    def __init__(self, rng=None, oracle=None):
+        super().__init__(rng=rng)
+        self.oracle = oracle or shared_oracle(self.puzzle_skill)
+
+    def choose_path(self, player, dungeon, valid_choices):
+        return self.oracle.best_path(player, dungeon, valid_choices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the path oracle's estimates for a player state.")
+    parser.add_argument("--health", type=int, default=100)
+    parser.add_argument("--attack", type=int, default=10)
+    parser.add_argument("--pet", choices=[pet["name"] for pet in Pet.PET_TYPES], help="give the player this pet")
+    parser.add_argument("--depth", type=int, default=0, help="index of the room the paths lead to")
+    parser.add_argument("--puzzle-skill", type=float, default=0.5, help="chance of solving a puzzle")
+    args = parser.parse_args()
+
+    player = Player("Oracle", args.health, args.attack)
+    if args.pet:
+        data = next(pet for pet in Pet.PET_TYPES if pet["name"] == args.pet)
+        player.pet = Pet(data["name"], data["health"], data["attack"])
+    oracle = PathOracle(puzzle_skill=args.puzzle_skill)
+
+    print(f"{'Path':<16} {'HP loss':>8} {'gold':>7} {'death':>8} {'first':>9} {'cached':>9}")
+    for choice in PATH_NAMES:
+        start = time.perf_counter()
+        estimate = oracle.estimate(player, choice, args.depth)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        oracle.estimate(player, choice, args.depth)
+        cached = time.perf_counter() - start
+        print(f"{estimate.name:<16} {estimate.hp_loss:>8.2f} {estimate.gold:>7.1f} {estimate.death:>8.3%} "
+              f"{first * 1000:>7.1f}ms {cached * 1e6:>7.1f}us")
+    print("\nA missed secret passage on the Hidden Treasure path ends the game as a victory "
+          f"({1 - SECRET_PASSAGE:.0%} of the time).")
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,96 @@
-import random
-
-class Pet:
-    """Represents a pet that helps the player in combat and can be attacked by enemies."""
-
-    def __init__(self, name=None, health=None, attack=None):
-        """
-        Initializes a pet with random attributes if not provided.
-        Some pets are stronger than others.
-        """
-        pet_types = [
-            {"name": "Shadow Wolf", "health": 40, "attack": 8},
-            {"name": "Flame Tiger", "health": 50, "attack": 10},
-            {"name": "Stone Turtle", "health": 60, "attack": 5},
-            {"name": "Lightning Hawk", "health": 35, "attack": 12},
-            {"name": "Guardian Spirit", "health": 70, "attack": 6}
-        ]
-
-        if name and health and attack:
-            self.name = name
-            self.health = health
-            self.attack = attack
-        else:
-            pet_data = random.choice(pet_types)
-            self.name = pet_data["name"]
-            self.health = pet_data["health"]
-            self.attack = pet_data["attack"]
-
-    def is_alive(self):
-        """Returns True if the pet is still alive (health > 0)."""
-        return self.health > 0
-
-    def attack_enemy(self, enemy):
-        """
-        Pet attacks an enemy. Pets deal consistent damage.
-        """
-        if self.is_alive():
-            print(f"{self.name} attacks {enemy.name} for {self.attack} damage! (Enemy health: {max(0, enemy.health - self.attack)})")
-            enemy.health -= self.attack
-            if enemy.health <= 0:
-                print(f"{enemy.name} has been defeated!")
-
-    def take_damage(self, damage):
-        """
-        Pet takes damage when an enemy targets it.
-        """
-        self.health -= damage
-        print(f"{self.name} takes {damage} damage! (Health: {max(0, self.health)})")
-        if self.health <= 0:
-            print(f"{self.name} has fallen in battle!")
-
-    def to_dict(self):
-        """Converts the pet's state into a dictionary for saving."""
-        return {"name": self.name, "health": self.health, "attack": self.attack}
-
-    @classmethod
-    def from_dict(cls, data):
-        """Restores a pet from a saved dictionary state."""
-        return cls(data["name"], data["health"], data["attack"])
+import random
+from collections import namedtuple
+from events import EnemyDefeated, publish
+from output import show
+
+# What every pet of a kind shares; health is the health it starts with
+PetTemplate = namedtuple("PetTemplate", ["name", "health", "attack"])
+
+class Pet:
+    """
+    Represents a pet that helps the player in combat and can be attacked by enemies.
+    A pet only holds its current health and a reference to its shared, read-only template.
+    """
+
+    __slots__ = ("template", "health")
+
+    # Every kind of pet that can be found or bought
+    PET_TYPES = [
+        {"name": "Shadow Wolf", "health": 40, "attack": 8},
+        {"name": "Flame Tiger", "health": 50, "attack": 10},
+        {"name": "Stone Turtle", "health": 60, "attack": 5},
+        {"name": "Lightning Hawk", "health": 35, "attack": 12},
+        {"name": "Guardian Spirit", "health": 70, "attack": 6}
+    ]
+    TEMPLATES = [PetTemplate(**data) for data in PET_TYPES]
+    templates = {(t.name, t.attack): t for t in TEMPLATES}  # Custom pets are added on first use
+
+    def __init__(self, name=None, health=None, attack=None, rng=None):
+        """
+        Initializes a pet with random attributes if not provided.
+        Some pets are stronger than others.
+        rng is the random stream to pick from (the random module if not given).
+        """
+        if name and health and attack:
+            self.template = Pet.template_for(name, health, attack)
+            self.health = health
+        else:
+            self.template = (rng or random).choice(self.TEMPLATES)
+            self.health = self.template.health
+
+    @classmethod
+    def from_template(cls, template):
+        """Creates a new pet of a template (used by the spawn tables)."""
+        pet = cls.__new__(cls)
+        pet.template = template
+        pet.health = template.health
+        return pet
+
+    @staticmethod
+    def template_for(name, health, attack):
+        """Returns the shared template with these stats, creating it the first time for a custom pet."""
+        template = Pet.templates.get((name, attack))
+        if template is None:
+            template = Pet.templates[(name, attack)] = PetTemplate(name, health, attack)
+        return template
+
+    @property
+    def name(self):
+        return self.template.name
+
+    @property
+    def attack(self):
+        return self.template.attack
+
+    def is_alive(self):
+        """Returns True if the pet is still alive (health > 0)."""
+        return self.health > 0
+
+    def attack_enemy(self, enemy):
+        """
+        Pet attacks an enemy. Pets deal consistent damage.
+        """
+        if self.is_alive():
+            show("{} attacks {} for {} damage! (Enemy health: {})", self.name, enemy.name, self.attack, max(0, enemy.health - self.attack))
+            enemy.health -= self.attack
+            if enemy.health <= 0:
+                show("{} has been defeated!", enemy.name)
+                publish(EnemyDefeated, enemy.name, self.name)
+
+    def take_damage(self, damage):
+        """
+        Pet takes damage when an enemy targets it.
+        """
+        self.health -= damage
+        show("{} takes {} damage! (Health: {})", self.name, damage, max(0, self.health))
+        if self.health <= 0:
+            show("{} has fallen in battle!", self.name)
+
+    def to_dict(self):
+        """Converts the pet's state into a dictionary for saving."""
+        return {"name": self.name, "health": self.health, "attack": self.attack}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restores a pet from a saved dictionary state."""
+        return cls(data["name"], data["health"], data["attack"])
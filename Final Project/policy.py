@@ -0,0 +1,207 @@
+import random
+from game_input import ask
+from output import show
+
+def normalize_strategy(strategy):
+    """Turns {"attack": 2, "flee": 1} into probabilities for attack, counterattack and flee."""
+    strategy = strategy or {"attack": 1.0}
+    unknown = set(strategy) - {"attack", "counterattack", "flee"}
+    if unknown:
+        raise ValueError(f"Unknown battle actions: {', '.join(sorted(unknown))}")
+    total = sum(strategy.values())
+    if total <= 0:
+        raise ValueError("A strategy needs at least one action with a positive weight.")
+    return {action: strategy.get(action, 0) / total for action in ("attack", "counterattack", "flee")}
+
+
+class Policy:
+    """
+    Makes the player's decisions. Every prompt in the game goes through the
+    player's policy, so the same game logic can be driven by a human at the
+    terminal or by a bot in a headless simulation.
+    All methods return the same strings the player would type.
+    """
+
+    def choose_path(self, player, dungeon, valid_choices):
+        """Returns the path to take from the dungeon's available paths."""
+        raise NotImplementedError
+
+    def choose_battle_action(self, battle):
+        """Returns "1" (attack), "2" (use item), "3" (counterattack) or "4" (flee)."""
+        raise NotImplementedError
+
+    def choose_enemy(self, battle):
+        """Returns the 1-based number of the enemy to target."""
+        raise NotImplementedError
+
+    def choose_item(self, player):
+        """Returns the 1-based number of the inventory item to use."""
+        raise NotImplementedError
+
+    def answer_puzzle(self, player, puzzle):
+        """Returns the answer to a room puzzle."""
+        raise NotImplementedError
+
+    def choose_trap_action(self, player, room):
+        """Returns "1" (dodge), "2" (disarm) or "3" (take the damage)."""
+        raise NotImplementedError
+
+    def choose_shop_item(self, player, vendor):
+        """Returns the number of the item to buy, "99" to adopt the pet or "0" to leave."""
+        raise NotImplementedError
+
+    def choose_item_to_sell(self, player, vendor):
+        """Returns the 1-based number of the inventory item to sell, or "0" to leave."""
+        raise NotImplementedError
+
+
+class TerminalPolicy(Policy):
+    """
+    Asks a human player at the terminal. This is the default policy.
+    With an advisor (a battle_advisor.BattleAdvisor), every battle turn starts with its hint,
+    and with an oracle (a path_oracle.PathOracle) every path prompt shows its estimates.
+    """
+
+    def __init__(self, advisor=None, oracle=None):
+        self.advisor = advisor
+        self.oracle = oracle
+
+    def choose_path(self, player, dungeon, valid_choices):
+        if self.oracle is not None:
+            for estimate in self.oracle.estimates(player, dungeon, valid_choices).values():
+                show("Hint: {}", estimate.describe())
+        return ask(self.path_prompt(valid_choices)).strip()
+
+    @staticmethod
+    def path_prompt(valid_choices):
+        return f"\nWhich path do you choose? ({', '.join(valid_choices)}): "
+
+    def choose_battle_action(self, battle):
+        if self.advisor is not None:
+            show("Hint: {}", self.advisor.advise(battle).describe())
+        return ask("Choose an action: ").strip()
+
+    def choose_enemy(self, battle):
+        return ask("Select an enemy: ").strip()
+
+    def choose_item(self, player):
+        return ask("Choose an item to use: ").strip()
+
+    def answer_puzzle(self, player, puzzle):
+        return ask("Your answer: ").strip().lower()
+
+    def choose_trap_action(self, player, room):
+        return ask("Choose an option: ").strip()
+
+    def choose_shop_item(self, player, vendor):
+        return ask("\nChoose an item number to buy (or 0 to leave): ").strip()
+
+    def choose_item_to_sell(self, player, vendor):
+        return ask("\nChoose an item to sell (or 0 to leave): ").strip()
+
+
+class RandomPolicy(Policy):
+    """Picks a random valid option at every prompt. Useful as a worst-case baseline."""
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def choose_path(self, player, dungeon, valid_choices):
+        return self.rng.choice(valid_choices)
+
+    def choose_battle_action(self, battle):
+        return self.rng.choice(["1", "2", "3", "4"])
+
+    def choose_enemy(self, battle):
+        return str(self.rng.randint(1, len(battle.enemies)))
+
+    def choose_item(self, player):
+        return str(self.rng.randint(1, max(1, len(player.inventory))))
+
+    def answer_puzzle(self, player, puzzle):
+        return ""
+
+    def choose_trap_action(self, player, room):
+        return self.rng.choice(["1", "2", "3"])
+
+    def choose_shop_item(self, player, vendor):
+        return str(self.rng.randint(0, len(vendor.items_for_sale)))
+
+    def choose_item_to_sell(self, player, vendor):
+        return "0"
+
+
+class CautiousPolicy(Policy):
+    """
+    A simple bot that plays like a careful human:
+    - always takes the normal path
+    - attacks the weakest enemy and drinks a healing potion when health is low
+    - solves puzzles it knows the answer to
+    - buys the cheapest healing potion it can afford
+    """
+
+    def __init__(self, heal_below=0.4, puzzle_skill=1.0, rng=None):
+        self.heal_below = heal_below  # Fraction of max health that triggers healing
+        self.puzzle_skill = puzzle_skill  # Chance of knowing a puzzle's answer
+        self.rng = rng or random.Random()
+
+    def choose_path(self, player, dungeon, valid_choices):
+        return "1"
+
+    def choose_battle_action(self, battle):
+        player = battle.player
+        if player.health < player.max_health * self.heal_below and self.find_healing_item(player):
+            return "2"
+        return "1"
+
+    def choose_enemy(self, battle):
+        return str(battle.enemies.index(battle.enemies.weakest()) + 1)
+
+    def choose_item(self, player):
+        return self.find_healing_item(player) or "0"
+
+    def answer_puzzle(self, player, puzzle):
+        if self.rng.random() < self.puzzle_skill:
+            return puzzle["answer"]
+        return ""
+
+    def choose_trap_action(self, player, room):
+        return "1"
+
+    def choose_shop_item(self, player, vendor):
+        affordable = [(item.price, i) for i, item in enumerate(vendor.items_for_sale, 1)
+                      if item.effect == "heal" and item.price <= player.gold]
+        if not affordable:
+            return "0"
+        return str(min(affordable)[1])
+
+    def choose_item_to_sell(self, player, vendor):
+        return "0"
+
+    def find_healing_item(self, player):
+        """Returns the inventory number of the first healing item, or None."""
+        for i, item in enumerate(player.inventory, 1):
+            if item.effect == "heal":
+                return str(i)
+        return None
+
+
+class StrategyPolicy(CautiousPolicy):
+    """
+    Fights with a fixed mix of battle actions, e.g. {"attack": 0.8, "flee": 0.2}.
+    Used to compare the real Battle class with the vectorized battle simulator.
+    """
+
+    ACTIONS = {"attack": "1", "counterattack": "3", "flee": "4"}
+
+    def __init__(self, strategy=None, rng=None):
+        super().__init__(rng=rng)
+        self.strategy = strategy or {"attack": 1.0}
+
+    def choose_battle_action(self, battle):
+        roll = self.rng.random()
+        for action, chance in self.strategy.items():
+            if roll < chance:
+                return self.ACTIONS[action]
+            roll -= chance
+        return self.ACTIONS[action]
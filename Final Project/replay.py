@@ -0,0 +1,47 @@
+import argparse
+import time
+from game_input import ReplayError, ReplayInput, SessionLog, use_input
+from main import run_game, start_game
+from output import NullOutput, TerminalOutput, use_output
+from timing import timings
+
+def replay_session(log, show_text=False):
+    """
+    Plays a recorded session again without a terminal: the same dungeon (from the log's seed or
+    saved game) and the same answers, read from the log. Nothing is saved. Returns the result.
+    Raises ReplayError if the game asks more questions than were recorded, or if the result
+    differs from the recorded one.
+    """
+    provider = ReplayInput(log.inputs)
+    with use_input(provider), use_output(TerminalOutput() if show_text else NullOutput()):
+        player, dungeon = start_game(log.start, log.seed)
+        result = run_game(player, dungeon, save=False)
+    if log.result is not None and result != log.result:
+        raise ReplayError(f"The replay ended differently: {result}, recorded {log.result}.")
+    if provider.position != len(log.inputs):
+        raise ReplayError(f"The replay used {provider.position} of {len(log.inputs)} recorded inputs.")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a session recorded with main.py --record, at full speed.")
+    parser.add_argument("log", help="session log file")
+    parser.add_argument("--show", action="store_true", help="show the game text instead of discarding it")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times (for profiling)")
+    parser.add_argument("--timings", metavar="FILE", help="time every turn phase and battle step, and write them to FILE as JSON")
+    args = parser.parse_args()
+    if args.timings:
+        timings.enable(args.timings)
+
+    log = SessionLog.read(args.log)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = replay_session(log, args.show)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(log.inputs)} inputs {args.repeat} time(s) in {elapsed:.3f}s: {result['outcome']} "
+          f"after {result['turns']} turns (gold {result['gold']}, health {result['health']}), same as recorded.")
+    if args.timings:
+        timings.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import binary_save
+import contextvars
+import json
+import os
+import threading
+from output import show
+from save_writer import SaveWriter, write_atomic
+
+class SaveJournal:
+    """
+    Journaled saves: a full snapshot (the same JSON as SaveSystem.save_game) plus an append-only
+    journal with one line per turn that holds only what changed:
+    - the player fields that differ from the last save (gold, health, inventory, ...)
+    - the dungeon position (and the first room a lazy dungeon can still reach)
+    - the rooms entered since the last save (Dungeon.changed_rooms), since only the current room
+      can change during a turn (its enemy, item and trap); a lazy dungeon only journals the ones
+      that differ from their seed, like Dungeon.to_dict()
+    So a turn costs the same to save no matter how big the dungeon is, and a lazy dungeon's
+    snapshot only keeps the changed rooms the player can still reach.
+
+    Every compact_every turns the journal is rotated out and a background thread folds it into a new
+    snapshot. Loading applies the snapshot, then any journal left over from an unfinished compaction,
+    then the current journal.
+    With binary=True the snapshot is written in the binary save format (binary_save.py);
+    the journal itself is always JSON lines.
+
+    record() only works out what changed; the file I/O (snapshot, journal lines, rotation) runs in
+    order on a SaveWriter thread, so saving adds no disk time to a turn.
+    """
+
+    def __init__(self, snapshot_file, journal_file, compact_every=20, binary=False, writer=None):
+        self.snapshot_file = snapshot_file
+        self.binary = binary
+        self.writer = writer or SaveWriter()
+        self.started = False  # True after the first save wrote the snapshot
+        self.journal_file = journal_file
+        self.compacting_file = journal_file + ".compacting"  # Journal being folded into the snapshot
+        self.compact_every = compact_every
+        self.journal = None  # Open journal file (only used on the writer thread)
+        self.last_player = None
+        self.last_position = None
+        self.turn = 0
+        self.turns_since_compaction = 0
+        self.compactor = None  # Background compaction thread
+        self.context = contextvars.copy_context()  # The game's output, for the errors of the compaction thread
+
+    def record(self, player_state, dungeon):
+        """
+        Saves one turn. The first call writes a full snapshot and starts a new journal;
+        later calls append only what changed.
+        """
+        position = SaveJournal.position(dungeon)
+        if not self.started:
+            self.start(player_state, dungeon, position)
+            return
+
+        self.turn += 1
+        entry = {"turn": self.turn}
+        changed = {field: value for field, value in player_state.items() if self.last_player.get(field) != value}
+        if changed:
+            entry["player"] = changed
+        if position != self.last_position:
+            entry["position"] = position
+        rooms = SaveJournal.changed_rooms(dungeon)
+        if rooms:
+            entry["rooms"] = rooms
+        dungeon.changed_rooms.clear()
+
+        self.writer.submit(self.append, json.dumps(entry) + "\n")
+        self.last_player = player_state
+        self.last_position = position
+
+        self.turns_since_compaction += 1
+        if self.turns_since_compaction >= self.compact_every:
+            self.compact()
+
+    def start(self, player_state, dungeon, position):
+        """Writes a full snapshot of a new (or just loaded) game and starts an empty journal."""
+        self.writer.submit(self.write_start, {"player": player_state, "dungeon": dungeon.to_dict()})
+        self.started = True
+        dungeon.changed_rooms.clear()
+        self.last_player = player_state
+        self.last_position = position
+
+    def write_start(self, data):
+        """Writer thread: the first snapshot and an empty journal."""
+        if self.compactor:
+            self.compactor.join()
+        SaveJournal.write_snapshot(self.snapshot_file, data, self.binary)
+        if os.path.exists(self.compacting_file):
+            os.remove(self.compacting_file)
+        self.journal = open(self.journal_file, "w")
+
+    def append(self, line):
+        """Writer thread: appends one journal line and makes sure it is on disk."""
+        self.journal.write(line)
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def compact(self):
+        """Asks the writer to rotate the journal out and fold it into the snapshot."""
+        self.turns_since_compaction = 0
+        self.writer.submit(self.rotate)
+
+    def rotate(self):
+        """Writer thread: rotates the journal out and folds it into the snapshot on a background thread."""
+        if self.compactor and self.compactor.is_alive():
+            return  # Still busy with the previous one; the journal is folded next time
+        if os.path.exists(self.compacting_file):
+            return  # A previous compaction failed; its journal is still needed when loading
+
+        self.journal.close()
+        os.replace(self.journal_file, self.compacting_file)
+        self.journal = open(self.journal_file, "w")
+        self.compactor = threading.Thread(target=self.context.copy().run, args=(self.fold_journal,), daemon=True)
+        self.compactor.start()
+
+    def fold_journal(self):
+        """Background thread: snapshot + rotated journal -> new snapshot."""
+        try:
+            data = SaveJournal.read_snapshot(self.snapshot_file, self.binary)
+            SaveJournal.apply_journal(data, self.compacting_file)
+            SaveJournal.write_snapshot(self.snapshot_file, data, self.binary)
+            os.remove(self.compacting_file)
+        except (OSError, ValueError) as e:
+            show("Error compacting save journal: {}", e)  # The rotated journal is kept for loading
+
+    def flush(self):
+        """Waits until every queued save is written and a running background compaction has finished."""
+        self.writer.flush()
+        if self.compactor:
+            self.compactor.join()
+
+    def close(self):
+        """Waits for the queued saves and compaction, and closes the journal file."""
+        try:
+            self.flush()
+        finally:
+            if self.journal:
+                self.journal.close()
+                self.journal = None
+            self.started = False
+
+    @staticmethod
+    def position(dungeon):
+        """Returns the dungeon fields that say where the player is."""
+        position = {
+            "current_room_index": dungeon.current_room_index,
+            "in_shortcut": dungeon.in_shortcut,
+            "in_mystery": dungeon.in_mystery
+        }
+        if dungeon.lazy:
+            position["first_room"] = dungeon.rooms.first
+        return position
+
+    @staticmethod
+    def changed_rooms(dungeon):
+        """
+        Returns [[list name, index, room]] of the rooms entered since the last save. Of a lazy dungeon,
+        only the reachable ones that differ from their seed (the others are rebuilt when loading).
+        """
+        rooms = []
+        for list_name, index in sorted(dungeon.changed_rooms):
+            room_list = getattr(dungeon, list_name)
+            if dungeon.lazy:
+                if index < room_list.first:
+                    continue
+                room = room_list.changed_room(index)
+                if room is None:
+                    continue
+            else:
+                room = room_list[index].to_dict()
+            rooms.append([list_name, index, room])
+        return rooms
+
+    @staticmethod
+    def write_snapshot(snapshot_file, data, binary=False):
+        """Writes a full snapshot through a synced temporary file, so a crash never leaves half a snapshot."""
+        if binary:
+            write_atomic(snapshot_file, binary_save.encode(data))
+        else:
+            write_atomic(snapshot_file, json.dumps(data, indent=4).encode("utf-8"))
+
+    @staticmethod
+    def read_snapshot(snapshot_file, binary=False):
+        """Reads a full snapshot written by write_snapshot."""
+        if binary:
+            return binary_save.read_file(snapshot_file)
+        with open(snapshot_file, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def apply_journal(data, journal_file):
+        """Applies every complete line of a journal file to the saved data (a torn last line is ignored)."""
+        try:
+            with open(journal_file, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break  # The game stopped in the middle of writing this line
+            data["player"].update(entry.get("player", {}))
+            data["dungeon"].update(entry.get("position", {}))
+            for list_name, index, room in entry.get("rooms", []):
+                SaveJournal.set_room(data["dungeon"], list_name, index, room)
+        dungeon = data["dungeon"]
+        if dungeon.get("lazy"):  # Drop the rooms the player can no longer reach, as LazyRooms.forget_before() does
+            dungeon["changed"] = [entry for entry in dungeon["changed"]
+                                  if entry[0] != "rooms" or entry[1] >= dungeon["first_room"]]
+
+    @staticmethod
+    def set_room(dungeon_data, list_name, index, room):
+        """Puts a journaled room into the saved dungeon (a lazy dungeon keeps a list of changed rooms)."""
+        if not dungeon_data.get("lazy"):
+            dungeon_data[list_name][index] = room
+            return
+        changed = dungeon_data["changed"]
+        for entry in changed:
+            if entry[0] == list_name and entry[1] == index:
+                entry[2] = room
+                return
+        changed.append([list_name, index, room])
+
+    @staticmethod
+    def load(snapshot_file, journal_file, binary=False):
+        """Rebuilds the saved game from the snapshot plus the journal(s). Raises FileNotFoundError without a snapshot."""
+        data = SaveJournal.read_snapshot(snapshot_file, binary)
+        SaveJournal.apply_journal(data, journal_file + ".compacting")
+        SaveJournal.apply_journal(data, journal_file)
+        return data
@@ -0,0 +1,196 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import binary_save
+
+class SaveStore:
+    """
+    Saves of many players in one SQLite database, keyed by player name and slot.
+
+    Each save is one row holding the game in the binary save format (binary_save.py), plus a few
+    columns copied out of it so they can be searched with an index:
+    - (player, slot) is unique, so loading a slot is a single index lookup
+    - (player, saved_at) finds a player's latest save without scanning their other slots
+    - (room_list, room_index) finds every save standing in a given room
+    - (saved_at) finds the most recent save of anyone
+    The database runs in WAL mode, so loading never waits for a write in progress,
+    and save_many() writes any number of saves in a single transaction.
+    Every save gets its own saved_at, later than any before it (even within one save_many()
+    or when the clock goes back), so latest() never has to pick between saves of the same time.
+    """
+
+    SCHEMA_VERSION = 1
+    TICK = 1e-6  # Seconds between the saved_at of saves made at the same time
+
+    def __init__(self, database="saves.db"):
+        self.database = database
+        self.lock = threading.Lock()  # Used from the game thread and the save writer thread
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent after a crash
+        self.create_tables()
+        self.last_saved_at = self.query_one("SELECT MAX(saved_at) FROM saves", ())[0] or 0.0
+
+    def create_tables(self):
+        with self.lock, self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS saves (
+                    player TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    saved_at REAL NOT NULL,
+                    room_list TEXT NOT NULL,
+                    room_index INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    UNIQUE (player, slot)
+                )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS saves_latest ON saves (player, saved_at)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS saves_room ON saves (room_list, room_index)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS saves_recent ON saves (saved_at)")
+            self.connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @staticmethod
+    def room_of(dungeon_data):
+        """Returns (room list, index) of the room the saved player is standing in."""
+        if dungeon_data["in_shortcut"]:
+            return "shortcut_rooms", dungeon_data["current_room_index"]
+        if dungeon_data["in_mystery"]:
+            return "mystery_rooms", dungeon_data["current_room_index"]
+        return "rooms", dungeon_data["current_room_index"]
+
+    def save(self, player, slot, save_data):
+        """Saves a game ({"player": ..., "dungeon": ...}) into a player's slot, replacing what was there."""
+        self.save_many([(player, slot, save_data)])
+
+    def save_many(self, saves):
+        """Saves a list of (player, slot, save data) in one transaction."""
+        rows = []
+        for player, slot, save_data in saves:
+            room_list, room_index = SaveStore.room_of(save_data["dungeon"])
+            rows.append([player, slot, None, room_list, room_index, binary_save.encode(save_data)])
+        with self.lock, self.connection:
+            saved_at = max(time.time(), self.last_saved_at + self.TICK)
+            for row in rows:  # In the order given: the last save of a player is its latest
+                row[2] = saved_at
+                saved_at += self.TICK
+            if rows:
+                self.last_saved_at = rows[-1][2]
+            self.connection.executemany("""
+                INSERT INTO saves (player, slot, saved_at, room_list, room_index, data) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (player, slot) DO UPDATE SET
+                    saved_at = excluded.saved_at, room_list = excluded.room_list,
+                    room_index = excluded.room_index, data = excluded.data""", rows)
+
+    def load(self, player, slot):
+        """Returns the save in a player's slot, or None if the slot is empty."""
+        row = self.query_one("SELECT data FROM saves WHERE player = ? AND slot = ?", (player, slot))
+        return binary_save.decode(row[0]) if row else None
+
+    def latest(self, player=None):
+        """
+        Returns (player, slot, save data) of a player's most recent save, or of the most recent
+        save of anyone when no player is given. Returns None if there is no save.
+        """
+        if player is None:
+            row = self.query_one("SELECT player, slot, data FROM saves ORDER BY saved_at DESC LIMIT 1", ())
+        else:
+            row = self.query_one("SELECT player, slot, data FROM saves WHERE player = ? ORDER BY saved_at DESC LIMIT 1",
+                                 (player,))
+        return (row[0], row[1], binary_save.decode(row[2])) if row else None
+
+    def slots(self, player):
+        """Returns [(slot, saved_at, room list, room index)] of a player's saves, by slot."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT slot, saved_at, room_list, room_index FROM saves WHERE player = ? ORDER BY slot",
+                (player,)).fetchall()
+
+    def saves_in_room(self, room_index, room_list="rooms"):
+        """Returns [(player, slot)] of every save standing in the given room."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT player, slot FROM saves WHERE room_list = ? AND room_index = ? ORDER BY player, slot",
+                (room_list, room_index)).fetchall()
+
+    def delete(self, player, slot):
+        """Deletes a player's save slot."""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM saves WHERE player = ? AND slot = ?", (player, slot))
+
+    def count(self):
+        """Returns the number of saves in the store."""
+        return self.query_one("SELECT COUNT(*) FROM saves", ())[0]
+
+    def query_one(self, sql, parameters):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchone()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def benchmark(num_saves, batch_size=1000, database="benchmark_saves.db"):
+    """Fills a fresh store with num_saves saves (in batches) and times the indexed lookups."""
+    from dungeon import Dungeon
+    from player import Player
+    from rng import RandomStreams
+    from save_system import SaveSystem
+
+    for path in (database, database + "-wal", database + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    store = SaveStore(database)
+    try:
+        player = Player("Benchmark", 100, 10)
+        dungeon = Dungeon(rng=RandomStreams(1))
+        save_data = {"player": SaveSystem.player_state(player), "dungeon": dungeon.to_dict()}
+        num_players = max(1, num_saves // 3)  # 3 slots per player
+
+        start = time.perf_counter()
+        batch = []
+        for number in range(num_saves):
+            moved = dict(save_data["dungeon"], current_room_index=number % len(dungeon.rooms))
+            batch.append((f"player{number % num_players}", number // num_players + 1, dict(save_data, dungeon=moved)))
+            if len(batch) == batch_size:
+                store.save_many(batch)
+                batch = []
+        if batch:
+            store.save_many(batch)
+        write_time = time.perf_counter() - start
+
+        lookups = 1000
+        start = time.perf_counter()
+        for number in range(lookups):
+            store.load(f"player{number * 7919 % num_players}", 1)
+        load_time = (time.perf_counter() - start) / lookups
+        start = time.perf_counter()
+        for number in range(lookups):
+            store.latest(f"player{number * 7919 % num_players}")
+        latest_time = (time.perf_counter() - start) / lookups
+        start = time.perf_counter()
+        in_room = store.saves_in_room(2)
+        room_time = time.perf_counter() - start
+
+        print(f"{store.count()} saves: written in {write_time:.2f}s ({num_saves / write_time:.0f} saves/s, "
+              f"batches of {batch_size})")
+        print(f"load(player, slot): {load_time * 1e6:.0f}us, latest(player): {latest_time * 1e6:.0f}us, "
+              f"saves_in_room: {len(in_room)} saves in {room_time * 1000:.1f}ms")
+    finally:
+        store.close()
+        for path in (database, database + "-wal", database + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the SQLite save store with many saves.")
+    parser.add_argument("--saves", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--batch", type=int, default=1000, help="saves written per transaction")
+    args = parser.parse_args()
+    for num_saves in args.saves:
+        benchmark(num_saves, args.batch)
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,183 @@
-import json
-
-class SaveSystem:
-    """Handles saving and loading the game state to/from a JSON file."""
-
-    SAVE_FILE = "savegame.json"
-
-    @staticmethod
-    def save_game(player, dungeon):
-        """
-        Saves the game state (player, dungeon, inventory, gold, and pet) into a JSON file.
-        If the player's pet is dead, it will not be saved.
-        """
-        try:
-            save_data = {
-                "player": player.to_dict(),
-                "dungeon": dungeon.to_dict()
-            }
-
-            if player.pet and player.pet.is_alive():
-                save_data["player"]["pet"] = player.pet.to_dict()
-            else:
-                save_data["player"]["pet"] = None  
-
-            with open(SaveSystem.SAVE_FILE, "w") as f:
-                json.dump(save_data, f, indent=4)
-            print("\nGame saved successfully!")
-        except Exception as e:
-            print(f"Error saving game: {e}")
-
-    @staticmethod
-    def load_game():
-        """
-        Loads the game state from the JSON file, if it exists.
-        Returns a dictionary containing player and dungeon data.
-        """
-        try:
-            with open(SaveSystem.SAVE_FILE, "r") as f:
-                data = json.load(f)
-
-            return data
-        except FileNotFoundError:
-            print("\nNo save file found. Starting a new game.")
-            return None
-        except json.JSONDecodeError:
-            print("\nError loading save file. The data might be corrupted.")
-            return None
+import binary_save
+import json
+import os
+import threading
+from output import show
+from save_journal import SaveJournal
+from save_store import SaveStore
+from save_writer import SaveWriter
+
+class SaveSystem:
+    """
+    Handles saving and loading the game state to/from a JSON file (or a binary file, see FORMAT),
+    or, with BACKEND = "sqlite", to/from a SQLite database shared by many players (see SaveStore).
+    """
+
+    FORMAT = "json"  # "json" or "binary" (binary_save.py: smaller and faster for big dungeons)
+    SAVE_FILE = "savegame.json"
+    BINARY_SAVE_FILE = "savegame.dat"
+    JOURNAL_FILE = "savegame.journal"
+    COMPACT_EVERY = 20  # Journaled turns between snapshot compactions
+    journal = None  # The SaveJournal of the running game (see save_turn)
+    writer = SaveWriter()  # Background thread that does all save file I/O
+    BACKEND = "file"  # "file" (SAVE_FILE or BINARY_SAVE_FILE) or "sqlite" (DATABASE)
+    DATABASE = "saves.db"
+    SLOT = 1  # Save slot used with the sqlite backend
+    store = None  # The SaveStore, opened on first use
+    store_pending = {}  # (player name, slot) -> save data waiting for the next database transaction
+    store_lock = threading.Lock()
+
+    @staticmethod
+    def save_game(player, dungeon):
+        """
+        Saves the game state (player, dungeon, inventory, gold, and pet) into the save file
+        of the selected FORMAT. If the player's pet is dead, it will not be saved.
+        The file is written by the background writer; a newer save replaces one that is still waiting.
+        """
+        try:
+            save_data = SaveSystem.game_state(player, dungeon)
+
+            if SaveSystem.BACKEND == "sqlite":
+                with SaveSystem.store_lock:
+                    SaveSystem.store_pending[(player.name, SaveSystem.SLOT)] = save_data
+                SaveSystem.writer.submit(SaveSystem.write_store, key="sqlite")
+                show("\nGame saved successfully!")
+                return
+
+            if SaveSystem.journal:  # A full save replaces any journaled state
+                SaveSystem.journal.close()
+                SaveSystem.journal = None
+            SaveSystem.writer.submit(SaveSystem.write_save, SaveSystem.save_file(), save_data, SaveSystem.is_binary(),
+                                     key=SaveSystem.save_file())
+            show("\nGame saved successfully!")
+        except Exception as e:
+            show("Error saving game: {}", e)
+
+    @staticmethod
+    def save_turn(player, dungeon):
+        """
+        Journaled save for the end of each turn: only what changed this turn is appended to the
+        journal, and every COMPACT_EVERY turns the journal is folded into a full snapshot in the
+        background (see SaveJournal). The first save of a game writes a full snapshot.
+        The sqlite backend has no journal and saves the whole game (see save_game).
+        """
+        if SaveSystem.BACKEND == "sqlite":
+            SaveSystem.save_game(player, dungeon)
+            return
+        try:
+            if SaveSystem.journal is None:
+                SaveSystem.journal = SaveJournal(SaveSystem.save_file(), SaveSystem.JOURNAL_FILE,
+                                                 SaveSystem.COMPACT_EVERY, SaveSystem.is_binary(), SaveSystem.writer)
+            SaveSystem.journal.record(SaveSystem.player_state(player), dungeon)
+            show("\nGame saved successfully!")
+        except Exception as e:
+            show("Error saving game: {}", e)
+
+    @staticmethod
+    def write_store():
+        """
+        Writer thread: writes every save waiting for the database in one transaction. Saves that come
+        in while the writer is busy are collected into the next batch.
+        """
+        with SaveSystem.store_lock:
+            pending, SaveSystem.store_pending = SaveSystem.store_pending, {}
+        if pending:
+            SaveSystem.get_store().save_many([(name, slot, save_data) for (name, slot), save_data in pending.items()])
+
+    @staticmethod
+    def get_store():
+        """Returns the SaveStore, opening DATABASE the first time."""
+        if SaveSystem.store is None:
+            SaveSystem.store = SaveStore(SaveSystem.DATABASE)
+        return SaveSystem.store
+
+    @staticmethod
+    def is_binary():
+        """True when games are saved in the binary format."""
+        return SaveSystem.FORMAT == "binary"
+
+    @staticmethod
+    def save_file():
+        """Returns the save file of the selected FORMAT."""
+        return SaveSystem.BINARY_SAVE_FILE if SaveSystem.is_binary() else SaveSystem.SAVE_FILE
+
+    @staticmethod
+    def close():
+        """Waits until every save is on disk and finishes journaled saving. Call when the game ends."""
+        journal, SaveSystem.journal = SaveSystem.journal, None
+        try:
+            if journal:
+                journal.close()
+            SaveSystem.writer.flush()
+        except Exception as e:
+            show("Error saving game: {}", e)
+
+    @staticmethod
+    def flush():
+        """Waits until every save is on disk, and shows the error of a save that could not be written."""
+        try:
+            SaveSystem.writer.flush()
+        except Exception as e:
+            show("Error saving game: {}", e)
+
+    @staticmethod
+    def write_save(save_file, save_data, binary):
+        """Writer thread: writes a full save, then deletes the journal it replaces."""
+        SaveJournal.write_snapshot(save_file, save_data, binary)
+        SaveSystem.discard_journal()
+
+    @staticmethod
+    def discard_journal():
+        """Deletes the journal files, e.g. after a full save."""
+        for journal_file in (SaveSystem.JOURNAL_FILE, SaveSystem.JOURNAL_FILE + ".compacting"):
+            if os.path.exists(journal_file):
+                os.remove(journal_file)
+
+    @staticmethod
+    def game_state(player, dungeon):
+        """Returns the saved state of a whole game: {"player": ..., "dungeon": ...}."""
+        return {
+            "player": SaveSystem.player_state(player),
+            "dungeon": dungeon.to_dict()
+        }
+
+    @staticmethod
+    def player_state(player):
+        """Returns the player's saved state. If the player's pet is dead, it will not be saved."""
+        state = player.to_dict()
+        state["temporary_buffs"] = dict(state["temporary_buffs"])  # Copy, so later turns don't change it
+        if player.pet and player.pet.is_alive():
+            state["pet"] = player.pet.to_dict()
+        else:
+            state["pet"] = None  
+        return state
+
+    @staticmethod
+    def load_game(player_name=None, slot=None):
+        """
+        Loads the game state from the save file of the selected FORMAT, if it exists, plus any journaled turns.
+        With the sqlite backend, loads the given slot of a player, or their latest save when no slot
+        is given (the latest save of anyone when no player is given).
+        Returns a dictionary containing player and dungeon data.
+        """
+        SaveSystem.flush()  # Load what was saved last, not what is still on its way to disk
+        try:
+            if SaveSystem.BACKEND == "sqlite":
+                if slot is not None:
+                    save_data = SaveSystem.get_store().load(player_name, slot)
+                else:
+                    latest = SaveSystem.get_store().latest(player_name)
+                    save_data = latest[2] if latest else None
+                if save_data is None:
+                    raise FileNotFoundError(SaveSystem.DATABASE)
+                return save_data
+            return SaveJournal.load(SaveSystem.save_file(), SaveSystem.JOURNAL_FILE, SaveSystem.is_binary())
+        except FileNotFoundError:
+            show("\nNo save file found. Starting a new game.")
+            return None
+        except json.JSONDecodeError:
+            show("\nError loading save file. The data might be corrupted.")
+            return None
+        except binary_save.SaveFormatError as e:
+            show("\nError loading save file: {}", e)
+            return None
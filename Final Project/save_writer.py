@@ -0,0 +1,94 @@
+import atexit
+import os
+import threading
+
+class SaveWriter:
+    """
+    Background thread that does the save file I/O, so a turn never waits for the disk.
+
+    The game thread takes a snapshot of the game (plain dictionaries) and hands it over with
+    submit(); the writer runs the queued tasks in order. Tasks are kept in a bounded queue:
+    - a task submitted with a key replaces a still-waiting task with the same key, so when saves
+      come in faster than the disk can take them, only the newest snapshot of a file is written
+    - when max_pending tasks are waiting, submit() blocks until the writer catches up
+    flush() waits until everything submitted so far is on disk (call it before exiting or loading).
+    A task that fails does not stop the writer: its error is kept, and the next flush() raises it.
+    """
+
+    def __init__(self, max_pending=32):
+        self.max_pending = max_pending
+        self.tasks = []  # Waiting [key, function, args], oldest first
+        self.busy = False  # True while the writer runs a task
+        self.condition = threading.Condition()
+        self.thread = None
+        self.written = 0  # Tasks run
+        self.collapsed = 0  # Tasks replaced by a newer one before they were run
+        self.error = None  # First error of a task since the last flush()
+
+    def submit(self, function, *args, key=None):
+        """Queues function(*args) to run on the writer thread. Blocks only when the queue is full."""
+        with self.condition:
+            if key is not None:
+                for task in self.tasks:
+                    if task[0] == key:
+                        task[1:] = [function, args]  # Superseded: only the newest snapshot is written
+                        self.collapsed += 1
+                        return
+            while len(self.tasks) >= self.max_pending:
+                self.condition.wait()
+            self.tasks.append([key, function, args])
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="save-writer", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)  # Don't lose queued saves when the game exits
+            self.condition.notify_all()
+
+    def run(self):
+        """Writer thread: runs the queued tasks one by one."""
+        while True:
+            with self.condition:
+                while not self.tasks:
+                    self.condition.wait()
+                _, function, args = self.tasks.pop(0)
+                self.busy = True
+                self.condition.notify_all()  # A slot in the queue is free
+            error = None
+            try:
+                function(*args)
+            except Exception as e:
+                error = e
+            with self.condition:
+                if self.error is None:
+                    self.error = error
+                self.busy = False
+                self.written += 1
+                self.condition.notify_all()
+
+    def flush(self):
+        """Waits until every submitted task has been written, then raises the error of a task that failed, if any."""
+        with self.condition:
+            while self.tasks or self.busy:
+                self.condition.wait()
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+
+def write_atomic(save_file, data):
+    """
+    Writes bytes to save_file so that a crash leaves either the old or the new file, never half
+    of one: write a temporary file, fsync it, rename it over the old file, then fsync the directory
+    so the rename itself is on disk.
+    """
+    temp_file = save_file + ".tmp"
+    with open(temp_file, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, save_file)
+    if os.name == "posix":
+        directory = os.open(os.path.dirname(os.path.abspath(save_file)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
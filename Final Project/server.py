@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import contextvars
+import itertools
+import queue
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dungeon import Dungeon
+from events import EventBus, current_bus
+from game_input import current_input
+from main import display_player_stats, finish_turn, show_path_choices
+from output import Output, current_output, show
+from player import Player
+from policy import TerminalPolicy
+from rng import RandomStreams
+from session_manager import SessionManager
+from timing import Histogram
+
+class SessionClosed(ConnectionError):
+    """Raised in a game waiting for an answer when its player has disconnected."""
+
+
+class SessionOutput(Output):
+    """Collects a session's game text and sends it to the player's connection when flushed."""
+
+    def __init__(self, session):
+        self.session = session
+        self.lines = []
+
+    def write(self, text):
+        self.lines.append(text)
+
+    def flush(self):
+        if self.lines:
+            lines, self.lines = self.lines, []
+            self.session.send("\n".join(lines) + "\n")
+
+
+class SessionInput:
+    """
+    The input provider of a game played over the server. Prompts asked in the middle of a turn
+    (battle actions, the shop, puzzles, traps) come from the turn's worker thread: the prompt is
+    sent to the player, and the thread waits for the answer line that the session's connection
+    task puts in self.answers.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.answers = queue.SimpleQueue()  # None: the player has disconnected
+
+    def read(self, prompt):
+        self.session.send_prompt(prompt)
+        answer = self.answers.get()
+        if answer is None:
+            raise SessionClosed("The player disconnected.")
+        return answer
+
+
+class GameSession:
+    """
+    One player's game on the server: its own Player, Dungeon and RandomStreams, and its own output
+    sink, input provider and event bus. They are set in self.context, and every piece of game
+    code of the session runs inside that context (on the event loop or in a turn's worker
+    thread), so sessions share no random stream and no module-level state.
+    """
+
+    def __init__(self, number, reader, writer, server, seed=None):
+        self.number = number
+        self.reader = reader
+        self.writer = writer
+        self.server = server
+        self.loop = asyncio.get_running_loop()
+        self.output = SessionOutput(self)
+        self.input = SessionInput(self)
+        self.bus = EventBus(capacity=64)  # Per session; a subscriber (stats, achievements) reads its own game
+        self.rng = RandomStreams(seed)
+        self.player = None
+        self.dungeon = None
+        self.turns = 0
+        self.task = None  # The asyncio task playing the session
+        self.reading = None  # The task reading the next line from the player, if one is running
+        self.answered = 0  # perf_counter_ns() of the last answer, for the response time of the next prompt
+
+        self.context = contextvars.copy_context()
+        self.context.run(self.use_session_state)
+
+    def use_session_state(self):
+        current_output.set(self.output)
+        current_input.set(self.input)
+        current_bus.set(self.bus)
+
+    def run(self, function, *args):
+        """Calls function(*args) on the event loop, inside the session's context."""
+        return self.context.run(function, *args)
+
+    def send(self, text):
+        """Sends text to the player (from the event loop or from the session's worker thread)."""
+        self.loop.call_soon_threadsafe(self.write, text.encode(), False)
+
+    def send_prompt(self, prompt):
+        """Sends the game text shown so far, then prompt (which has no newline: that marks it as a prompt)."""
+        self.output.flush()
+        self.loop.call_soon_threadsafe(self.write, prompt.encode(), True)
+
+    def write(self, data, prompt):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+            if prompt and self.answered:
+                self.server.response_times.record(time.perf_counter_ns() - self.answered)
+
+    async def read_line(self):
+        """Waits for the player's next line. Raises SessionClosed if the connection is gone."""
+        if self.reading is None:
+            self.reading = asyncio.ensure_future(self.reader.readline())
+        try:
+            line = await self.reading
+        except (ValueError, OSError):  # A line over the stream limit, or a reset connection
+            line = b""
+        finally:
+            self.reading = None
+        if not line:
+            raise SessionClosed("The player disconnected.")
+        self.answered = time.perf_counter_ns()
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    async def prompt(self, prompt):
+        """The awaitable version of ask(): sends prompt and returns the answer."""
+        self.send_prompt(prompt)
+        return await self.read_line()
+
+    async def play_turn(self, choice):
+        """
+        Plays the rest of the turn (main.finish_turn) in a worker thread, since it may stop at any
+        number of prompts, and meanwhile passes the lines the player sends to the game's SessionInput.
+        """
+        turn = self.loop.run_in_executor(self.server.workers, self.context.run, finish_turn,
+                                         self.player, self.dungeon, choice)
+        self.server.active_turns += 1
+        try:
+            while not turn.done():
+                if self.reading is None:
+                    self.reading = asyncio.ensure_future(self.reader.readline())
+                await asyncio.wait((turn, self.reading), return_when=asyncio.FIRST_COMPLETED)
+                if self.reading.done():
+                    try:
+                        self.input.answers.put(await self.read_line())
+                    except SessionClosed:
+                        self.input.answers.put(None)  # The game's thread stops at its next prompt
+                        await asyncio.wait((turn,))
+                        turn.exception()
+                        raise
+            return turn.result()
+        finally:
+            self.server.active_turns -= 1
+            while not self.input.answers.empty():  # Lines typed ahead when no prompt came are dropped
+                self.input.answers.get_nowait()
+
+    async def play(self):
+        """Plays the whole game over the connection."""
+        self.run(show, "Welcome to Roguelike Dungeon Adventure!")
+        name = (await self.prompt("Enter your character's name: ")).strip()
+        self.player = Player(name=name, health=100, attack=10, gold=50)
+        self.dungeon = Dungeon(rng=self.rng)
+        self.run(display_player_stats, self.player)
+
+        ended = None
+        while self.player.is_alive() and not self.dungeon.is_exit_reached():
+            # The path is asked for here, on the event loop: a player who has not answered yet
+            # is only a waiting task, not a blocked thread
+            valid_choices = self.run(show_path_choices, self.dungeon)
+            while True:
+                self.server.manager.waiting(self)  # The game may be hibernated while the player thinks
+                choice = (await self.prompt(TerminalPolicy.path_prompt(valid_choices))).strip()
+                self.server.manager.answered(self)
+                if choice in valid_choices:
+                    break
+                self.run(show, "Invalid choice! Choose a valid path.")
+
+            self.turns += 1
+            self.server.turns += 1
+            ended = await self.play_turn(choice)
+            if ended:
+                break
+
+        if self.dungeon.is_exit_reached():
+            self.run(show, "Congratulations! You successfully escaped the dungeon!")
+        self.output.flush()
+        return ended or ("victory", None)
+
+    def close(self):
+        if self.reading is not None:
+            self.reading.cancel()
+        self.writer.close()
+
+
+class GameServer:
+    """
+    Hosts any number of independent games in one process, one GameSession per connection, over
+    TCP or a Unix socket. The protocol is plain text, so `nc localhost 7777` is a client: the
+    server sends the game's text, and a prompt is text that does not end with a newline; the
+    client answers with one line.
+
+    Waiting for the path at the start of a turn (where idle players are) costs no thread. The rest
+    of a turn runs in a pool of at most max_active_turns worker threads; turns beyond that wait
+    for a free worker. The manager (a SessionManager) hibernates idle games beyond its memory budget.
+    """
+
+    def __init__(self, max_active_turns=256, manager=None):
+        self.manager = manager or SessionManager()
+        self.workers = ThreadPoolExecutor(max_workers=max_active_turns, thread_name_prefix="turn")
+        self.sessions = {}  # number -> GameSession
+        self.numbers = itertools.count(1)
+        self.server = None
+        self.turns = 0
+        self.active_turns = 0
+        self.games_finished = 0
+        self.disconnects = 0
+        self.response_times = Histogram()  # From a player's answer to the next prompt sent back
+
+    async def start(self, host="127.0.0.1", port=7777, unix_path=None, backlog=1024):
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, unix_path, backlog=backlog)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port, backlog=backlog)
+        return self.server
+
+    async def handle_connection(self, reader, writer):
+        session = GameSession(next(self.numbers), reader, writer, self)
+        session.task = asyncio.current_task()
+        self.sessions[session.number] = session
+        try:
+            await session.play()
+            self.games_finished += 1
+        except SessionClosed:
+            self.disconnects += 1
+        finally:
+            del self.sessions[session.number]
+            self.manager.remove(session)
+            session.close()
+
+    def stats(self):
+        """Returns the server's counters and the response time percentiles (in microseconds)."""
+        return {
+            "sessions": len(self.sessions),
+            "active_turns": self.active_turns,
+            "turns": self.turns,
+            "games_finished": self.games_finished,
+            "disconnects": self.disconnects,
+            "response_time": self.response_times.summary(),
+            "memory": self.manager.stats()
+        }
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        sessions = list(self.sessions.values())
+        for session in sessions:
+            session.writer.close()  # The session's task sees the connection end and stops
+        await asyncio.gather(*(session.task for session in sessions), return_exceptions=True)
+        self.workers.shutdown(wait=False, cancel_futures=True)
+        self.manager.close()
+
+
+async def serve(args):
+    budget = int(args.memory_budget * 1024 * 1024) if args.memory_budget else None
+    server = GameServer(args.max_active_turns, SessionManager(budget, args.hibernate_dir))
+    await server.start(args.host, args.port, args.unix)
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'}", file=sys.stderr)
+    try:
+        while True:
+            await asyncio.sleep(args.stats or 3600)
+            if args.stats:
+                print(server.stats(), file=sys.stderr)
+    finally:
+        await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many games of Roguelike Dungeon Adventure in one process.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-active-turns", type=int, default=256,
+                        help="worker threads for turns waiting on a prompt in a battle, shop or puzzle")
+    parser.add_argument("--memory-budget", type=float, default=0, metavar="MB",
+                        help="hibernate the least recently used idle games beyond this much memory (0: never)")
+    parser.add_argument("--hibernate-dir", help="where hibernated games are written (a temporary directory by default)")
+    parser.add_argument("--stats", type=float, default=0, metavar="SECONDS", help="print the server's stats this often")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from server import GameServer
+from session_manager import SessionManager
+from timing import Histogram
+
+class Bot:
+    """
+    A scripted client of the game server: it answers every prompt with a random valid-looking
+    answer and measures the time from each answer to the next prompt.
+    """
+
+    def __init__(self, connect, rng, think_time=0.0):
+        self.connect = connect
+        self.rng = rng
+        self.think_time = think_time
+        self.latency = Histogram()
+        self.games = 0
+
+    async def read_prompt(self, reader):
+        """Reads the game's text up to the next prompt (text without a final newline). Returns None at the end of the game."""
+        text = b""
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return None
+            text += chunk
+            if text.endswith(b": "):
+                return text[text.rfind(b"\n") + 1:].decode()
+
+    def answer(self, prompt):
+        if prompt.startswith("Which path"):
+            choices = prompt[prompt.index("(") + 1:prompt.index(")")].split(", ")
+            return self.rng.choice([choice for choice in choices if choice != "4"] or choices)
+        if "or 0 to leave" in prompt:
+            return "0"
+        return str(self.rng.randint(1, 3))
+
+    async def play(self, name):
+        """Plays one game to its end."""
+        reader, writer = await self.connect()
+        try:
+            prompt = await self.read_prompt(reader)  # The name prompt
+            answer = name
+            while prompt is not None:
+                if self.think_time:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+                writer.write(answer.encode() + b"\n")
+                sent = time.perf_counter_ns()
+                prompt = await self.read_prompt(reader)
+                self.latency.record(time.perf_counter_ns() - sent)
+                if prompt is not None:
+                    answer = self.answer(prompt)
+            self.games += 1
+        finally:
+            writer.close()
+
+    async def play_forever(self, name):
+        while True:
+            await self.play(name)
+
+    async def idle(self, name):
+        """Starts a game, then never answers the first path prompt."""
+        reader, writer = await self.connect()
+        await self.read_prompt(reader)
+        writer.write(name.encode() + b"\n")
+        await self.read_prompt(reader)
+        return reader, writer
+
+
+async def load_test(idle, active, duration, think_time, seed, memory_budget=None):
+    """
+    Runs a server on a Unix socket with idle waiting players and active bots, and returns the
+    results. With memory_budget (bytes) the server hibernates games beyond it.
+    """
+    directory = tempfile.mkdtemp(prefix="dungeon-server-")
+    path = os.path.join(directory, "server.sock")
+    server = GameServer(manager=SessionManager(memory_budget))
+    await server.start(unix_path=path)
+
+    def connect():
+        return asyncio.open_unix_connection(path)
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    waiting = []
+    for first in range(0, idle, 100):  # In batches, so the listening socket's backlog never overflows
+        waiting += await asyncio.gather(*(Bot(connect, rng).idle(f"Idle{number}")
+                                          for number in range(first, min(idle, first + 100))))
+    connect_time = time.perf_counter() - started
+
+    bots = [Bot(connect, random.Random(rng.random()), think_time) for _ in range(active)]
+    tasks = [asyncio.ensure_future(bot.play_forever(f"Bot{number}")) for number, bot in enumerate(bots)]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latency = Histogram()
+    for bot in bots:
+        latency.merge(bot.latency)
+    stats = server.stats()
+    for reader, writer in waiting:
+        writer.close()
+    await server.close()
+    os.remove(path)
+    os.rmdir(directory)
+    return {"idle_connect_s": round(connect_time, 3), "games": sum(bot.games for bot in bots),
+            "answers_per_s": round(latency.count / duration, 1), "client_latency": latency.summary(), "server": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the game server with idle players and playing bots.")
+    parser.add_argument("--idle", type=int, default=2000, help="players that start a game and then never answer")
+    parser.add_argument("--active", type=int, default=200, help="bots playing games back to back")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of play")
+    parser.add_argument("--think-time", type=float, default=0.05, help="mean seconds a bot waits before answering")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--memory-budget", type=float, default=0, metavar="MB",
+                        help="let the server hibernate idle games beyond this much memory (0: never)")
+    args = parser.parse_args()
+
+    budget = int(args.memory_budget * 1024 * 1024) if args.memory_budget else None
+    results = asyncio.run(load_test(args.idle, args.active, args.duration, args.think_time, args.seed, budget))
+    latency = results["client_latency"]
+    print(f"{args.idle} idle sessions connected in {results['idle_connect_s']:.2f}s")
+    print(f"{args.active} bots: {results['games']} games, {results['answers_per_s']:,.0f} answers/s")
+    print(f"Answer to next prompt: p50 {latency['p50_us'] / 1000:.2f} ms, p95 {latency['p95_us'] / 1000:.2f} ms, "
+          f"p99 {latency['p99_us'] / 1000:.2f} ms, max {latency['max_us'] / 1000:.2f} ms")
+    memory = results["server"].pop("memory")
+    print(f"Server: {results['server']}")
+    print(f"Memory: {memory}")
+
+if __name__ == "__main__":
+    main()
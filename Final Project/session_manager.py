@@ -0,0 +1,211 @@
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+import binary_save
+from dungeon import Dungeon
+from player import Player
+from rng import RandomStreams
+from save_system import SaveSystem
+from save_writer import SaveWriter
+from timing import Histogram
+
+# A hibernated game's random stream: its number in RandomStreams.STREAMS, the Mersenne Twister
+# state (624 words and the position), whether gauss() has a value waiting, and that value
+STREAM_STATE = struct.Struct("<B625IBd")
+
+def pack_streams(rng):
+    """Returns the state of every stream the game has created, as bytes (see STREAM_STATE)."""
+    parts = []
+    for number, name in enumerate(RandomStreams.STREAMS):
+        stream = rng.__dict__.get(name)  # Streams not created yet are left out
+        if stream is not None:
+            version, words, gauss_next = stream.getstate()
+            parts.append(STREAM_STATE.pack(number, *words, gauss_next is not None, gauss_next or 0.0))
+    return b"".join(parts)
+
+def unpack_streams(rng, data):
+    """
+    Puts the streams packed by pack_streams() back into rng, so they go on where they stopped.
+    A stream rng already has is set in place, as the rooms of a loaded dungeon hold on to the world stream.
+    """
+    for offset in range(0, len(data), STREAM_STATE.size):
+        number, *words, has_gauss, gauss_next = STREAM_STATE.unpack_from(data, offset)
+        name = RandomStreams.STREAMS[number]
+        stream = rng.__dict__.get(name)
+        if stream is None:
+            stream = random.Random()
+            setattr(rng, name, stream)
+        stream.setstate((3, tuple(words), gauss_next if has_gauss else None))
+
+def measure_session_size():
+    """Returns the memory (in bytes) of a new server game's Player and Dungeon, measured with tracemalloc."""
+    Dungeon(rng=RandomStreams(0))  # Load the shared spawn tables first: they are not part of a session
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = []
+    for seed in range(20):
+        player, dungeon = Player(health=100, attack=10, gold=50), Dungeon(rng=RandomStreams(seed))
+        for stream in RandomStreams.STREAMS:  # A game soon uses all of its streams
+            getattr(dungeon.rng, stream)
+        games.append((player, dungeon))
+    size = (tracemalloc.get_traced_memory()[0] - before) // len(games)
+    if not was_tracing:
+        tracemalloc.stop()
+    return size
+
+
+class SessionManager:
+    """
+    Keeps the games of a GameServer (server.py) within a memory budget.
+
+    A session whose player has not answered the path prompt yet is idle, and idle sessions are kept
+    in least recently used order. When the resident games (idle or in the middle of a turn) would
+    take more than memory_budget bytes, the least recently used idle ones are hibernated: their
+    Player and Dungeon are saved with SaveSystem.game_state() (to_dict) and dropped, and the save
+    is written to directory in the binary format by a background SaveWriter. A hibernated game
+    takes a few KB on disk (mostly its random streams) instead of its object graph in memory.
+
+    The player never notices: the next answer wakes the game with Player.from_dict() and
+    Dungeon.from_dict(), before it is used. The state of the game's random streams is written
+    next to the save (session-N.dat.rng) and put back, so the woken game goes on with the rolls it
+    would have made, instead of replaying them from the seed.
+
+    A session's size is the measured size of a new game (measure_session_size()), since the
+    server's dungeons all have the same number of rooms.
+    """
+
+    def __init__(self, memory_budget=None, directory=None, session_size=None):
+        self.memory_budget = memory_budget  # None: never hibernate
+        self.directory = directory  # A temporary one is created when the first session hibernates
+        self.own_directory = directory is None
+        self.session_size = session_size or measure_session_size()
+        self.max_resident = max(1, memory_budget // self.session_size) if memory_budget else None
+        self.resident = set()  # Numbers of the sessions whose game is in memory
+        self.idle = OrderedDict()  # number -> idle resident GameSession, least recently used first
+        self.hibernated = {}  # number -> the dungeon's available_paths, which are not part of a save
+        self.pending = {}  # number -> (saved state, packed streams) still on its way to disk
+        self.files = set()  # Numbers of the sessions with a hibernation file
+        self.lock = threading.Lock()  # pending is shared with the writer thread
+        self.writer = SaveWriter(max_pending=1024)  # Deep enough that the event loop never waits for it
+        self.hibernations = 0
+        self.wakes = 0
+        self.hibernate_times = Histogram()
+        self.wake_times = Histogram()
+
+    def file_of(self, session):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="dungeon-sessions-")
+        return os.path.join(self.directory, f"session-{session.number}.dat")
+
+    def waiting(self, session):
+        """Called when the session starts waiting at the path prompt: it becomes the most recently used idle game."""
+        self.resident.add(session.number)
+        self.idle[session.number] = session
+        self.idle.move_to_end(session.number)
+        if self.max_resident is not None:
+            while len(self.resident) > self.max_resident and len(self.idle) > 1:
+                self.hibernate(self.idle.popitem(last=False)[1])
+
+    def answered(self, session):
+        """Called when the session's player has answered: wakes the game if it was hibernated."""
+        self.idle.pop(session.number, None)
+        if session.number in self.hibernated:
+            self.wake(session)
+
+    def hibernate(self, session):
+        started = time.perf_counter_ns()
+        state = SaveSystem.game_state(session.player, session.dungeon)
+        streams = pack_streams(session.dungeon.rng)
+        self.hibernated[session.number] = session.dungeon.available_paths
+        path = self.file_of(session)
+        with self.lock:
+            self.pending[session.number] = (state, streams)
+        self.writer.submit(self.write_state, session.number, path, state, streams, key=path)
+        self.files.add(session.number)
+        session.player = session.dungeon = session.rng = None
+        self.resident.discard(session.number)
+        self.hibernations += 1
+        self.hibernate_times.record(time.perf_counter_ns() - started)
+
+    def write_state(self, number, path, state, streams):
+        """Writer thread: writes a hibernated game and its streams. No fsync: hibernated games do not outlive the process."""
+        binary_save.write_file(path, state)
+        with open(path + ".rng", "wb") as f:
+            f.write(streams)
+        with self.lock:
+            pending = self.pending.get(number)
+            if pending is not None and pending[0] is state:  # Not woken (and maybe hibernated again) meanwhile
+                del self.pending[number]
+
+    def wake(self, session):
+        started = time.perf_counter_ns()
+        with self.lock:
+            pending = self.pending.pop(session.number, None)
+        if pending is None:
+            path = self.file_of(session)
+            state = binary_save.read_file(path)
+            with open(path + ".rng", "rb") as f:
+                streams = f.read()
+        else:
+            state, streams = pending
+        session.player = Player.from_dict(state["player"])
+        session.dungeon = Dungeon.from_dict(state["dungeon"])
+        unpack_streams(session.dungeon.rng, streams)
+        session.dungeon.available_paths = self.hibernated.pop(session.number)
+        session.rng = session.dungeon.rng
+        self.resident.add(session.number)
+        self.wakes += 1
+        self.wake_times.record(time.perf_counter_ns() - started)
+
+    def remove(self, session):
+        """Called when the session ends: forgets it and deletes its hibernation file."""
+        self.idle.pop(session.number, None)
+        self.resident.discard(session.number)
+        self.hibernated.pop(session.number, None)
+        if session.number in self.files:
+            self.files.discard(session.number)
+            with self.lock:
+                self.pending.pop(session.number, None)
+            self.writer.submit(self.delete_file, self.file_of(session))  # After its write, if one is queued
+
+    @staticmethod
+    def delete_file(path):
+        for name in (path, path + ".rng"):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def stats(self):
+        """Returns the resident and hibernated session counts, and the hibernation and wake times (in microseconds)."""
+        return {
+            "resident": len(self.resident),
+            "hibernated": len(self.hibernated),
+            "max_resident": self.max_resident,
+            "session_kb": round(self.session_size / 1024, 1),
+            "hibernations": self.hibernations,
+            "wakes": self.wakes,
+            "hibernate_time": self.hibernate_times.summary(),
+            "wake_time": self.wake_times.summary()
+        }
+
+    def close(self):
+        """Waits for the queued writes, then deletes the hibernation files left (and raises a failed write)."""
+        try:
+            self.writer.flush()
+        finally:
+            self.remove_files()
+
+    def remove_files(self):
+        if self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.startswith("session-") and name.endswith((".dat", ".dat.rng")):
+                    os.remove(os.path.join(self.directory, name))
+            if self.own_directory:
+                os.rmdir(self.directory)
+                self.directory = None
@@ -0,0 +1,219 @@
+import argparse
+import time
+from collections import Counter
+from player import Player
+from dungeon import Dungeon
+from main import play_turn
+from output import NullOutput, use_output
+from path_oracle import OraclePolicy
+from battle_advisor import AdvisorPolicy
+from policy import RandomPolicy, CautiousPolicy
+from rng import RandomStreams
+from timing import timings
+
+POLICIES = {
+    "random": RandomPolicy,
+    "cautious": CautiousPolicy,
+    "advisor": AdvisorPolicy,
+    "oracle": OraclePolicy,
+}
+
+class RunResult:
+    """The outcome of one headless game."""
+
+    def __init__(self, seed, outcome, turns, gold, health, cause_of_death=None, gold_by_turn=None):
+        """
+        - outcome: "victory", "death" or "timeout"
+        - cause_of_death: the enemy name, "trap" or "Hidden Treasure Room" (None if the player survived)
+        - gold_by_turn: the player's gold after each turn played
+        """
+        self.seed = seed
+        self.outcome = outcome
+        self.turns = turns
+        self.gold = gold
+        self.health = health
+        self.cause_of_death = cause_of_death
+        self.gold_by_turn = gold_by_turn or []
+
+    def to_dict(self):
+        """Converts the result into a dictionary (for JSON reports)."""
+        return {
+            "seed": self.seed,
+            "outcome": self.outcome,
+            "turns": self.turns,
+            "gold": self.gold,
+            "health": self.health,
+            "cause_of_death": self.cause_of_death,
+            "gold_by_turn": self.gold_by_turn
+        }
+
+
+class RunStats:
+    """
+    Running totals over many RunResults. Only integer counts and sums are kept, so merging
+    partial totals in any grouping gives exactly the same numbers (used by the simulation farm).
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.outcomes = Counter()
+        self.causes_of_death = Counter()
+        self.turns = Counter()  # turns taken -> number of games
+        self.total_turns = 0
+        self.total_gold = 0
+        self.total_health = 0
+        self.gold_by_turn = Counter()  # turn -> total gold after that turn, over the games that played it
+
+    def add(self, result):
+        """Counts one RunResult."""
+        self.runs += 1
+        self.outcomes[result.outcome] += 1
+        if result.cause_of_death:
+            self.causes_of_death[result.cause_of_death] += 1
+        self.turns[result.turns] += 1
+        self.total_turns += result.turns
+        self.total_gold += result.gold
+        self.total_health += result.health
+        for turn, gold in enumerate(result.gold_by_turn, 1):
+            self.gold_by_turn[turn] += gold
+
+    def merge(self, other):
+        """Adds another RunStats into this one."""
+        self.runs += other.runs
+        self.outcomes.update(other.outcomes)
+        self.causes_of_death.update(other.causes_of_death)
+        self.turns.update(other.turns)
+        self.total_turns += other.total_turns
+        self.total_gold += other.total_gold
+        self.total_health += other.total_health
+        self.gold_by_turn.update(other.gold_by_turn)
+
+    def gold_curve(self):
+        """Returns the average gold after turns 1, 2, ... of the games that played that turn."""
+        curve = []
+        playing = self.runs
+        for turn in range(1, max(self.turns, default=0) + 1):
+            playing -= self.turns.get(turn - 1, 0)  # Games that ended before this turn
+            curve.append(self.gold_by_turn[turn] / playing)
+        return curve
+
+    def to_dict(self):
+        """Converts the totals into a dictionary of integers (for JSON caches); from_dict() reads it back."""
+        return {
+            "runs": self.runs,
+            "outcomes": dict(self.outcomes),
+            "causes_of_death": dict(self.causes_of_death),
+            "turns": {str(turns): count for turns, count in self.turns.items()},
+            "total_turns": self.total_turns,
+            "total_gold": self.total_gold,
+            "total_health": self.total_health,
+            "gold_by_turn": {str(turn): gold for turn, gold in self.gold_by_turn.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.runs = data["runs"]
+        stats.outcomes.update(data["outcomes"])
+        stats.causes_of_death.update(data["causes_of_death"])
+        stats.turns.update({int(turns): count for turns, count in data["turns"].items()})
+        stats.total_turns = data["total_turns"]
+        stats.total_gold = data["total_gold"]
+        stats.total_health = data["total_health"]
+        stats.gold_by_turn.update({int(turn): gold for turn, gold in data["gold_by_turn"].items()})
+        return stats
+
+    def summary(self):
+        """Returns win rate, averages and the causes of death (most common first) as a dictionary."""
+        if not self.runs:
+            return {"runs": 0}
+        return {
+            "runs": self.runs,
+            "win_rate": self.outcomes["victory"] / self.runs,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "avg_turns": self.total_turns / self.runs,
+            "avg_gold": self.total_gold / self.runs,
+            "avg_health": self.total_health / self.runs,
+            "turns": dict(sorted(self.turns.items())),
+            "gold_curve": self.gold_curve(),
+            "causes_of_death": dict(sorted(self.causes_of_death.items(), key=lambda cause: (-cause[1], cause[0])))
+        }
+
+
+def simulate_run(policy=None, seed=None, max_turns=200, dungeon_options=None):
+    """
+    Plays one full game without a terminal and returns a RunResult.
+    The game runs through the same play_turn() as main(), but decisions come from the policy
+    and nothing is shown or saved (the NullOutput sink does not even format the game text).
+    max_turns stops policies that never reach the exit.
+    The game gets its own RandomStreams, so the same seed (and policy) always plays the same game.
+    """
+    streams = RandomStreams(seed)
+    policy = policy or CautiousPolicy(rng=streams.derive("policy"))
+
+    with use_output(NullOutput()):
+        player = Player(name="Bot", health=100, attack=10, gold=50)  # Same start as create_new_character()
+        player.policy = policy
+        dungeon = Dungeon(**(dungeon_options or {}), rng=streams)
+
+        outcome, cause, turns = "victory", None, 0
+        gold_by_turn = []
+        while player.is_alive() and not dungeon.is_exit_reached():
+            if turns >= max_turns:
+                outcome = "timeout"
+                break
+            turns += 1
+            ended = play_turn(player, dungeon)
+            gold_by_turn.append(player.gold)
+            if ended:
+                outcome, cause = ended
+                break
+
+    return RunResult(streams.seed, outcome, turns, player.gold, max(0, player.health), cause, gold_by_turn)
+
+
+def simulate_runs(num_runs, policy_name="cautious", first_seed=0, max_turns=200, dungeon_options=None):
+    """Plays num_runs games with consecutive seeds and returns the list of RunResults."""
+    policy_class = POLICIES[policy_name]
+    results = []
+    for seed in range(first_seed, first_seed + num_runs):
+        policy = policy_class(rng=RandomStreams(seed).derive("policy"))
+        results.append(simulate_run(policy, seed, max_turns, dungeon_options))
+    return results
+
+
+def summarize(results):
+    """Aggregates a list of RunResults into win rate, averages and the most common causes of death."""
+    stats = RunStats()
+    for result in results:
+        stats.add(result)
+    return stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless dungeon games and print a summary.")
+    parser.add_argument("--runs", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="cautious", help="bot that makes the decisions")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--max-turns", type=int, default=200, help="turn limit per game")
+    parser.add_argument("--tables", help="spawn tables file to use instead of spawn_tables.json")
+    parser.add_argument("--timings", metavar="FILE", help="time every turn phase and battle step, and write them to FILE as JSON")
+    args = parser.parse_args()
+    if args.timings:
+        timings.enable(args.timings)
+
+    start = time.perf_counter()
+    results = simulate_runs(args.runs, args.policy, args.seed, args.max_turns, {"tables": args.tables})
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results)
+    print(f"Played {summary['runs']} games in {elapsed:.2f}s ({summary['runs'] / elapsed:.0f} games/s)")
+    print(f"Win rate: {summary['win_rate']:.1%}")
+    print(f"Outcomes: {summary['outcomes']}")
+    print(f"Average turns: {summary['avg_turns']:.1f}, average gold: {summary['avg_gold']:.1f}")
+    print(f"Causes of death: {summary['causes_of_death']}")
+    if args.timings:
+        timings.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from simulation import POLICIES, RunStats, simulate_runs
+
+SHARD_SIZE = 2000  # Seeds per task; fixed so the shards never depend on the number of workers
+
+def run_shard(first_seed, num_runs, policy_name, max_turns, dungeon_options):
+    """Plays one shard of consecutive seeds in a worker process and returns its RunStats."""
+    stats = RunStats()
+    for result in simulate_runs(num_runs, policy_name, first_seed, max_turns, dungeon_options):
+        stats.add(result)
+    return stats
+
+
+def shard_seeds(first_seed, num_runs, shard_size=SHARD_SIZE):
+    """Splits the seed range into (first seed, number of runs) shards."""
+    return [(seed, min(shard_size, first_seed + num_runs - seed))
+            for seed in range(first_seed, first_seed + num_runs, shard_size)]
+
+
+def run_farm(num_runs, policy_name="cautious", first_seed=0, workers=None, max_turns=200, dungeon_options=None,
+             shard_size=SHARD_SIZE):
+    """
+    Plays num_runs full games over a pool of worker processes and returns the merged RunStats.
+    Every game is seeded by its own seed and the shards are merged in seed order with integer
+    totals, so the result is exactly the same for any number of workers (workers=1 runs in-process).
+    """
+    shards = shard_seeds(first_seed, num_runs, shard_size)
+    total = RunStats()
+    if workers == 1:
+        for seed, count in shards:
+            total.merge(run_shard(seed, count, policy_name, max_turns, dungeon_options))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, seed, count, policy_name, max_turns, dungeon_options)
+                   for seed, count in shards]
+        for future in futures:
+            total.merge(future.result())
+    return total
+
+
+def fingerprint(summary):
+    """Short hash of a summary, to check that two farm runs gave identical results."""
+    return hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many headless games over all CPU cores.")
+    parser.add_argument("--runs", type=int, default=100000, help="number of games to play")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="cautious", help="bot that makes the decisions")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (1 = no pool)")
+    parser.add_argument("--max-turns", type=int, default=200, help="turn limit per game")
+    parser.add_argument("--tables", help="spawn tables file to use instead of spawn_tables.json")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = run_farm(args.runs, args.policy, args.seed, args.workers, args.max_turns, {"tables": args.tables})
+    elapsed = time.perf_counter() - start
+
+    summary = stats.summary()
+    print(f"Played {stats.runs} games on {args.workers} worker(s) in {elapsed:.2f}s ({stats.runs / elapsed:.0f} games/s)")
+    print(f"Win rate: {summary['win_rate']:.2%}, average turns: {summary['avg_turns']:.2f}, average gold: {summary['avg_gold']:.2f}")
+    print(f"Causes of death: {summary['causes_of_death']}")
+    print(f"Fingerprint: {fingerprint(summary)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import time
+from collections import Counter
+from enemy import Enemy
+from item import Item, describe_item
+from pet import Pet
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spawn_tables.json")
+
+class AliasTable:
+    """
+    Weighted random choice in O(1) per draw (Vose's alias method).
+
+    The weights are compiled once into two lists: for a uniform column i, keep i with
+    probability prob[i], otherwise take alias[i]. A draw then needs one random number
+    and one comparison, however many entries the table has.
+    """
+
+    def __init__(self, values, weights):
+        if len(values) != len(weights) or not values:
+            raise ValueError("An alias table needs one positive weight per value.")
+        total = float(sum(weights))
+        if total <= 0 or min(weights) < 0:
+            raise ValueError("Alias table weights must be positive.")
+        count = len(values)
+        self.values = list(values)
+        self.prob = [0.0] * count
+        self.alias = list(range(count))
+
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            self.prob[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        for i in small + large:  # Whatever is left is 1 up to rounding errors
+            self.prob[i] = 1.0
+
+        # The value each column gives in both cases, so a draw is just two list lookups
+        self.keep = self.values
+        self.other = [self.values[i] for i in self.alias]
+
+    def sample(self, rng=random):
+        """Draws one value."""
+        u = rng.random() * len(self.prob)
+        column = int(u)
+        return self.keep[column] if u - column < self.prob[column] else self.other[column]
+
+    def sample_many(self, count, rng=random):
+        """Draws count values at once (much faster than calling sample() in a loop)."""
+        size = len(self.prob)
+        prob, keep, other = self.prob, self.keep, self.other
+        draws = []
+        append = draws.append
+        for u in [rng.random() * size for _ in range(count)]:
+            column = int(u)
+            append(keep[column] if u - column < prob[column] else other[column])
+        return draws
+
+    def probabilities(self):
+        """Returns [(value, probability)] of the values in table order (each column gives prob to keep, the rest to alias)."""
+        count = len(self.prob)
+        chances = [0.0] * count
+        for column, (keep, alias) in enumerate(zip(self.prob, self.alias)):
+            chances[column] += keep / count
+            chances[alias] += (1.0 - keep) / count
+        return list(zip(self.values, chances))
+
+
+class SpawnTables:
+    """
+    Spawn and loot tables: which enemies, items and pets appear, per path ("normal", "shortcut",
+    "mystery") and depth (the room's index in its path), and how likely a room is to have an
+    enemy, an item, a trap or a puzzle.
+
+    The weights are read from a JSON file (spawn_tables.json by default), so balancing the game
+    needs no code change. Every weight list is compiled into an AliasTable once, when the file is loaded.
+    A path missing from a table uses the "normal" entry. Each path holds depth tiers:
+    [{"from_depth": 0, "weights": {...}}, {"from_depth": 20, "weights": {...}}]
+    and a room uses the last tier that starts at or before its depth.
+
+    An optional "stats" section changes the templates these tables spawn, for balancing:
+    {"enemies": {"Orc": {"health": 60}}, "items": {"Small Healing Potion": {"price": 12}}}
+    Vendors take their stock's prices from the same templates.
+    """
+
+    KINDS = {
+        "enemies": {template.name: template for template in Enemy.TEMPLATES},
+        "items": {template.name: template for template in Item.TEMPLATES},
+        "pets": {template.name: template for template in Pet.TEMPLATES}
+    }
+    CHANCES = ("enemy", "item", "trap", "puzzle")
+
+    def __init__(self, data, source="<data>"):
+        self.source = source
+        self.chances = {}
+        for path, chances in data["rooms"].items():
+            missing = set(self.CHANCES) - set(chances)
+            if missing:
+                raise ValueError(f"{source}: room chances of '{path}' are missing {', '.join(sorted(missing))}")
+            self.chances[path] = {name: float(chances[name]) for name in self.CHANCES}
+
+        self.templates = {kind: dict(templates) for kind, templates in self.KINDS.items()}  # kind -> name -> template
+        for kind, changes in data.get("stats", {}).items():
+            if kind not in self.templates:
+                raise ValueError(f"{source}: unknown kind in 'stats': {kind}")
+            for name, fields in changes.items():
+                self.templates[kind][name] = self.changed_template(kind, name, fields, source)
+
+        self.tiers = {}  # (kind, path) -> ([from depths], [AliasTable])
+        for kind, templates in self.templates.items():
+            if "normal" not in data[kind]:
+                raise ValueError(f"{source}: '{kind}' needs a 'normal' table")
+            for path, tiers in data[kind].items():
+                tiers = sorted(tiers, key=lambda tier: tier["from_depth"])
+                tables = []
+                for tier in tiers:
+                    unknown = set(tier["weights"]) - set(templates)
+                    if unknown:
+                        raise ValueError(f"{source}: unknown {kind} in '{path}': {', '.join(sorted(unknown))}")
+                    names = list(tier["weights"])
+                    tables.append(AliasTable([templates[name] for name in names], [tier["weights"][name] for name in names]))
+                self.tiers[(kind, path)] = ([tier["from_depth"] for tier in tiers], tables)
+
+    def changed_template(self, kind, name, fields, source):
+        """Returns the template of name with the fields of a "stats" entry changed."""
+        template = self.templates[kind].get(name)
+        if template is None:
+            raise ValueError(f"{source}: unknown {kind} in 'stats': {name}")
+        unknown = (set(fields) - set(template._fields)) | (set(fields) & {"name", "description"})
+        if unknown:
+            raise ValueError(f"{source}: stats of '{name}' cannot change {', '.join(sorted(unknown))}")
+        template = template._replace(**fields)
+        if kind == "items":
+            template = template._replace(description=describe_item(template.effect, template.value, template.duration))
+        return template
+
+    @classmethod
+    def load(cls, path=DEFAULT_FILE):
+        """Reads and compiles a tables file."""
+        with open(path, "r") as f:
+            return cls(json.load(f), path)
+
+    def room_chances(self, path):
+        """Returns {"enemy": ..., "item": ..., "trap": ..., "puzzle": ...} for a path."""
+        return self.chances.get(path) or self.chances["normal"]
+
+    def table(self, kind, path, depth=0):
+        """Returns the AliasTable of "enemies", "items" or "pets" for a path and depth."""
+        depths, tables = self.tiers.get((kind, path)) or self.tiers[(kind, "normal")]
+        return tables[max(0, bisect.bisect_right(depths, depth) - 1)]
+
+    def tier(self, kind, path, depth=0):
+        """Returns the index of the depth tier a path and depth use (rooms in one tier draw from the same table)."""
+        depths, _ = self.tiers.get((kind, path)) or self.tiers[(kind, "normal")]
+        return max(0, bisect.bisect_right(depths, depth) - 1)
+
+    def draw_many(self, kind, path, depths, rng):
+        """
+        Draws one template for each depth in a sorted list of depths, with one batch draw
+        per depth tier (used to generate a whole dungeon at once).
+        """
+        tier_depths, tables = self.tiers.get((kind, path)) or self.tiers[(kind, "normal")]
+        draws = []
+        start = 0
+        while start < len(depths):
+            tier = max(0, bisect.bisect_right(tier_depths, depths[start]) - 1)
+            end = len(depths)
+            if tier + 1 < len(tier_depths):
+                end = bisect.bisect_left(depths, tier_depths[tier + 1], start)
+            draws.extend(tables[tier].sample_many(end - start, rng))
+            start = end
+        return draws
+
+    def enemy(self, rng, path="normal", depth=0):
+        """Spawns a new enemy for a room."""
+        return Enemy.from_template(self.table("enemies", path, depth).sample(rng))
+
+    def horde(self, rng, count, path="normal", depth=0):
+        """Spawns count enemies at once, for a horde or a wave (see Battle)."""
+        return [Enemy.from_template(template) for template in self.table("enemies", path, depth).sample_many(count, rng)]
+
+    def item(self, rng, path="normal", depth=0):
+        """Drops a new item for a room or a reward."""
+        return Item.from_template(self.table("items", path, depth).sample(rng))
+
+    def pet(self, rng, path="normal", depth=0):
+        """Picks a new pet (found or for sale)."""
+        return Pet.from_template(self.table("pets", path, depth).sample(rng))
+
+
+loaded_tables = {}  # File -> SpawnTables, so every game reading the same file shares one compiled copy
+
+def load_tables(path=None):
+    """Returns the compiled tables of a file (the default spawn_tables.json if not given), loading it only once."""
+    path = path or DEFAULT_FILE
+    if path not in loaded_tables:
+        loaded_tables[path] = SpawnTables.load(path)
+    return loaded_tables[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a spawn tables file: draw from every table and time the draws.")
+    parser.add_argument("file", nargs="?", default=DEFAULT_FILE)
+    parser.add_argument("--draws", type=int, default=100000, help="draws per table")
+    args = parser.parse_args()
+
+    tables = SpawnTables.load(args.file)
+    rng = random.Random(0)
+    for (kind, path), (depths, alias_tables) in sorted(tables.tiers.items()):
+        for depth, table in zip(depths, alias_tables):
+            start = time.perf_counter()
+            counts = Counter(template.name for template in table.sample_many(args.draws, rng))
+            elapsed = time.perf_counter() - start
+            shares = ", ".join(f"{name} {count / args.draws:.1%}" for name, count in counts.most_common())
+            print(f"{kind}/{path} from depth {depth} ({elapsed / args.draws * 1e9:.0f} ns/draw): {shares}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+from collections.abc import MutableMapping
+
+# Strength of an effect given without one, as the game has always applied them:
+# an attack buff adds 5 damage, poison hurts 3 and burning 5 each round
+DEFAULT_MAGNITUDES = {"attack": 5, "poison": 3, "burn": 5}
+
+# Names Player.temporary_buffs always lists (with 0 turns when not active), like the fixed dict it replaces
+BUFF_NAMES = ("attack", "defense", "luck", "poison", "burn", "stunned")
+
+
+class StatusEffect:
+    """One effect on one target: it starts on turn start and runs out on turn expiry."""
+
+    __slots__ = ("target", "name", "magnitude", "start", "expiry", "on_expire")
+
+    def __init__(self, target, name, magnitude, start, expiry, on_expire=None):
+        self.target = target
+        self.name = name
+        self.magnitude = magnitude
+        self.start = start
+        self.expiry = expiry  # None once it has been removed
+        self.on_expire = on_expire  # Called with the effect when it runs out (not when it is cured)
+
+
+class StatusEffects:
+    """
+    The status effects (buffs, poison, burning, ...) of one or more targets, on a timer wheel.
+
+    Every effect has an explicit start and expiry turn, and the wheel maps each turn to the
+    effects that run out on it, so tick() only looks at the effects expiring this turn, however
+    many are active. Moving an effect to another turn (extend, shorten, poison starting again) only
+    files it under the new turn: tick() skips the effects filed under a turn they no longer run out
+    on, so the updates a battle makes every round never search the wheel. Effects of the same name
+    on a target stack: remaining() is the turns left of the longest one and magnitude() the sum of
+    all of them. A target is anything hashable: the player, a pet or an enemy.
+
+    An effect that runs out while it is the only one of its name stays where it is, spent (its
+    expiry is not after the current turn), and the next add() of that name starts it again in
+    place: a burn or poison hitting every round reuses one StatusEffect instead of making and
+    dropping one each round. A name with more than one effect only holds running ones, so
+    running() only has to look at the first. Every query skips spent effects.
+
+    A Player holds one for itself and its pet (ticked by Player.update_buffs()), and a Battle
+    one for its enemies (ticked every round).
+    """
+
+    __slots__ = ("turn", "wheel", "active")
+
+    def __init__(self):
+        self.turn = 0
+        self.wheel = {}  # expiry turn -> {StatusEffect: None}
+        self.active = {}  # target -> {name: [StatusEffect]}, spent ones included (see above)
+
+    def add(self, target, name, turns, magnitude=None, on_expire=None, stack=True):
+        """
+        Starts an effect lasting turns turns and returns it. magnitude defaults to DEFAULT_MAGNITUDES.
+        With stack=False it replaces the target's effects of that name instead (poison starting again).
+        """
+        if turns <= 0:
+            raise ValueError(f"An effect must last at least one turn (got {turns})")
+        if magnitude is None:
+            magnitude = DEFAULT_MAGNITUDES.get(name, 0)
+        names = self.active.get(target)
+        effects = names.get(name) if names else None
+        turn = self.turn
+        expiry = turn + turns
+        if effects and len(effects) == 1 and (not stack or effects[0].expiry <= turn):
+            effect = effects[0]  # Start it again in place (poison hitting every round)
+            effect.magnitude, effect.start, effect.expiry, effect.on_expire = magnitude, turn, expiry, on_expire
+        else:
+            if effects and not stack:
+                for old in effects:
+                    old.expiry = None
+                effects.clear()
+            effect = StatusEffect(target, name, magnitude, turn, expiry, on_expire)
+            if effects is not None:
+                effects.append(effect)
+            elif names is not None:
+                names[name] = [effect]
+            else:
+                self.active[target] = {name: [effect]}
+        bucket = self.wheel.get(expiry)  # schedule() inlined
+        if bucket is None:
+            self.wheel[expiry] = {effect: None}
+        else:
+            bucket[effect] = None
+        return effect
+
+    def remove(self, effect):
+        """Ends an effect at once, without calling its on_expire."""
+        self.forget(effect)
+        effect.expiry = None  # So tick() skips it wherever it is still filed
+
+    def schedule(self, effect, expiry):
+        """Files an effect under its (new) expiry turn; where it was filed before goes stale."""
+        effect.expiry = expiry
+        bucket = self.wheel.get(expiry)
+        if bucket is None:
+            self.wheel[expiry] = {effect: None}
+        else:
+            bucket[effect] = None
+
+    def forget(self, effect):
+        names = self.active[effect.target]
+        effects = names[effect.name]
+        effects.remove(effect)
+        if not effects:
+            del names[effect.name]
+            if not names:
+                del self.active[effect.target]
+
+    def spend(self, effect, expiry):
+        """An effect runs out on turn expiry: it is kept, spent, if it is the only one of its name."""
+        effects = self.active[effect.target][effect.name]
+        if len(effects) > 1:
+            effects.remove(effect)
+            effect.expiry = None
+        else:
+            effect.expiry = expiry
+
+    def clear(self, target, name=None):
+        """Ends the target's effects of that name (all of them without a name), as a cure does."""
+        names = self.active.get(target)
+        if not names:
+            return
+        for effect_name in [name] if name else list(names):
+            for effect in list(names.get(effect_name, ())):
+                self.remove(effect)
+
+    def running(self, target, name):
+        """Returns the list of the target's running effects of that name, or None."""
+        names = self.active.get(target)
+        effects = names.get(name) if names else None
+        if effects and effects[0].expiry > self.turn:
+            return effects
+        return None
+
+    def effects(self, target, name):
+        """Returns the target's running effects of that name."""
+        return list(self.running(target, name) or ())
+
+    def names(self, target):
+        """Returns the names of the target's running effects."""
+        return [name for name, effects in self.active.get(target, {}).items() if effects[0].expiry > self.turn]
+
+    def remaining(self, target, name):
+        """Turns left of the target's longest effect of that name (0 if it has none)."""
+        effects = self.running(target, name)
+        return max(effect.expiry for effect in effects) - self.turn if effects else 0
+
+    def magnitude(self, target, name):
+        """Total strength of the target's effects of that name (0 if it has none)."""
+        names = self.active.get(target)
+        effects = names.get(name) if names else None  # Asked every attack: running() inlined
+        if not effects or effects[0].expiry <= self.turn:
+            return 0
+        return effects[0].magnitude if len(effects) == 1 else sum(effect.magnitude for effect in effects)
+
+    def stack(self, target, name):
+        """Returns the target's effects of that name as ((turns left, magnitude), ...), shortest first."""
+        effects = self.running(target, name)
+        if not effects:
+            return ()
+        return tuple(sorted((effect.expiry - self.turn, effect.magnitude) for effect in effects))
+
+    def turns(self, target):
+        """Returns {name: turns left} of the target, with every name of BUFF_NAMES (the old temporary_buffs dict)."""
+        return self.snapshot(target)[0]
+
+    def reschedule(self, effect, expiry):
+        """Moves an effect to a new expiry turn; one that is due by then runs out at once."""
+        if expiry <= self.turn:
+            self.spend(effect, expiry)
+            if effect.on_expire:
+                effect.on_expire(effect)
+        else:
+            self.schedule(effect, expiry)
+
+    def extend(self, target, name, turns):
+        """Makes the target's effects of that name last turns longer (or starts one with the default magnitude)."""
+        effects = self.running(target, name)
+        if not effects:
+            self.add(target, name, turns)
+            return
+        for effect in list(effects):
+            self.reschedule(effect, effect.expiry + turns)
+
+    def shorten(self, target, name, turns=1):
+        """Makes the target's effects of that name end turns sooner."""
+        for effect in self.effects(target, name):
+            self.reschedule(effect, effect.expiry - turns)
+
+    def wear(self, target, name):
+        """
+        A damage-over-time tick: returns the total magnitude of the target's effects of that name
+        (0 if it has none) and, unless it is 0, makes them end a turn sooner, as shorten() does.
+        """
+        names = self.active.get(target)
+        effects = names.get(name) if names else None
+        if not effects:
+            return 0
+        effect, turn = effects[0], self.turn
+        if effect.expiry <= turn:
+            return 0  # Spent
+        if len(effects) > 1:
+            magnitude = sum(effect.magnitude for effect in effects)
+            if magnitude:
+                self.shorten(target, name)
+            return magnitude
+        magnitude = effect.magnitude  # One poison or burn, every round of a battle: reschedule() inlined
+        if magnitude:
+            expiry = effect.expiry = effect.expiry - 1
+            if expiry > turn:
+                bucket = self.wheel.get(expiry)
+                if bucket is None:
+                    self.wheel[expiry] = {effect: None}
+                else:
+                    bucket[effect] = None
+            elif effect.on_expire:  # Spent: it stays for the next add() to start again
+                effect.on_expire(effect)
+        return magnitude
+
+    def set_turns(self, target, name, turns):
+        """
+        Makes the target's effect of that name last exactly turns turns (none with 0): what writing
+        to the old temporary_buffs dict did. The effects it replaces keep their total magnitude.
+        """
+        effects = self.running(target, name)
+        magnitude = self.magnitude(target, name) if effects else None
+        self.clear(target, name)
+        if turns > 0:
+            self.add(target, name, turns, magnitude)
+
+    def tick(self):
+        """
+        Ends the turn: returns the effects that ran out, after calling their on_expire. The last one
+        of its name to run out is left spent, with its expiry on this turn (unless its on_expire
+        started it again); the others have none. With nothing on the wheel nothing can run out, and
+        the turn stands still (every effect left is spent).
+        """
+        if not self.wheel:
+            return ()
+        turn = self.turn = self.turn + 1
+        due = self.wheel.pop(turn, None)
+        if not due:
+            return ()
+        expired = ()
+        for effect in due:
+            if effect.expiry == turn:  # The others have moved or ended
+                effects = self.active[effect.target][effect.name]
+                if len(effects) > 1:  # Others of its name still run: spend() inlined
+                    effects.remove(effect)
+                    effect.expiry = None
+                expired += (effect,)
+        for effect in expired:
+            if effect.on_expire:
+                effect.on_expire(effect)
+        return expired
+
+    def snapshot(self, target, label=None):
+        """
+        Returns (turns(), to_list()) of the target in one pass over its effects, for saving: the
+        turns left of each name (every name of BUFF_NAMES included) and the running effects.
+        """
+        turns = dict.fromkeys(BUFF_NAMES, 0)
+        saved = []
+        names = self.active.get(target)
+        if names:
+            for name, effects in names.items():
+                if effects[0].expiry <= self.turn:
+                    continue  # Spent
+                longest = 0
+                for effect in effects:
+                    left = effect.expiry - self.turn
+                    if left > longest:
+                        longest = left
+                    entry = {"name": name, "turns": left, "magnitude": effect.magnitude}
+                    if label:
+                        entry["target"] = label
+                    saved.append(entry)
+                turns[name] = longest
+        return turns, saved
+
+    def to_list(self, target, label=None):
+        """Returns the target's effects for saving: [{"name", "turns", "magnitude"}] (plus "target": label)."""
+        return self.snapshot(target, label)[1]
+
+    def load(self, target, saved):
+        """Adds effects saved by to_list() to the target (callbacks are not saved)."""
+        for entry in saved:
+            self.add(target, entry["name"], entry["turns"], entry["magnitude"])
+
+
+class BuffTurns(MutableMapping):
+    """
+    The turns left of each of a target's effects, read and written like the dict Player.temporary_buffs
+    used to be (buffs["poison"] = 3, buffs.get("attack", 0), ...). See StatusEffects.set_turns().
+    """
+
+    def __init__(self, effects, target):
+        self.effects = effects
+        self.target = target
+
+    def __getitem__(self, name):
+        if name not in BUFF_NAMES and not self.effects.running(self.target, name):
+            raise KeyError(name)
+        return self.effects.remaining(self.target, name)
+
+    def __setitem__(self, name, turns):
+        self.effects.set_turns(self.target, name, turns)
+
+    def __delitem__(self, name):
+        self.effects.clear(self.target, name)
+
+    def __iter__(self):
+        return iter(self.effects.turns(self.target))
+
+    def __len__(self):
+        return len(self.effects.turns(self.target))
+
+    def __repr__(self):
+        return repr(self.effects.turns(self.target))
+
+
+def stack_bonus(stack, turns_left):
+    """
+    Total magnitude of a stack ((turns, magnitude), ...) once its longest effect has turns_left turns
+    left, for models that only count down the longest effect (BattleSolver, battle_sim).
+    """
+    elapsed = max((turns for turns, _ in stack), default=0) - turns_left
+    return sum(magnitude for turns, magnitude in stack if turns > elapsed)
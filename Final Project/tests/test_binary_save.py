@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import binary_save
+from dungeon import Dungeon
+from item import Item
+from pet import Pet
+from player import Player
+from rng import RandomStreams
+from save_system import SaveSystem
+
+
+def round_trip(state):
+    return binary_save.decode(binary_save.encode(state))
+
+
+class BinarySaveTest(unittest.TestCase):
+    def test_full_dungeon_with_a_pet_effects_and_a_custom_item(self):
+        player = Player("Tester", 80, 12, gold=35)
+        player.inventory = [Item("Small Healing Potion", "heal", 20, None, 10), Item("Odd Brew", "attack", 7, 2, 3)]
+        player.pet = Pet("Shadow Wolf", 40, 8)
+        player.effects.add(player, "attack", 3, 5)
+        player.effects.add(player, "attack", 1, 2)  # Stacked with the first one
+        player.effects.add(player, "poison", 2, stack=False)
+        player.effects.add(player.pet, "burn", 2, 5)
+        dungeon = Dungeon(6, 3, 2, RandomStreams(11))
+        dungeon.current_room_index = 2
+        state = SaveSystem.game_state(player, dungeon)
+        self.assertEqual(round_trip(state), state)
+
+    def test_empty_effect_list(self):
+        state = SaveSystem.game_state(Player(), Dungeon(3, 2, 2, RandomStreams(5)))
+        self.assertEqual(state["player"]["status_effects"], [])
+        loaded = round_trip(state)
+        self.assertEqual(loaded, state)
+        self.assertEqual(dict(Player.from_dict(loaded["player"]).temporary_buffs), dict(Player().temporary_buffs))
+
+    def test_lazy_dungeon_with_changed_rooms(self):
+        dungeon = Dungeon(1000, 50, 50, RandomStreams(3), lazy=True, cache_size=8)
+        for index in range(20):
+            room = dungeon.rooms[index]
+            room.trap = not room.trap  # Changed rooms are saved whole
+        dungeon.current_room_index = 19
+        state = SaveSystem.game_state(Player("Lazy"), dungeon)
+        self.assertTrue(state["dungeon"]["lazy"])
+        self.assertEqual(len(state["dungeon"]["changed"]), 20)
+        self.assertEqual(round_trip(state), state)
+
+    def test_magnitudes_that_are_not_whole_numbers(self):
+        player = Player()
+        player.effects.add(player, "attack", 3, 2.5)
+        state = SaveSystem.game_state(player, Dungeon(2, 1, 1, RandomStreams(1)))
+        self.assertEqual(round_trip(state)["player"]["status_effects"], [{"name": "attack", "turns": 3, "magnitude": 2.5}])
+
+    def test_damaged_save(self):
+        data = bytearray(binary_save.encode(SaveSystem.game_state(Player(), Dungeon(2, 1, 1, RandomStreams(1)))))
+        data[-1] ^= 0xFF
+        with self.assertRaises(binary_save.SaveFormatError):
+            binary_save.decode(bytes(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
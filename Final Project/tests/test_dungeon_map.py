@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dungeon_map import DungeonMap, LinearMap
+
+# (normal, shortcut, mystery) room counts: one room, no branches, one branch, short and long branches
+ROOM_COUNTS = [(1, 0, 0), (1, 2, 2), (2, 0, 0), (6, 0, 0), (2, 1, 1), (5, 2, 2), (5, 1, 3), (10, 3, 0),
+               (10, 0, 4), (3, 7, 9), (12, 12, 12)]
+
+
+class StandardMapTest(unittest.TestCase):
+    def test_known_distances_match_the_search(self):
+        for counts in ROOM_COUNTS:
+            with self.subTest(counts=counts):
+                known = DungeonMap.standard(*counts)
+                searched = DungeonMap.standard(*counts)
+                searched.precompute()  # Replaces the hard-coded distances with the breadth-first search
+                self.assertEqual(list(known.distance), list(searched.distance))
+                self.assertEqual(list(known.reachable), list(searched.reachable))
+
+    def test_linear_map_matches_the_search(self):
+        for counts in ROOM_COUNTS:
+            with self.subTest(counts=counts):
+                searched = DungeonMap.standard(*counts)
+                searched.precompute()
+                linear = LinearMap(*counts)
+                for node in range(searched.size):
+                    self.assertEqual(linear.distance_to_exit(node), searched.distance_to_exit(node), node)
+                    self.assertEqual(linear.is_reachable(node), searched.is_reachable(node), node)
+                    self.assertEqual(linear.is_exit(node), searched.is_exit(node), node)
+                    self.assertEqual(linear.edges(node), searched.edges(node), node)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enemy import Enemy
+from enemy_group import EnemyGroup
+
+KINDS = [("Goblin", 30, 5, None), ("Orc", 50, 8, None), ("Spider", 20, 4, "poison")]
+
+
+def kinds_of(enemies):
+    """{template: set of living enemies}, worked out from a plain list."""
+    kinds = {}
+    for enemy in enemies:
+        if enemy.health > 0:
+            kinds.setdefault(enemy.template, set()).add(enemy)
+    return kinds
+
+
+class EnemyGroupTest(unittest.TestCase):
+    def check(self, group, enemies):
+        self.assertEqual(len(group), len(enemies))
+        self.assertEqual(set(group), set(enemies))
+        order = list(group)
+        for enemy in enemies:
+            self.assertIn(enemy, group)
+            self.assertEqual(group.index(enemy), order.index(enemy))
+            self.assertIs(group[group.index(enemy)], enemy)
+        weakest = group.weakest()
+        if enemies:
+            self.assertIn(weakest, enemies)
+            self.assertEqual(weakest.health, min(enemy.health for enemy in enemies))
+        else:
+            self.assertIsNone(weakest)
+        self.assertEqual({template: set(living) for template, living in group.groups()}, kinds_of(enemies))
+
+    def test_random_removals_match_a_plain_list(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            enemies = [Enemy(*rng.choice(KINDS)) for _ in range(rng.randint(1, 40))]
+            group = EnemyGroup(enemies)
+            self.check(group, enemies)
+            while enemies:
+                for enemy in rng.sample(enemies, min(3, len(enemies))):
+                    enemy.health -= rng.randint(0, 30)  # Some fall to 0 or below and stay until removed
+                    group.changed(enemy)
+                enemy = enemies.pop(rng.randrange(len(enemies)))
+                group.remove(enemy)
+                self.assertNotIn(enemy, group)
+                with self.assertRaises(ValueError):
+                    group.index(enemy)
+                self.check(group, enemies)
+
+    def test_removed_enemies_leave_the_heap_and_their_kind(self):
+        goblin, orc = Enemy(*KINDS[0]), Enemy(*KINDS[1])
+        group = EnemyGroup([goblin, orc])
+        group.remove(goblin)
+        self.assertIs(group.weakest(), orc)
+        self.assertEqual(group.groups(), [(orc.template, [orc])])
+        self.assertEqual(group.index(orc), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dungeon import Dungeon
+from main import play_turn
+from output import CaptureOutput, NullOutput, use_output
+from player import Player
+from policy import CautiousPolicy
+from rng import RandomStreams
+from save_journal import SaveJournal
+from save_system import SaveSystem
+
+
+def play_journaled(turns, directory):
+    """Plays turns turns of an endless lazy dungeon, journaling each one. Returns (player, dungeon, journal)."""
+    streams = RandomStreams(7)
+    journal = SaveJournal(os.path.join(directory, "save.json"), os.path.join(directory, "save.journal"),
+                          compact_every=20)
+    with use_output(NullOutput()):
+        player = Player("Bot", health=10 ** 9, attack=10, gold=50)  # Never dies, so every game lasts all the turns
+        player.policy = CautiousPolicy(rng=streams.derive("policy"))
+        dungeon = Dungeon(num_rooms=None, rng=streams, lazy=True)
+        journal.record(SaveSystem.player_state(player), dungeon)
+        for _ in range(turns):
+            play_turn(player, dungeon)
+            journal.record(SaveSystem.player_state(player), dungeon)
+    journal.close()
+    return player, dungeon, journal
+
+
+class LazyJournalTest(unittest.TestCase):
+    def test_loaded_game_matches_game_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            player, dungeon, journal = play_journaled(200, directory)
+            loaded = SaveJournal.load(journal.snapshot_file, journal.journal_file)
+            self.assertEqual(loaded, SaveSystem.game_state(player, dungeon))
+
+    def test_dungeon_snapshot_does_not_grow_with_turns(self):
+        # The player's inventory grows as they pick up items; the dungeon's part must not
+        sizes = []
+        for turns in (100, 400):
+            with tempfile.TemporaryDirectory() as directory:
+                _, dungeon, journal = play_journaled(turns, directory)
+                # The snapshot alone may lag a compaction behind (one still running is not restarted)
+                saved = SaveJournal.load(journal.snapshot_file, journal.journal_file)
+                self.assertEqual(saved["dungeon"]["first_room"], dungeon.rooms.first)
+                sizes.append(len(json.dumps(saved["dungeon"])))
+        self.assertLess(sizes[1], sizes[0] + 1000)  # At most a changed room or two more
+
+
+class CompactionErrorTest(unittest.TestCase):
+    def test_failed_compaction_is_shown_to_the_game(self):
+        with tempfile.TemporaryDirectory() as directory, use_output(CaptureOutput()) as output:
+            player = Player("Bot")
+            dungeon = Dungeon(num_rooms=5, rng=RandomStreams(1))
+            journal = SaveJournal(os.path.join(directory, "save.json"), os.path.join(directory, "save.journal"),
+                                  compact_every=1)
+            journal.record(SaveSystem.player_state(player), dungeon)
+            journal.flush()
+            with open(journal.snapshot_file, "w") as f:
+                f.write("{not json")
+            journal.record(SaveSystem.player_state(player), dungeon)  # Compacts on the background thread
+            journal.close()
+            self.assertTrue(any(line.startswith("Error compacting save journal") for line in output.lines))
+            self.assertTrue(os.path.exists(journal.compacting_file))  # Kept for loading
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dungeon import Dungeon
+from player import Player
+from rng import RandomStreams
+from save_store import SaveStore
+from save_system import SaveSystem
+
+
+def game(room_index):
+    dungeon = Dungeon(rng=RandomStreams(1))
+    dungeon.current_room_index = room_index
+    return SaveSystem.game_state(Player(), dungeon)
+
+
+class SaveStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "saves.db")
+        self.store = SaveStore(self.database)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_latest_is_the_last_save_of_a_batch(self):
+        self.store.save_many([("ann", 1, game(1)), ("ann", 2, game(2)), ("bob", 1, game(3)), ("ann", 3, game(4))])
+        saved_at = [row[1] for row in self.store.slots("ann")]
+        self.assertEqual(saved_at, sorted(set(saved_at)))
+        self.assertEqual(self.store.latest("ann")[1], 3)
+        self.assertEqual(self.store.latest()[:2], ("ann", 3))
+
+    def test_saves_stay_in_order_when_the_clock_stands_still_or_goes_back(self):
+        with mock.patch("save_store.time.time", return_value=1000.0):
+            self.store.save("ann", 1, game(1))
+            self.store.save("ann", 2, game(2))
+        with mock.patch("save_store.time.time", return_value=900.0):
+            self.store.save("ann", 1, game(3))
+        self.assertEqual(self.store.latest("ann")[1], 1)
+        self.assertEqual(self.store.latest("ann")[2]["dungeon"]["current_room_index"], 3)
+
+        self.store.close()
+        self.store = SaveStore(self.database)  # Picks up from the latest saved_at in the database
+        with mock.patch("save_store.time.time", return_value=900.0):
+            self.store.save("ann", 2, game(4))
+        self.assertEqual(self.store.latest("ann")[1], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from save_writer import SaveWriter
+
+
+def fail():
+    raise OSError("No space left on device")
+
+
+class SaveWriterTest(unittest.TestCase):
+    def test_flush_raises_the_error_of_a_failed_task_once(self):
+        writer = SaveWriter()
+        written = []
+        writer.submit(fail)
+        writer.submit(written.append, "after")  # The writer keeps going after a failed task
+        with self.assertRaises(OSError):
+            writer.flush()
+        self.assertEqual(written, ["after"])
+        writer.submit(written.append, "next")
+        writer.flush()  # Already reported
+        self.assertEqual(written, ["after", "next"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dungeon import Dungeon
+from output import NullOutput, use_output
+from player import Player
+from rng import RandomStreams
+from session_manager import SessionManager
+
+
+def new_session(number, seed):
+    rng = RandomStreams(seed)
+    dungeon = Dungeon(rng=rng)
+    with use_output(NullOutput()):
+        dungeon.display_room_choices()  # Fills available_paths, {choice: description}
+    return SimpleNamespace(number=number, player=Player(), dungeon=dungeon, rng=rng)
+
+
+def rolls(session):
+    return [session.rng.combat.random() for _ in range(3)] + [session.rng.loot.randint(10, 50) for _ in range(3)]
+
+
+class HibernationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = SessionManager(directory=self.directory.name, session_size=1024)
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    def test_wake_goes_on_with_the_next_rolls(self):
+        session, twin = new_session(1, 42), new_session(2, 42)
+        self.assertEqual(rolls(session), rolls(twin))
+        for from_disk in (False, True):
+            self.manager.hibernate(session)
+            if from_disk:  # Written and out of pending: the wake reads the files
+                self.manager.writer.flush()
+            self.manager.wake(session)
+            self.assertEqual(rolls(session), rolls(twin))
+        self.assertEqual(session.dungeon.available_paths, twin.dungeon.available_paths)
+        self.assertIn("1", session.dungeon.available_paths)
+
+    def test_woken_rooms_roll_like_rooms_never_hibernated(self):
+        session, twin = new_session(1, 42), new_session(2, 42)
+        self.manager.hibernate(session)
+        self.manager.writer.flush()
+        self.manager.wake(session)
+        for game in (session, twin):
+            dungeon = game.dungeon
+            game.rolls = [room.rng.random() for room in dungeon.rooms + dungeon.mystery_rooms]
+            game.rolls.append(dungeon.rng.world.random())  # The rooms share the world stream
+        self.assertEqual(session.rolls, twin.rolls)
+
+    def test_streams_not_used_yet_start_from_the_seed(self):
+        session, twin = new_session(1, 7), new_session(2, 7)
+        session.rng.combat.random()
+        twin.rng.combat.random()
+        self.manager.hibernate(session)
+        self.manager.writer.flush()
+        self.manager.wake(session)
+        self.assertNotIn("vendor", session.rng.__dict__)
+        self.assertEqual(session.rng.vendor.random(), twin.rng.vendor.random())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import copy
+import json
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balance_sweep import apply_parameter
+from dungeon import Dungeon
+from rng import RandomStreams
+from spawn_tables import DEFAULT_FILE, AliasTable, SpawnTables
+
+DRAWS = 20000
+
+
+def load_data():
+    with open(DEFAULT_FILE, "r") as f:
+        return json.load(f)
+
+
+class AliasTableTest(unittest.TestCase):
+    def assert_frequencies(self, draws, weights):
+        """Every value is drawn within 4 standard deviations of its share of the weights."""
+        counts = Counter(draws)
+        total = sum(weights.values())
+        self.assertLessEqual(set(counts), set(weights))
+        for value, weight in weights.items():
+            share = weight / total
+            margin = 4 * (share * (1 - share) / len(draws)) ** 0.5
+            self.assertAlmostEqual(counts[value] / len(draws), share, delta=margin, msg=value)
+
+    def test_probabilities_are_the_weights(self):
+        weights = {"a": 1, "b": 7, "c": 0.5, "d": 3, "e": 12}
+        table = AliasTable(list(weights), list(weights.values()))
+        total = sum(weights.values())
+        for value, chance in table.probabilities():
+            self.assertAlmostEqual(chance, weights[value] / total)
+
+    def test_draws_follow_the_weights(self):
+        weights = {"a": 1, "b": 7, "c": 0.5, "d": 3, "e": 12}
+        table = AliasTable(list(weights), list(weights.values()))
+        self.assert_frequencies([table.sample(random.Random(seed)) for seed in range(DRAWS)], weights)
+        self.assert_frequencies(table.sample_many(DRAWS, random.Random(1)), weights)
+
+    def test_every_table_of_the_file_draws_its_json_weights(self):
+        data = load_data()
+        tables = SpawnTables(data)
+        for kind in SpawnTables.KINDS:
+            for path, tiers in data[kind].items():
+                for tier in tiers:
+                    with self.subTest(kind=kind, path=path, from_depth=tier["from_depth"]):
+                        depths = [tier["from_depth"]] * DRAWS
+                        draws = tables.draw_many(kind, path, depths, random.Random(7))
+                        self.assert_frequencies([template.name for template in draws], tier["weights"])
+
+    def test_draw_many_uses_the_tier_of_each_depth(self):
+        tables = SpawnTables(load_data())
+        depths = list(range(0, 150, 3))
+        draws = tables.draw_many("enemies", "normal", depths, random.Random(3))
+        self.assertEqual(len(draws), len(depths))
+        for depth, template in zip(depths, draws):
+            names = [value.name for value in tables.table("enemies", "normal", depth).values]
+            self.assertIn(template.name, names)
+
+
+class StatsTest(unittest.TestCase):
+    def test_sweep_parameters_change_the_spawned_templates(self):
+        data = copy.deepcopy(load_data())
+        apply_parameter(data, "enemies.Orc.health", 99)
+        apply_parameter(data, "items.Small Healing Potion.price", 12)
+        tables = SpawnTables(data)
+        orcs = [enemy for enemy in tables.horde(random.Random(0), 500) if enemy.name == "Orc"]
+        self.assertTrue(orcs)
+        self.assertEqual({enemy.health for enemy in orcs}, {99})
+        potions = [item for item in (tables.item(random.Random(seed)) for seed in range(500))
+                   if item.name == "Small Healing Potion"]
+        self.assertTrue(potions)
+        self.assertEqual({item.price for item in potions}, {12})
+
+        dungeon = Dungeon(200, 20, 20, RandomStreams(5), tables=tables)
+        enemies = [room.enemy for room in dungeon.rooms if room.enemy]
+        self.assertTrue(any(enemy.name == "Orc" for enemy in enemies))
+        self.assertTrue(all(enemy.health == 99 for enemy in enemies if enemy.name == "Orc"))
+
+    def test_the_default_tables_are_unchanged(self):
+        orcs = [enemy for enemy in SpawnTables(load_data()).horde(random.Random(0), 500) if enemy.name == "Orc"]
+        self.assertTrue(orcs)
+        self.assertNotIn(99, {enemy.health for enemy in orcs})
+
+
+if __name__ == "__main__":
+    unittest.main()
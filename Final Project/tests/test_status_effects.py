@@ -0,0 +1,159 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle import Battle
+from enemy import Enemy
+from output import NullOutput, use_output
+from pet import Pet
+from player import Player
+from status_effects import BUFF_NAMES, StatusEffects
+
+
+class StatusEffectsTest(unittest.TestCase):
+    def setUp(self):
+        self.effects = StatusEffects()
+
+    def test_effects_of_a_name_stack_and_run_out_on_their_own_turns(self):
+        self.effects.add("hero", "attack", 2, 5)
+        self.effects.add("hero", "attack", 4, 3)
+        self.assertEqual(self.effects.magnitude("hero", "attack"), 8)
+        self.assertEqual(self.effects.remaining("hero", "attack"), 4)
+        self.assertEqual(self.effects.stack("hero", "attack"), ((2, 5), (4, 3)))
+        self.effects.tick()
+        self.assertEqual([effect.magnitude for effect in self.effects.tick()], [5])
+        self.assertEqual(self.effects.magnitude("hero", "attack"), 3)
+        self.effects.tick()
+        self.assertEqual(len(self.effects.tick()), 1)
+        self.assertEqual(self.effects.magnitude("hero", "attack"), 0)
+        self.assertEqual(self.effects.names("hero"), [])
+
+    def test_stack_false_replaces_the_effects_of_that_name(self):
+        self.effects.add("hero", "poison", 3)
+        self.effects.add("hero", "poison", 2)
+        self.effects.add("hero", "poison", 3, stack=False)
+        self.assertEqual(self.effects.stack("hero", "poison"), ((3, 3),))
+
+    def test_on_expire_is_called_when_it_runs_out_but_not_when_cured(self):
+        expired = []
+        self.effects.add("hero", "luck", 1, 2, on_expire=expired.append)
+        cured = self.effects.add("hero", "poison", 1, on_expire=expired.append)
+        self.effects.clear("hero", "poison")
+        self.effects.tick()
+        self.assertEqual([effect.name for effect in expired], ["luck"])
+        self.assertIsNone(cured.expiry)
+
+    def test_on_expire_can_start_the_effect_again(self):
+        def again(effect):
+            self.effects.add(effect.target, effect.name, 2, effect.magnitude, on_expire=again)
+        self.effects.add("hero", "attack", 1, 4, on_expire=again)
+        for _ in range(5):
+            self.effects.tick()
+            self.assertEqual(self.effects.magnitude("hero", "attack"), 4)
+
+    def test_spent_effect_starts_again_in_place(self):
+        first = self.effects.add("hero", "burn", 1)
+        self.assertEqual(self.effects.wear("hero", "burn"), 5)
+        self.assertEqual(self.effects.wear("hero", "burn"), 0)  # Spent
+        self.assertEqual(self.effects.turns("hero")["burn"], 0)
+        self.assertIs(self.effects.add("hero", "burn", 2), first)
+        self.assertEqual(self.effects.remaining("hero", "burn"), 2)
+        self.effects.tick()
+        self.effects.tick()
+        self.assertEqual(self.effects.effects("hero", "burn"), [])
+
+    def test_wear_shortens_every_effect_of_a_stack(self):
+        self.effects.add("hero", "poison", 2)
+        self.effects.add("hero", "poison", 3)
+        self.assertEqual(self.effects.wear("hero", "poison"), 6)
+        self.assertEqual(self.effects.stack("hero", "poison"), ((1, 3), (2, 3)))
+        self.assertEqual(self.effects.wear("hero", "poison"), 6)
+        self.assertEqual(self.effects.stack("hero", "poison"), ((1, 3),))
+
+    def test_snapshot(self):
+        self.effects.add("hero", "attack", 2, 5)
+        self.effects.add("hero", "attack", 3, 1)
+        self.effects.add("hero", "freeze", 1, 0)
+        turns, saved = self.effects.snapshot("hero", "pet")
+        self.assertEqual(turns, dict.fromkeys(BUFF_NAMES, 0) | {"attack": 3, "freeze": 1})
+        self.assertEqual(saved, [{"name": "attack", "turns": 2, "magnitude": 5, "target": "pet"},
+                                 {"name": "attack", "turns": 3, "magnitude": 1, "target": "pet"},
+                                 {"name": "freeze", "turns": 1, "magnitude": 0, "target": "pet"}])
+        self.assertEqual(saved, self.effects.to_list("hero", "pet"))
+
+
+class TargetsTest(unittest.TestCase):
+    def setUp(self):
+        self.player = Player("Tester", 100, 10)
+        self.player.pet = Pet("Shadow Wolf", 40, 8)
+        self.enemy = Enemy("Goblin", 30, 5)
+        self.battle = Battle(self.player, [self.enemy])
+
+    def test_pet_and_enemy_burn_and_poison(self):
+        self.player.effects.add(self.player.pet, "burn", 2)
+        self.battle.enemy_effects.add(self.enemy, "poison", 1)
+        with use_output(NullOutput()):
+            self.battle.apply_status_effects()
+        self.assertEqual(self.player.pet.health, 35)
+        self.assertEqual(self.enemy.health, 27)
+        self.assertEqual(self.player.health, 100)
+        self.assertEqual(self.battle.enemy_effects.names(self.enemy), [])
+        self.assertEqual(self.player.effects.remaining(self.player.pet, "burn"), 1)
+
+    def test_pet_effects_tick_with_the_player(self):
+        self.player.effects.add(self.player.pet, "attack", 1, 3)
+        self.assertEqual(dict(self.player.temporary_buffs)["attack"], 0)  # Not the player's
+        with use_output(NullOutput()):
+            self.player.update_buffs()
+        self.assertEqual(self.player.effects.names(self.player.pet), [])
+
+
+class BuffTurnsTest(unittest.TestCase):
+    def test_reads_and_writes_like_the_old_dict(self):
+        player = Player()
+        buffs = player.temporary_buffs
+        self.assertEqual(dict(buffs), dict.fromkeys(BUFF_NAMES, 0))
+        buffs["poison"] = 3
+        buffs["attack"] += 2
+        self.assertEqual(buffs["poison"], 3)
+        self.assertEqual(player.effects.magnitude(player, "poison"), 3)
+        self.assertEqual(buffs.get("attack"), 2)
+        buffs["shield"] = 1  # Names the old dict did not have are added
+        self.assertEqual(len(buffs), len(BUFF_NAMES) + 1)
+        buffs["poison"] = 0
+        del buffs["shield"]
+        self.assertEqual(player.effects.names(player), ["attack"])
+        with self.assertRaises(KeyError):
+            buffs["shield"]
+
+    def test_writing_turns_keeps_the_magnitude(self):
+        player = Player()
+        player.effects.add(player, "attack", 2, 7)
+        player.temporary_buffs["attack"] = 5
+        self.assertEqual(player.effects.stack(player, "attack"), ((5, 7),))
+
+    def test_saves_with_only_temporary_buffs_load_with_the_default_magnitudes(self):
+        saved = Player("Old", 100, 10).to_dict()
+        del saved["status_effects"]
+        saved["temporary_buffs"] = {"attack": 2, "defense": 0, "poison": 1}
+        player = Player.from_dict(saved)
+        self.assertEqual(player.effects.stack(player, "attack"), ((2, 5),))
+        self.assertEqual(player.effects.stack(player, "poison"), ((1, 3),))
+        self.assertEqual(player.temporary_buffs["defense"], 0)
+
+    def test_saved_effects_win_over_temporary_buffs(self):
+        player = Player()
+        player.pet = Pet("Shadow Wolf", 40, 8)
+        player.effects.add(player, "attack", 3, 9)
+        player.effects.add(player.pet, "burn", 2, 4)
+        saved = player.to_dict()
+        saved["temporary_buffs"]["attack"] = 1  # Only read without status_effects
+        loaded = Player.from_dict(saved)
+        self.assertEqual(loaded.effects.stack(loaded, "attack"), ((3, 9),))
+        self.assertEqual(loaded.effects.stack(loaded.pet, "burn"), ((2, 4),))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import atexit
+import json
+import time
+
+class Histogram:
+    """
+    Durations (in nanoseconds) counted in logarithmic buckets: 8 buckets per power of two, so a
+    percentile is within about 6% of the true value, and recording is a few integer operations
+    whatever the number of samples.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # (power of two, next 3 bits) -> count
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, duration):
+        if duration < 16:
+            key = (0, max(0, duration))
+        else:
+            bits = duration.bit_length()
+            key = (bits, (duration >> (bits - 4)) & 7)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    @staticmethod
+    def bucket_middle(key):
+        bits, fraction = key
+        if bits == 0:
+            return fraction
+        width = 1 << (bits - 4)
+        return (8 + fraction) * width + width // 2
+
+    def percentile(self, percent):
+        """Returns the duration below which percent % of the samples fall (0 if there are none)."""
+        if not self.count:
+            return 0
+        wanted = self.count * percent / 100.0
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= wanted:
+                return min(self.bucket_middle(key), self.max)
+        return self.max
+
+    def merge(self, other):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        """Returns count, total and mean, p50, p95, p99 and max in microseconds."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total / 1e6, 3),
+            "mean_us": round(self.total / self.count / 1e3, 2) if self.count else 0,
+            "p50_us": round(self.percentile(50) / 1e3, 2),
+            "p95_us": round(self.percentile(95) / 1e3, 2),
+            "p99_us": round(self.percentile(99) / 1e3, 2),
+            "max_us": round(self.max / 1e3, 2)
+        }
+
+
+class Timings:
+    """
+    Optional timing of the game's phases (choosing a path, room events, battles, saving, ...)
+    and of the battle's steps, one Histogram per phase.
+
+    Instrumented code does:
+        started = timings.start()
+        ...
+        timings.stop("turn.battle", started)
+    While timing is off (the default), start() returns 0 and stop() returns at once, so the
+    instrumentation costs two cheap calls per phase.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.export_file = None
+
+    def enable(self, export_file=None):
+        """Starts timing. With export_file the snapshot is written there as JSON when the program exits."""
+        self.enabled = True
+        if export_file and self.export_file is None:
+            atexit.register(self.export_at_exit)
+        self.export_file = export_file or self.export_file
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.histograms = {}
+
+    def start(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, phase, started):
+        """Records the time since started (from start()) for phase."""
+        if started:
+            self.lap(phase, started)
+
+    def lap(self, phase, started):
+        """Like stop(), and returns the start of the next phase (one clock read for both)."""
+        if not started:
+            return 0
+        now = time.perf_counter_ns()
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = Histogram()
+        histogram.record(now - started)
+        return now
+
+    def snapshot(self):
+        """Returns {phase: summary} of every phase timed so far, by phase name."""
+        return {phase: self.histograms[phase].summary() for phase in sorted(self.histograms)}
+
+    def export(self, path):
+        """Writes the snapshot to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
+
+    def export_at_exit(self):
+        if self.export_file and self.histograms:
+            self.export(self.export_file)
+
+    def report(self):
+        """Prints the snapshot as a table."""
+        print(f"{'Phase':<30} {'Count':>8} {'Total ms':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'Max us':>9}")
+        for phase, summary in self.snapshot().items():
+            print(f"{phase:<30} {summary['count']:>8} {summary['total_ms']:>10.1f} {summary['p50_us']:>9.1f} "
+                  f"{summary['p95_us']:>9.1f} {summary['p99_us']:>9.1f} {summary['max_us']:>9.1f}")
+
+
+timings = Timings()  # Shared by the whole program